@@ -1,18 +1,79 @@
 import os
-from typing import Dict, List, Optional
+import threading
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Tuple
 
-import ftfy
-from aider.coders import Coder
-from aider.io import InputOutput
-from aider.models import Model
+from git import Repo
 
-from type_definitions import Task
+from completion_cache import CompletionCache
+from file_selector import FileSelector
+from instrumentation import tracer
+from model_router import ModelRouter
+from rate_limiter import RateLimiter
+from tags_cache import TagsCache
+from task_artifacts import ArtifactStore, ResponseLog
+from type_definitions import Task, TaskChanges, VerificationResult
+
+# Segunda mensagem enviada no modo bloqueante para confirmar a edição dos arquivos
+CONFIRM_EDIT_MESSAGE = "Sim, crie ou atualize quaisquer arquivos necessários"
+
+if TYPE_CHECKING:
+    from aider.coders import Coder
+    from aider.models import Model
 
 
 class AiderHandler:
     def __init__(self, config: dict) -> None:
         self.config = config
-        self.model = Model(config['openrouter']['model'])
+        self.file_selector = FileSelector(config)
+        completion_config = config['aider'].get('completion_cache', {})
+        self.completion_cache = CompletionCache(
+            completion_config.get('directory', '.task_to_code/completions'),
+            completion_config.get('max_size_mb', 512),
+            completion_config.get('max_age_days', 30)
+        ) if completion_config.get('enabled', True) else None
+        # Tags do repo map por blob, compartilhadas entre as worktrees de cada projeto
+        tags_config = config['aider'].get('tags_cache', {})
+        self.tags_cache = TagsCache(
+            tags_config.get('directory', '.task_to_code/tags'),
+            tags_config.get('max_size_mb', 256)
+        ) if tags_config.get('enabled', True) else None
+        # Requisições por minuto por modelo (token bucket), consumidas a cada chamada ao LLM
+        self.rate_limiter = RateLimiter(config)
+        # Escolha do modelo por task e troca automática quando um provedor degrada
+        self.router = ModelRouter(config, self.rate_limiter)
+        # Log completo das respostas em disco; só o resumo vai para o PR
+        self.artifacts = ArtifactStore(config)
+        # Limites de execuções simultâneas por provedor do modelo
+        self.provider_limits: Dict[str, threading.BoundedSemaphore] = {
+            provider: threading.BoundedSemaphore(limit)
+            for provider, limit in config.get('workers', {}).get('provider_limits', {}).items()
+        }
+
+    @property
+    def model(self) -> 'Model':
+        """Modelo padrão (`openrouter.model`), criado no primeiro uso."""
+        return self.router.get_model(self.router.default_model)
+
+    @staticmethod
+    def get_provider(model_name: str) -> str:
+        """Extrai o provedor do nome do modelo (ex: deepseek/deepseek-chat -> deepseek)."""
+        name = model_name.removeprefix('openrouter/')
+        return name.split('/', 1)[0] if '/' in name else name
+
+    @contextmanager
+    def provider_slot(self, model_name: str) -> Iterator[None]:
+        """Aguarda uma vaga na concorrência do provedor do modelo.
+
+        O limite de requisições por minuto é aplicado pelo ModelRouter a cada chamada ao LLM.
+        """
+        semaphore = self.provider_limits.get(self.get_provider(model_name))
+        if not semaphore:
+            yield
+            return
+        with semaphore:
+            yield
 
     def generate_prompt(self, task: Task) -> str:
         """Gera o prompt para o Aider baseado na task do Jira."""
@@ -41,11 +102,32 @@ class AiderHandler:
         Por favor, aplique estas correções mantendo a consistência do código.
         """
 
-    def execute_command(self, task: Task, prompt: str) -> Optional[str]:
-        """Executa o comando do Aider usando a biblioteca aider-chat."""
+    def generate_fix_prompt(self, task: Task, result: VerificationResult) -> str:
+        """Gera o prompt com a saída do build ou dos testes que falharam."""
+        stage = 'O build' if result['stage'] == 'build' else 'Os testes'
+        return f"""
+        {stage} do projeto falharam após as alterações da task {task['key']} ({task['title']}).
+
+        Saída do comando (final):
+        ```
+        {result['output']}
+        ```
+
+        Corrija o código para que {stage.lower()} passem, sem remover testes nem alterar o comportamento pedido pela task.
+        """
+
+    def execute_command(self, task: Task, prompt: str, work_dir: str,
+                        files: Optional[Tuple[List[str], List[str]]] = None,
+                        kind: str = 'implement') -> Optional[TaskChanges]:
+        """Executa o comando do Aider usando a biblioteca aider-chat.
+
+        `files` fixa os arquivos (editáveis, somente leitura) e dispensa o repo map; sem ele, os
+        arquivos são escolhidos pelo FileSelector. O modelo é escolhido pelo ModelRouter; se ele
+        não responder, a execução passa para o próximo candidato. A resposta é gravada em um log
+        por execução e o retorno traz só o resumo limitado das alterações.
+        """
         try:
-            project_config = self.config['projects'][task['project']]
-            project_dir = os.path.abspath(project_config['directory'])
+            project_dir = os.path.abspath(work_dir)
             
             # Verifica se o diretório existe
             if not os.path.exists(project_dir):
@@ -70,32 +152,125 @@ class AiderHandler:
 
             print("\n=== Iniciando execução do Aider ===")
             print(f"Diretório do projeto: {project_dir}")
-            print(f"Modelo: {self.config['openrouter']['model']}")
             print(f"Temperatura: {self.config['openrouter']['temperature']}")
             print(f"API Base: {self.config['openrouter']['base_url']}")
             print(f"API key: {env['OPENROUTER_API_KEY']}")
             print("Prompt:", prompt)
             print("================================\n")
 
-            fnames = [project_dir]
-            
-            io = InputOutput(yes=True)
-            # Create a coder object
-            coder = Coder.create(main_model=self.model, io=io, fnames=fnames)
-            # Executa o comando
-            response = coder.run(prompt)
+            # Seleciona os arquivos relevantes; sem resultados, usa o diretório inteiro
+            if files:
+                fnames, read_only_fnames = files
+            else:
+                fnames, read_only_fnames = self.file_selector.select_files(task, project_dir)
+            if not fnames:
+                fnames = [project_dir]
             
-            print("\n=== Saída do Aider ===")
-            print("Resposta:", response)
-            print("=====================\n")
+            streaming = self.config['aider'].get('streaming', True)
+            directive = self.config['aider'].get('edit_directive')
+            if streaming:
+                rendered_prompt = f"{prompt}\n\n{directive}" if directive else prompt
+            else:
+                rendered_prompt = f"{prompt}\n\n{CONFIRM_EDIT_MESSAGE}"
 
-            response = coder.run("Sim, crie ou atualize quaisquer arquivos necessários")
-            
-            print("\n=== Saída do Aider ===")
-            print("Resposta:", response)
-            print("=====================\n")
+            # Modelos em ordem de tentativa, conforme o tipo da task e o tamanho do contexto
+            if fnames == [project_dir]:
+                context_tokens = self.router.large_context_tokens
+            else:
+                context_tokens = ModelRouter.estimate_context_tokens(rendered_prompt, fnames + read_only_fnames)
+            models = self.router.route(task, kind, context_tokens)
+            print(f"Modelos: {' > '.join(models)} (contexto estimado: {context_tokens} tokens)")
+
+            # Requisições idênticas sobre o mesmo commit reaplicam o diff salvo sem chamar o LLM
+            repo = Repo(project_dir)
+            base_sha = repo.head.commit.hexsha
+            cache_files = [os.path.relpath(fname, project_dir) for fname in fnames + read_only_fnames]
+
+            def build_cache_key(model_name: str) -> str:
+                return CompletionCache.build_key(
+                    model_name, self.config['openrouter']['temperature'], rendered_prompt, base_sha, cache_files
+                )
+
+            if self.completion_cache:
+                # A resposta pode ter vindo de qualquer candidato, inclusive de um fallback
+                cached = self.completion_cache.get_first([build_cache_key(model_name) for model_name in models])
+                tracer.set_attribute('cache_hit', bool(cached))
+                if cached:
+                    print(f"Reaplicando alterações do cache de completions ({cached['model']})")
+                    CompletionCache.apply_diff(repo, cached['diff'], f"feat: {task['key']} {task['title']}")
+                    print(self.completion_cache.report())
+                    with self.artifacts.open_log(task['key'], kind, 'cache') as log:
+                        log.write(cached['response'])
+                    return self.artifacts.summarize(log, repo, base_sha)
 
-            return ftfy.fix_text(response)
+            from aider.coders import Coder
+            from aider.io import InputOutput
+
+            for model_name in models:
+                with self.provider_slot(model_name):
+                    print(f"Executando com o modelo {model_name}")
+                    started_at = time.monotonic()
+                    log = self.artifacts.open_log(task['key'], kind, model_name)
+                    try:
+                        io = InputOutput(yes=True, pretty=not streaming)
+                        # Com os arquivos já definidos o repo map não é necessário
+                        coder = Coder.create(
+                            main_model=self.router.get_model(model_name), io=io, fnames=fnames,
+                            read_only_fnames=read_only_fnames, stream=streaming, map_tokens=0 if files else None
+                        )
+                        tags = None
+                        if coder.repo_map and self.tags_cache:
+                            tags = self.tags_cache.attach(coder.repo_map, task['project'])
+                        # Executa o comando
+                        if streaming:
+                            completed = self.run_streaming(coder, rendered_prompt, log)
+                        else:
+                            completed = self.run_blocking(coder, prompt, log)
+                        responded = log.has_content
+                    except Exception as e:
+                        print(f"Erro no modelo {model_name}: {e}")
+                        completed, responded = True, False
+                    finally:
+                        log.close()
+                    elapsed = time.monotonic() - started_at
+
+                # Orçamento da task esgotado: outro modelo recomeçaria do zero
+                if not completed:
+                    self.router.record(model_name, elapsed, False)
+                    return None
+                # Resposta vazia: o Aider já esgotou as retentativas no provedor
+                if not responded:
+                    self.router.record(model_name, elapsed, False)
+                    tracer.increment('fallbacks')
+                    print(f"Modelo {model_name} não respondeu, tentando o próximo candidato")
+                    continue
+                self.router.record(model_name, elapsed, True, coder.total_tokens_received)
+                break
+            else:
+                print("Nenhum dos modelos candidatos respondeu")
+                return None
+
+            changes = self.artifacts.summarize(log, repo, base_sha)
+            print(f"Resposta completa em {log.path} ({log.size} caracteres)")
+            if self.completion_cache:
+                diff = CompletionCache.get_diff(repo, base_sha)
+                if diff:
+                    # Guardada com o modelo que respondeu, que pode ser um fallback
+                    self.completion_cache.put(build_cache_key(model_name), changes['rationale'], diff, model_name)
+                print(self.completion_cache.report())
+            tracer.set_attribute('model', model_name)
+            tracer.set_attribute('project', task['project'])
+            tracer.set_attribute('tokens_sent', coder.total_tokens_sent)
+            tracer.set_attribute('tokens_received', coder.total_tokens_received)
+            tracer.set_attribute('cost', coder.total_cost)
+            print(f"Tokens enviados: {coder.total_tokens_sent}")
+            if coder.repo_map:
+                print(f"Tempo do repo map: {coder.repo_map.map_processing_time:.2f}s")
+            if tags:
+                tracer.set_attribute('tags_cache_hits', tags.hits)
+                print(TagsCache.report(tags))
+
+            return changes
 
         except Exception as e:
             print("\n=== Erro na execução do Aider ===")
@@ -107,7 +282,80 @@ class AiderHandler:
             print("==============================\n")
             return None
 
-    def apply_corrections(self, task: Task, corrections: List[Dict]) -> Optional[str]:
-        """Aplica correções específicas usando o Aider."""
+    def run_blocking(self, coder: 'Coder', prompt: str, log: ResponseLog) -> bool:
+        """Executa o prompt e a confirmação de edição em duas chamadas bloqueantes."""
+        response = coder.run(prompt)
+
+        print("\n=== Saída do Aider ===")
+        print("Resposta:", response)
+        print("=====================\n")
+        log.write(response or '')
+
+        response = coder.run(CONFIRM_EDIT_MESSAGE)
+
+        print("\n=== Saída do Aider ===")
+        print("Resposta:", response)
+        print("=====================\n")
+        log.write(f"\n\n{response or ''}")
+        return True
+
+    def run_streaming(self, coder: 'Coder', prompt: str, log: ResponseLog) -> bool:
+        """Executa uma única chamada em streaming, respeitando os limites de tokens e tempo da task.
+
+        Os trechos vão direto para o log; retorna False se a geração for abortada pelo orçamento.
+        """
+        budget = self.config['aider'].get('budget', {})
+        max_tokens = budget.get('max_tokens')
+        max_seconds = budget.get('max_seconds')
+
+        print("\n=== Saída do Aider (streaming) ===")
+        started_at = time.monotonic()
+        tokens = 0
+        # A geração só termina depois que os blocos de edição são aplicados pelo Aider
+        stream = coder.run_stream(prompt)
+        try:
+            for chunk in stream:
+                log.write(chunk)
+                tokens += coder.main_model.token_count(chunk)
+                if max_tokens and tokens > max_tokens:
+                    print(f"\nLimite de {max_tokens} tokens excedido, abortando a geração")
+                    return False
+                if max_seconds and time.monotonic() - started_at > max_seconds:
+                    print(f"\nLimite de {max_seconds}s excedido, abortando a geração")
+                    return False
+        finally:
+            stream.close()
+        print(f"\n=== Fim da saída ({tokens} tokens em {time.monotonic() - started_at:.1f}s) ===\n")
+
+        if not coder.aider_edited_files:
+            print("Nenhum arquivo foi editado pelo Aider")
+        return True
+
+    def apply_corrections(self, task: Task, corrections: List[Dict], work_dir: str) -> Optional[TaskChanges]:
+        """Aplica correções específicas usando o Aider.
+
+        Os arquivos editáveis ficam restritos ao diff da branch da task contra a base e aos
+        arquivos citados nos comentários; sem nenhum deles, usa a seleção normal.
+        """
         prompt = self.generate_correction_prompt(task, corrections)
-        return self.execute_command(task, prompt) 
\ No newline at end of file
+        project_dir = os.path.abspath(work_dir)
+        files = self.file_selector.select_correction_files(
+            task, corrections, project_dir, f"origin/{self.config['github']['base_branch']}"
+        )
+        return self.execute_command(task, prompt, work_dir, files if files[0] else None, kind='corrections')
+
+    def fix_failures(self, task: Task, result: VerificationResult, changes: TaskChanges,
+                     work_dir: str) -> Optional[TaskChanges]:
+        """Devolve ao Aider a falha da verificação, editando os arquivos já alterados pela task."""
+        project_dir = os.path.abspath(work_dir)
+        editable = [
+            os.path.join(project_dir, rel_fname) for rel_fname in changes['files']
+            if os.path.isfile(os.path.join(project_dir, rel_fname))
+        ][:self.file_selector.max_editable_files]
+        read_only = [
+            os.path.join(project_dir, rel_fname) for rel_fname in result['tests'] or []
+            if os.path.isfile(os.path.join(project_dir, rel_fname))
+            and os.path.join(project_dir, rel_fname) not in editable
+        ][:self.file_selector.max_read_only_files]
+        files = (editable, read_only) if editable else None
+        return self.execute_command(task, self.generate_fix_prompt(task, result), work_dir, files, kind='fix')
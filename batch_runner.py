@@ -0,0 +1,128 @@
+import re
+import sys
+import time
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from type_definitions import TaskSnapshot
+from worker_pool import TaskWorkerPool
+
+if TYPE_CHECKING:
+    from main import TaskToCode
+
+
+class BatchRunner:
+    """Processa de uma vez todas as tasks de uma consulta JQL ou de uma lista de chaves.
+
+    As issues são buscadas em poucas consultas paginadas, agrupadas por projeto e executadas
+    no pool de workers com uma única atualização da branch base por projeto.
+    """
+
+    def __init__(self, task_to_code: 'TaskToCode') -> None:
+        self.task_to_code = task_to_code
+        self.config = task_to_code.config
+        self.pool = TaskWorkerPool(task_to_code)
+
+    @staticmethod
+    def read_task_keys(source: str) -> List[str]:
+        """Lê as chaves de um arquivo (ou da entrada padrão com `-`), ignorando linhas vazias e `#`."""
+        if source == '-':
+            lines = sys.stdin.read().splitlines()
+        else:
+            with open(source, 'r', encoding='utf-8') as file:
+                lines = file.read().splitlines()
+
+        task_keys: List[str] = []
+        for line in lines:
+            line = line.split('#', 1)[0]
+            for task_key in re.split(r'[\s,;]+', line.strip()):
+                if task_key and task_key.upper() not in task_keys:
+                    task_keys.append(task_key.upper())
+        return task_keys
+
+    def load_snapshots(self, jql: Optional[str] = None,
+                       task_keys: Optional[List[str]] = None) -> List[TaskSnapshot]:
+        """Busca as issues em lote e guarda os snapshots no ciclo atual do JiraHandler."""
+        jira_handler = self.task_to_code.jira_handler
+        jira_handler.begin_cycle()
+        if jql:
+            issues = jira_handler.search_issues(jql)
+        else:
+            issues = jira_handler.search_issues_by_keys(task_keys or [])
+
+        snapshots = []
+        for issue in issues:
+            try:
+                snapshots.append(jira_handler.get_snapshot(issue.key, issue))
+            except Exception as e:
+                print(f"Erro ao ler a task {issue.key}: {e}")
+        return snapshots
+
+    def group_by_project(self, snapshots: List[TaskSnapshot]) -> Dict[str, List[TaskSnapshot]]:
+        groups: Dict[str, List[TaskSnapshot]] = {}
+        for snapshot in snapshots:
+            groups.setdefault(snapshot['task']['project'], []).append(snapshot)
+        return groups
+
+    def run(self, jql: Optional[str] = None, task_keys: Optional[List[str]] = None) -> Dict[str, Optional[str]]:
+        started_at = time.monotonic()
+        snapshots = self.load_snapshots(jql, task_keys)
+        groups = self.group_by_project(snapshots)
+        print(f"{len(snapshots)} tasks encontradas em {len(groups)} projeto(s)")
+
+        found = {snapshot['key'] for snapshot in snapshots}
+        missing = [task_key for task_key in task_keys or [] if task_key not in found]
+        unconfigured = {project: group for project, group in groups.items() if project not in self.config['projects']}
+        existing: Dict[str, str] = {}
+        pending: List[str] = []
+        # Commit base de cada projeto só para este lote (o pool é compartilhado com o servidor)
+        base_refs: Dict[str, str] = {}
+        for project, group in groups.items():
+            if project in unconfigured:
+                continue
+
+            # Uma única atualização da base por projeto; todas as tasks do lote partem dela
+            base_ref = self.pool.get_base_ref(project)
+            if not base_ref:
+                print(f"Não foi possível atualizar a branch base de {project}, pulando {len(group)} tasks")
+                unconfigured[project] = group
+                continue
+            base_refs[project] = base_ref
+
+            for snapshot in group:
+                # Tasks que já têm PR para a mesma descrição não são refeitas
+                pr_url = self.task_to_code.get_existing_pr(snapshot['task'])
+                if pr_url:
+                    existing[snapshot['key']] = pr_url
+                else:
+                    pending.append(snapshot['key'])
+
+        # As tasks são enviadas agrupadas por projeto para aproveitar os caches de cada repositório
+        results = self.pool.run(pending, prefetch=False, summary=False, base_refs=base_refs)
+
+        self.print_report(groups, results, existing, unconfigured, missing, time.monotonic() - started_at)
+        return {**existing, **results}
+
+    def print_report(self, groups: Dict[str, List[TaskSnapshot]], results: Dict[str, Optional[str]],
+                     existing: Dict[str, str], skipped: Dict[str, List[TaskSnapshot]],
+                     missing: List[str], elapsed: float) -> None:
+        print("\n=== Resumo do lote ===")
+        for project, group in sorted(groups.items()):
+            if project in skipped:
+                reason = 'não configurado' if project not in self.config['projects'] else 'base indisponível'
+                print(f"\n[{project}] {len(group)} tasks ignoradas ({reason})")
+                continue
+
+            created = [s['key'] for s in group if results.get(s['key'])]
+            failed = [s['key'] for s in group if s['key'] in results and not results[s['key']]]
+            print(f"\n[{project}] {len(group)} tasks: {len(created)} PRs criados, "
+                  f"{sum(1 for s in group if s['key'] in existing)} já existentes, {len(failed)} falhas")
+            for snapshot in group:
+                task_key = snapshot['key']
+                print(f"  {task_key}: {results.get(task_key) or existing.get(task_key) or 'sem PR'}")
+
+        if missing:
+            print(f"\nTasks não encontradas: {', '.join(missing)}")
+        processed = len(results)
+        rate = processed / elapsed * 60 if elapsed else 0.0
+        print(f"\nTempo total: {elapsed:.1f}s ({processed} tasks processadas, {rate:.1f} tasks/min)")
+        print("======================\n")
@@ -0,0 +1,464 @@
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import yaml
+from git import Repo
+
+from instrumentation import print_stage_report, tracer
+from worker_pool import TaskWorkerPool
+
+BENCH_PROJECT = 'BENCH'
+REPO_SIZES = {'small': 20, 'large': 2000}
+
+# Resposta fixa do modelo simulado: um bloco SEARCH/REPLACE que acrescenta uma linha ao arquivo.
+# O prefixo "./" evita que o Aider trate o nome como menção a um arquivo fora do chat
+# (o que pediria outra rodada em vez de aplicar a edição).
+STUB_EDIT = """Registrando a alteração da task.
+
+./BENCHMARK.md
+```
+<<<<<<< SEARCH
+=======
+- alteração gerada pelo benchmark
+>>>>>>> REPLACE
+```
+"""
+
+PROJECT_PATTERN = re.compile(r'^\s*Projeto:\s*(\S+)', re.MULTILINE)
+KEY_IN_PATTERN = re.compile(r'key in \(([^)]*)\)', re.IGNORECASE)
+# Transições oferecidas pelo Jira simulado (id -> status de destino)
+TRANSITIONS = {'21': 'In Progress', '31': 'Code Review', '41': 'Done'}
+
+
+def format_jira_date(value: datetime) -> str:
+    return value.strftime('%Y-%m-%dT%H:%M:%S.000+0000')
+
+
+class FakeServices:
+    """Estado compartilhado do Jira e do GitHub simulados: issues, PRs e contagem de chamadas."""
+
+    def __init__(self, issues: List[Dict[str, Any]], latency: float = 0.0) -> None:
+        self.issues: Dict[str, Dict[str, Any]] = {issue['key']: issue for issue in issues}
+        self.pulls: Dict[str, List[Dict[str, Any]]] = {}
+        self.calls: Counter = Counter()
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.clock = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        self.next_comment_id = 10000
+        self.url = ''
+
+    def tick(self) -> str:
+        """Avança o relógio simulado para que cada alteração tenha um `updated` distinto."""
+        self.clock += timedelta(seconds=1)
+        return format_jira_date(self.clock)
+
+    def add_comment(self, task_key: str, body: str, author: str = 'Benchmark') -> Dict[str, Any]:
+        with self.lock:
+            self.next_comment_id += 1
+            now = self.tick()
+            comment = {
+                'id': str(self.next_comment_id),
+                'body': body,
+                'author': {'name': author.lower(), 'displayName': author},
+                'created': now,
+                'updated': now,
+            }
+            fields = self.issues[task_key]['fields']
+            fields['comment']['comments'].append(comment)
+            fields['comment']['total'] = fields['comment']['maxResults'] = len(fields['comment']['comments'])
+            fields['updated'] = now
+            return comment
+
+    def transition(self, task_key: str, transition_id: str) -> None:
+        with self.lock:
+            fields = self.issues[task_key]['fields']
+            fields['status'] = {'name': TRANSITIONS[transition_id]}
+            fields['updated'] = self.tick()
+
+    def create_pull(self, repository: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        with self.lock:
+            pulls = self.pulls.setdefault(repository, [])
+            number = len(pulls) + 1
+            pull = {
+                'number': number,
+                'state': 'open',
+                'title': payload['title'],
+                'head': {'ref': payload['head']},
+                'base': {'ref': payload['base']},
+                'url': f'{self.url}/repos/{repository}/pulls/{number}',
+                'issue_url': f'{self.url}/repos/{repository}/issues/{number}',
+                'html_url': f'{self.url}/{repository}/pull/{number}',
+            }
+            pulls.append(pull)
+            return pull
+
+
+class FakeServicesHandler(BaseHTTPRequestHandler):
+    """Responde às rotas da API do Jira e do GitHub usadas pelo pipeline."""
+
+    server: 'FakeServicesServer'
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        self.dispatch('GET')
+
+    def do_POST(self) -> None:
+        self.dispatch('POST')
+
+    def dispatch(self, method: str) -> None:
+        services = self.server.services
+        url = urlsplit(self.path)
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length) or b'null') if length else None
+        if services.latency:
+            time.sleep(services.latency)
+
+        route, status, payload = self.route(method, url.path, parse_qs(url.query), body)
+        with services.lock:
+            services.calls[route] += 1
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def route(self, method: str, path: str, query: Dict[str, List[str]],
+              body: Any) -> Tuple[str, int, Any]:
+        services = self.server.services
+        parts = [part for part in path.split('/') if part]
+
+        # Jira
+        if parts[:3] == ['rest', 'api', '2']:
+            resource = parts[3:]
+            if resource == ['serverInfo']:
+                return 'jira serverInfo', 200, {
+                    'baseUrl': services.url, 'version': '9.4.0', 'versionNumbers': [9, 4, 0],
+                    'deploymentType': 'Server',
+                }
+            if resource == ['field']:
+                return 'jira GET field', 200, []
+            if resource[:1] == ['search']:
+                params = {**{name: values[0] for name, values in query.items()}, **(body or {})}
+                issues = sorted(services.issues.values(), key=lambda issue: issue['fields']['updated'])
+                # Apenas o filtro `key in (...)` da busca em lote é interpretado; o resto da JQL é ignorado
+                keys = KEY_IN_PATTERN.search(params.get('jql', ''))
+                if keys:
+                    wanted = {key.strip() for key in keys.group(1).split(',')}
+                    issues = [issue for issue in issues if issue['key'] in wanted]
+                start_at = int(params.get('startAt', 0))
+                max_results = int(params.get('maxResults', 50))
+                return 'jira search', 200, {
+                    'startAt': start_at, 'maxResults': max_results, 'total': len(issues),
+                    'issues': issues[start_at:start_at + max_results],
+                }
+            if resource[:1] == ['issue'] and len(resource) >= 2:
+                task_key = resource[1]
+                if task_key not in services.issues:
+                    return 'jira issue (404)', 404, {'errorMessages': [f'Issue {task_key} não existe']}
+                if resource[2:] == ['comment'] and method == 'POST':
+                    return 'jira POST comment', 201, services.add_comment(task_key, body['body'])
+                if resource[2:] == ['transitions'] and method == 'POST':
+                    return 'jira POST transition', 204, services.transition(task_key, body['transition']['id'])
+                if resource[2:] == ['transitions']:
+                    return 'jira GET transitions', 200, {'transitions': [
+                        {'id': transition_id, 'name': name, 'to': {'name': name}}
+                        for transition_id, name in TRANSITIONS.items()
+                    ]}
+                return 'jira GET issue', 200, services.issues[task_key]
+
+        # GitHub
+        if parts[:1] == ['repos'] and len(parts) >= 3:
+            repository = f'{parts[1]}/{parts[2]}'
+            resource = parts[3:]
+            if not resource:
+                owner, name = parts[1], parts[2]
+                return 'github GET repo', 200, {
+                    'id': 1, 'name': name, 'full_name': repository, 'owner': {'login': owner},
+                    'url': f'{services.url}/repos/{repository}', 'default_branch': 'main',
+                }
+            if resource == ['pulls'] and method == 'POST':
+                return 'github POST pull', 201, services.create_pull(repository, body)
+            if resource == ['pulls']:
+                head = query.get('head', [''])[0].split(':')[-1]
+                pulls = [pull for pull in services.pulls.get(repository, []) if not head or pull['head']['ref'] == head]
+                return 'github GET pulls', 200, pulls
+            if resource[:1] == ['issues'] and resource[2:] == ['labels']:
+                labels = body['labels'] if isinstance(body, dict) else body
+                return 'github POST labels', 200, [{'name': label} for label in labels]
+            if resource[:1] == ['issues'] and resource[2:] == ['comments']:
+                return 'github POST comment', 201, {'id': 1, 'body': body['body']}
+
+        return f'{method} {path} (404)', 404, {'message': 'Not Found'}
+
+
+class FakeServicesServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, services: FakeServices, host: str = '127.0.0.1', port: int = 0) -> None:
+        super().__init__((host, port), FakeServicesHandler)
+        self.services = services
+        services.url = f'http://{host}:{self.server_address[1]}'
+
+
+def build_description(index: int, project: str) -> str:
+    return (
+        f"Tipo: Feature\n"
+        f"Projeto: {project}\n\n"
+        f"Descrição:\nCriar o endpoint de consulta número {index} do módulo de pedidos.\n\n"
+        f"Objetivo:\n- Expor os pedidos do cliente {index}\n\n"
+        f"Requisitos:\n- Paginação\n- Filtro por status\n\n"
+        f"Critérios de Aceitação:\n- Retorna 200 com a lista de pedidos"
+    )
+
+
+def build_issues(count: int, project: str = BENCH_PROJECT) -> List[Dict[str, Any]]:
+    """Gera issues sintéticas no formato retornado por /rest/api/2/issue."""
+    updated = format_jira_date(datetime(2024, 1, 1, tzinfo=timezone.utc))
+    return [{
+        'id': str(index),
+        'key': f'{project}-{index}',
+        'self': f'/rest/api/2/issue/{index}',
+        'fields': {
+            'summary': f'Endpoint de pedidos {index}',
+            'description': build_description(index, project),
+            'updated': updated,
+            'status': {'name': 'To Do'},
+            'comment': {'comments': [], 'total': 0, 'maxResults': 0, 'startAt': 0},
+        },
+    } for index in range(1, count + 1)]
+
+
+def load_fixtures(path: str) -> List[Dict[str, Any]]:
+    """Carrega issues gravadas (lista de payloads de /rest/api/2/issue ou {"issues": [...]})."""
+    with open(path, 'r', encoding='utf-8') as file:
+        data = json.load(file)
+    issues = data['issues'] if isinstance(data, dict) else data
+    for issue in issues:
+        issue['fields'].setdefault('comment', {'comments': [], 'total': 0, 'maxResults': 0, 'startAt': 0})
+    return issues
+
+
+def create_project_repo(workspace: str, project: str, file_count: int) -> Tuple[str, str]:
+    """Cria o repositório do projeto com arquivos sintéticos e um remote bare no lugar do GitHub."""
+    repository = f'bench/{project.lower()}'
+    remote_path = os.path.join(workspace, 'remotes', f'{repository}.git')
+    project_dir = os.path.join(workspace, 'projects', project)
+    Repo.init(remote_path, bare=True, initial_branch='main')
+    repo = Repo.init(project_dir, initial_branch='main')
+    with repo.config_writer() as writer:
+        writer.set_value('user', 'name', 'Benchmark')
+        writer.set_value('user', 'email', 'benchmark@localhost')
+
+    for index in range(file_count):
+        module_dir = os.path.join(project_dir, 'src', f'module_{index % 50}')
+        os.makedirs(module_dir, exist_ok=True)
+        with open(os.path.join(module_dir, f'orders_{index}.py'), 'w', encoding='utf-8') as file:
+            file.write(
+                f"class OrderService{index}:\n"
+                f"    def __init__(self, repository):\n"
+                f"        self.repository = repository\n\n"
+                f"    def list_orders(self, customer_id, status=None, page=0):\n"
+                f"        orders = self.repository.find_by_customer(customer_id)\n"
+                f"        if status:\n"
+                f"            orders = [order for order in orders if order.status == status]\n"
+                f"        return orders[page * 20:(page + 1) * 20]\n"
+            )
+    with open(os.path.join(project_dir, 'BENCHMARK.md'), 'w', encoding='utf-8') as file:
+        file.write('# Benchmark\n')
+    repo.git.add(A=True)
+    repo.index.commit('chore: estado inicial do benchmark')
+    repo.git.push(remote_path, 'main:main')
+    repo.git.remote('add', 'origin', remote_path)
+    repo.git.fetch('origin')
+    return project_dir, repository
+
+
+def build_config(base_config: Dict[str, Any], workspace: str, projects: Dict[str, Tuple[str, str]], workers: int) -> Dict[str, Any]:
+    """Copia o config.yaml do projeto trocando apenas endereços, caminhos e projetos."""
+    config = json.loads(json.dumps(base_config))
+    config['github']['base_branch'] = 'main'
+    config.setdefault('git', {})['remote_url_template'] = os.path.join(workspace, 'remotes', '{repository}.git')
+    config['state'] = {'path': os.path.join(workspace, 'state.db')}
+    config['metrics'] = {'enabled': True, 'port': 0}
+    config['tracing'] = {'enabled': True, 'jsonl_path': os.path.join(workspace, 'traces.jsonl'), 'otlp_endpoint': ''}
+    config['aider'].setdefault('completion_cache', {})['directory'] = os.path.join(workspace, 'completions')
+    config['aider'].setdefault('tags_cache', {})['directory'] = os.path.join(workspace, 'tags')
+    config['aider'].setdefault('file_selection', {})['cache_dir'] = os.path.join(workspace, 'file_index')
+    # O modelo simulado não tem limite de requisições
+    config['openrouter']['rate_limits'] = {}
+    config.setdefault('write_back', {})['transitions'] = {'pr_created': 'Code Review', 'corrections_applied': 'Code Review'}
+    workers_config = config.setdefault('workers', {})
+    workers_config['worktrees_dir'] = os.path.join(workspace, 'worktrees')
+    if workers:
+        workers_config['max_workers'] = workers
+    config['projects'] = {
+        project: {'directory': directory, 'description': f'Projeto {project} do benchmark', 'repository': repository}
+        for project, (directory, repository) in projects.items()
+    }
+    return config
+
+
+def summarize_traces(jsonl_path: str) -> Dict[str, int]:
+    totals: Counter = Counter()
+    with open(jsonl_path, 'r', encoding='utf-8') as file:
+        for line in file:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if record['name'] == 'aider.run':
+                totals['aider runs'] += 1
+                totals['tokens sent'] += record['attributes'].get('tokens_sent', 0)
+                totals['tokens received'] += record['attributes'].get('tokens_received', 0)
+                totals['cache hits'] += int(bool(record['attributes'].get('cache_hit')))
+            totals['http retries'] += record['attributes'].get('retries', 0)
+    return dict(totals)
+
+
+def run_phase(name: str, task_keys: List[str], worker, flush) -> Tuple[float, int]:
+    print(f"\n=== Benchmark: {name} ({len(task_keys)} tasks) ===")
+    started_at = time.perf_counter()
+    results = worker(task_keys)
+    # Os comentários e transições enviados em segundo plano fazem parte da fase
+    flush()
+    elapsed = time.perf_counter() - started_at
+    return elapsed, sum(1 for result in results.values() if result)
+
+
+def run_benchmark(tasks: int = 10, repo_size: str = 'small', corrections: int = 0, workers: int = 0,
+                  api_latency_ms: int = 0, llm_latency_ms: int = 0, fixtures: Optional[str] = None,
+                  keep: bool = False, config_path: str = 'config.yaml') -> None:
+    """Executa o pipeline de ponta a ponta contra Jira, GitHub e modelo simulados.
+
+    Com `workers` = 0 as tasks passam por `process_task`/`process_corrections` em sequência no
+    checkout do projeto; com `workers` > 0 usam o pool de workers com worktrees.
+    """
+    # O litellm não deve buscar a tabela de preços na rede
+    os.environ['LITELLM_LOCAL_MODEL_COST_MAP'] = 'True'
+    from main import TaskToCode
+
+    with open(config_path, 'r') as file:
+        base_config = yaml.safe_load(file)
+
+    issues = load_fixtures(fixtures) if fixtures else build_issues(tasks)
+    services = FakeServices(issues, api_latency_ms / 1000)
+    server = FakeServicesServer(services)
+    threading.Thread(target=server.serve_forever, name='fake-services', daemon=True).start()
+
+    workspace = tempfile.mkdtemp(prefix='task-to-code-bench-')
+    original_dir = os.getcwd()
+    try:
+        project_names = sorted({
+            match.group(1) for issue in issues
+            if (match := PROJECT_PATTERN.search(issue['fields'].get('description') or ''))
+        })
+        print(f"Criando {len(project_names)} repositório(s) com {REPO_SIZES[repo_size]} arquivos em {workspace}")
+        projects = {project: create_project_repo(workspace, project, REPO_SIZES[repo_size]) for project in project_names}
+        with open(os.path.join(workspace, 'config.yaml'), 'w') as file:
+            yaml.safe_dump(build_config(base_config, workspace, projects, workers), file,
+                           allow_unicode=True, sort_keys=False)
+
+        os.environ.update({
+            'JIRA_URL': services.url,
+            'JIRA_EMAIL': 'benchmark@localhost',
+            'JIRA_API_TOKEN': 'benchmark',
+            'GITHUB_USER': 'benchmark',
+            'GITHUB_TOKEN': 'benchmark',
+            'OPENROUTER_API_KEY': 'benchmark',
+        })
+        os.chdir(workspace)
+        task_to_code = TaskToCode()
+        # GitHub simulado e modelo determinístico no lugar dos serviços reais
+        task_to_code.github_handler.api_url = services.url
+        router = task_to_code.aider_handler.router
+        for candidate in router.candidates:
+            model = router.get_model(candidate['name'])
+            model.edit_format = 'diff'
+            model.extra_params = {**(model.extra_params or {}), 'mock_response': STUB_EDIT}
+            if llm_latency_ms:
+                model.extra_params['mock_delay'] = llm_latency_ms / 1000
+
+        task_keys = [issue['key'] for issue in issues]
+        pool = TaskWorkerPool(task_to_code) if workers else None
+
+        def implement(keys: List[str]) -> Dict[str, Optional[str]]:
+            if pool:
+                return pool.run(keys)
+            return {key: run_in_checkout(task_to_code, key, None) for key in keys}
+
+        def apply(keys: List[str]) -> Dict[str, Optional[str]]:
+            if pool:
+                return pool.run_corrections(keys, datetime.min)
+            return {key: run_in_checkout(task_to_code, key, f'feature/{key}') for key in keys}
+
+        implement_time, prs = run_phase('implementação', task_keys, implement, task_to_code.write_back.flush)
+
+        corrections_time, corrected = 0.0, 0
+        if corrections:
+            # Thread de correções adicionada depois dos PRs, como faria um revisor
+            for task_key in task_keys:
+                for index in range(corrections):
+                    services.add_comment(
+                        task_key, f"[CORREÇÃO] Ajustar o item {index + 1}: validar o status informado no filtro "
+                        f"de orders_{index}.py",
+                        author='Revisor'
+                    )
+            corrections_time, corrected = run_phase('correções', task_keys, apply, task_to_code.write_back.flush)
+
+        tracer.flush()
+        print_report(task_to_code.config, len(task_keys), repo_size, corrections, workers,
+                     implement_time, prs, corrections_time, corrected, services)
+    finally:
+        os.chdir(original_dir)
+        server.shutdown()
+        if keep:
+            print(f"Workspace mantido em {workspace}")
+        else:
+            shutil.rmtree(workspace, ignore_errors=True)
+
+
+def run_in_checkout(task_to_code: Any, task_key: str, branch: Optional[str]) -> Optional[str]:
+    """Modo sequencial: prepara o checkout do projeto como o usuário faria antes de cada task."""
+    # Um ciclo por task, como no modo interativo; a busca abaixo é reaproveitada pelo pipeline
+    task_to_code.jira_handler.begin_cycle()
+    task = task_to_code.jira_handler.get_task(task_key)
+    project_dir = task_to_code.get_project_dir(task['project'])
+    repo = task_to_code.git_service.get_repo(project_dir)
+    if branch:
+        repo.git.checkout(branch)
+        return task_to_code.process_corrections(task_key)
+    repo.git.checkout('--detach', 'origin/main')
+    return task_to_code.process_task(task_key)
+
+
+def print_report(config: Dict[str, Any], tasks: int, repo_size: str, corrections: int, workers: int,
+                 implement_time: float, prs: int, corrections_time: float, corrected: int,
+                 services: FakeServices) -> None:
+    print("\n=== Resultado do benchmark ===")
+    print(f"Tasks: {tasks} | Repositório: {repo_size} ({REPO_SIZES[repo_size]} arquivos) | "
+          f"Correções por task: {corrections} | Workers: {workers or 'sequencial'}")
+    print(f"Implementação: {implement_time:.1f}s, {prs} PRs, {tasks / implement_time * 60:.1f} tasks/min")
+    if corrections:
+        print(f"Correções: {corrections_time:.1f}s, {corrected} PRs atualizados, "
+              f"{tasks / corrections_time * 60:.1f} tasks/min")
+
+    print("\nLatência por etapa:")
+    print_stage_report(config['tracing']['jsonl_path'])
+
+    print("\nChamadas de API:")
+    for route, count in sorted(services.calls.items()):
+        print(f"  {route:<26}{count:>8}")
+    for name, value in summarize_traces(config['tracing']['jsonl_path']).items():
+        print(f"  {name:<26}{value:>8}")
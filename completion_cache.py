@@ -0,0 +1,211 @@
+import atexit
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional
+
+from git import Repo
+
+from type_definitions import CachedCompletion
+
+# Intervalo (s) entre gravações dos contadores em stats.json
+STATS_FLUSH_INTERVAL = 30
+# Intervalo (s) entre varreduras para remover entradas expiradas
+EXPIRE_INTERVAL = 60 * 60
+# Fração do limite de tamanho que resta após uma limpeza, para não varrer o cache a cada escrita
+EVICT_TARGET = 0.8
+
+
+class CompletionCache:
+    """Cache em disco das execuções do Aider, endereçado pelo conteúdo da requisição.
+
+    Guarda o diff produzido por cada execução para que requisições idênticas (mesmo modelo,
+    temperatura, prompt, commit base e arquivos) reapliquem o patch sem chamar o LLM. Os contadores
+    ficam em memória e vão para stats.json periodicamente; o diretório só é varrido quando o tamanho
+    acumulado passa de `max_size_mb` ou a cada `EXPIRE_INTERVAL` segundos.
+    """
+
+    def __init__(self, directory: str, max_size_mb: int = 512, max_age_days: int = 30) -> None:
+        self.directory = directory
+        self.max_bytes = max_size_mb * 1024 * 1024
+        self.max_age = max_age_days * 24 * 60 * 60
+        self.stats_file = os.path.join(directory, 'stats.json')
+        self.lock = threading.Lock()
+        self._evict_lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.stats: Dict[str, int] = self.load_stats()
+        # Contadores ainda não gravados (somados ao arquivo, que pode ser compartilhado entre processos)
+        self._pending: Dict[str, int] = {}
+        self._last_flush = time.monotonic()
+        # Tamanho das entradas, conhecido após a primeira varredura
+        self._size: Optional[int] = None
+        self._last_evict = 0.0
+        atexit.register(self.flush_stats)
+
+    @staticmethod
+    def build_key(model: str, temperature: float, prompt: str, base_sha: str, files: List[str]) -> str:
+        payload = json.dumps({
+            'model': model,
+            'temperature': temperature,
+            'prompt': prompt,
+            'base_sha': base_sha,
+            'files': sorted(files),
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get_path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f'{key}.json')
+
+    def load_stats(self) -> Dict[str, int]:
+        try:
+            with open(self.stats_file, 'r', encoding='utf-8') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+
+    def count(self, name: str, amount: int = 1) -> None:
+        with self.lock:
+            self.stats[name] = self.stats.get(name, 0) + amount
+            self._pending[name] = self._pending.get(name, 0) + amount
+            due = time.monotonic() - self._last_flush >= STATS_FLUSH_INTERVAL
+        if due:
+            self.flush_stats()
+
+    def flush_stats(self) -> None:
+        """Soma os contadores pendentes aos de stats.json."""
+        with self.lock:
+            self._last_flush = time.monotonic()
+            # Sem pendências ou com o diretório já removido (ex: workspace temporário do benchmark)
+            if not self._pending or not os.path.isdir(self.directory):
+                return
+            stats = self.load_stats()
+            for name, amount in self._pending.items():
+                stats[name] = stats.get(name, 0) + amount
+            tmp_path = f'{self.stats_file}.tmp-{os.getpid()}'
+            try:
+                with open(tmp_path, 'w', encoding='utf-8') as file:
+                    json.dump(stats, file)
+                os.replace(tmp_path, self.stats_file)
+            except OSError as e:
+                print(f"Erro ao gravar as estatísticas do cache de completions: {e}")
+                return
+            self._pending.clear()
+
+    def read(self, key: str) -> Optional[CachedCompletion]:
+        path = self.get_path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                entry: CachedCompletion = json.load(file)
+        except (OSError, ValueError):
+            return None
+
+        if time.time() - entry['created_at'] > self.max_age:
+            self._remove(path)
+            return None
+
+        # Atualiza o mtime para a política LRU
+        os.utime(path)
+        return entry
+
+    def get(self, key: str) -> Optional[CachedCompletion]:
+        return self.get_first([key])
+
+    def get_first(self, keys: List[str]) -> Optional[CachedCompletion]:
+        """Primeira entrada encontrada entre as chaves, contada como uma única consulta."""
+        for key in keys:
+            entry = self.read(key)
+            if entry:
+                self.count('hits')
+                return entry
+        self.count('misses')
+        return None
+
+    def put(self, key: str, response: str, diff: str, model: str) -> None:
+        path = self.get_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        entry: CachedCompletion = {'response': response, 'diff': diff, 'model': model, 'created_at': time.time()}
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(entry, file)
+        os.replace(tmp_path, path)
+        self.count('stores')
+
+        with self.lock:
+            if self._size is not None:
+                self._size += os.path.getsize(path)
+            needs_scan = (
+                self._size is None or self._size > self.max_bytes
+                or time.monotonic() - self._last_evict >= EXPIRE_INTERVAL
+            )
+        if needs_scan:
+            self.evict()
+
+    def evict(self) -> None:
+        """Remove entradas expiradas e, acima do limite, as menos usadas até `EVICT_TARGET` do tamanho."""
+        # Uma varredura por vez; as escritas concorrentes não precisam esperar por ela
+        if not self._evict_lock.acquire(blocking=False):
+            return
+        try:
+            entries = []
+            now = time.time()
+            for root, _, files in os.walk(self.directory):
+                for name in files:
+                    if not name.endswith('.json') or name == 'stats.json':
+                        continue
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, path))
+
+            limit = self.max_bytes
+            if sum(size for _, size, _ in entries) > self.max_bytes:
+                limit = int(self.max_bytes * EVICT_TARGET)
+            evicted = 0
+            total_size = 0
+            for mtime, size, path in sorted(entries, reverse=True):
+                if now - mtime > self.max_age or total_size + size > limit:
+                    self._remove(path)
+                    evicted += 1
+                else:
+                    total_size += size
+            with self.lock:
+                self._size = total_size
+                self._last_evict = time.monotonic()
+            if evicted:
+                self.count('evictions', evicted)
+        finally:
+            self._evict_lock.release()
+
+    def _remove(self, path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    @staticmethod
+    def get_diff(repo: Repo, base_sha: str) -> str:
+        """Diff entre o commit base e o estado atual (commits do Aider e alterações não commitadas)."""
+        return repo.git.diff('--binary', base_sha)
+
+    @staticmethod
+    def apply_diff(repo: Repo, diff: str, message: str) -> None:
+        """Reaplica o patch salvo e cria o commit correspondente."""
+        with tempfile.NamedTemporaryFile('w', suffix='.patch', delete=False, encoding='utf-8') as file:
+            file.write(diff if diff.endswith('\n') else f'{diff}\n')
+            patch_path = file.name
+        try:
+            repo.git.apply('--index', '--binary', patch_path)
+        finally:
+            os.remove(patch_path)
+        repo.index.commit(message)
+
+    def report(self) -> str:
+        hits, misses = self.stats.get('hits', 0), self.stats.get('misses', 0)
+        total = hits + misses
+        ratio = hits / total * 100 if total else 0.0
+        return f"Cache de completions: {hits} acertos, {misses} falhas ({ratio:.0f}% de acerto)"
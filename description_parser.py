@@ -0,0 +1,119 @@
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import ftfy
+
+from type_definitions import ParsedDescription, TaskPattern
+
+# Campos comuns a todos os padrões de task
+BASE_FIELDS = ['Tipo', 'Projeto', 'Descrição']
+
+# Descrições mantidas no cache de parse
+PARSE_CACHE_SIZE = 1024
+
+
+def match_task_pattern(task_patterns: List[TaskPattern], task_type: str) -> Optional[Tuple[int, TaskPattern]]:
+    """Padrão de `jira.task_patterns` do tipo da task, pelo nome ou por um dos `aliases` (ex: `Bug` → `bugfix`)."""
+    task_type = task_type.strip().lower()
+    if not task_type:
+        return None
+    for index, pattern in enumerate(task_patterns):
+        names = [pattern['name']] + pattern.get('aliases', [])
+        if task_type in (name.strip().lower() for name in names):
+            return index, pattern
+    return None
+
+
+class DescriptionParser:
+    """Extrai e valida os campos da descrição a partir dos nomes declarados em `jira.task_patterns`.
+
+    Só os campos declarados (e os comuns `Tipo`, `Projeto` e `Descrição`) são cabeçalhos; outras
+    linhas com `:` (URLs, código) fazem parte do conteúdo. O resultado é guardado pelo hash da
+    descrição, então issues que mudam só nos comentários não repetem o ftfy nem o parse.
+    """
+
+    def __init__(self, task_patterns: List[TaskPattern]) -> None:
+        self.task_patterns = task_patterns
+        names: Dict[str, str] = {}
+        for name in BASE_FIELDS + [field['name'] for pattern in task_patterns for field in pattern['fields']]:
+            names.setdefault(name.lower(), name)
+        self.field_names = names
+        # Nomes mais longos primeiro, para `Descrição do Bug` não ser lido como `Descrição`
+        alternatives = '|'.join(re.escape(name) for name in sorted(names.values(), key=len, reverse=True))
+        self.header_pattern = re.compile(
+            rf'^(?:h[1-6]\.\s*|#+\s*)?[*_]*\s*({alternatives})\s*[*_]*\s*:\s*[*_]*\s*(.*?)\s*$',
+            re.IGNORECASE
+        )
+        self._cache: 'OrderedDict[str, ParsedDescription]' = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    def parse(self, raw_description: str) -> ParsedDescription:
+        key = hashlib.sha256(raw_description.encode('utf-8')).hexdigest()
+        with self._cache_lock:
+            cached = self._cache.get(key)
+            if cached:
+                self._cache.move_to_end(key)
+                return cached
+
+        description = ftfy.fix_text(raw_description)
+        fields = self.parse_fields(description)
+        parsed: ParsedDescription = {
+            'description': description,
+            'fields': fields,
+            'errors': self.validate(fields),
+        }
+        with self._cache_lock:
+            self._cache[key] = parsed
+            if len(self._cache) > PARSE_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return parsed
+
+    def parse_fields(self, description: str) -> Dict[str, str]:
+        """Extrai os campos da descrição da task."""
+        fields: Dict[str, str] = {}
+        current_field = None
+        current_content: List[str] = []
+        in_code = False
+
+        for line in description.split('\n'):
+            line = line.strip()
+            # Blocos de código nunca contêm cabeçalhos
+            if line.startswith('```') or line.startswith('{code') or line.startswith('{noformat'):
+                in_code = not in_code
+            match = None if in_code else self.header_pattern.match(line)
+            if match:
+                if current_field:
+                    fields[current_field] = '\n'.join(current_content).strip()
+                current_field = self.field_names[match.group(1).lower()]
+                current_content = [match.group(2)] if match.group(2) else []
+            elif current_field and line:
+                current_content.append(line)
+
+        if current_field:
+            fields[current_field] = '\n'.join(current_content).strip()
+        return {name: value for name, value in fields.items() if value}
+
+    def validate(self, fields: Dict[str, str]) -> List[str]:
+        """Lista os problemas da task em relação ao padrão do seu tipo."""
+        errors = [f"Campo obrigatório ausente: {name}" for name in ('Tipo', 'Projeto') if not fields.get(name)]
+        if not fields.get('Tipo') or not self.task_patterns:
+            return errors
+
+        matched = match_task_pattern(self.task_patterns, fields['Tipo'])
+        if not matched:
+            names = ', '.join(
+                name for pattern in self.task_patterns for name in [pattern['name']] + pattern.get('aliases', [])
+            )
+            errors.append(f"Tipo '{fields['Tipo']}' não corresponde a nenhum padrão ({names})")
+            return errors
+
+        _, pattern = matched
+        errors.extend(
+            f"Campo obrigatório ausente: {field['name']}"
+            for field in pattern['fields']
+            if field.get('required') and not fields.get(field['name'])
+        )
+        return errors
@@ -0,0 +1,285 @@
+import json
+import math
+import os
+import re
+import threading
+import unicodedata
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from git import Repo
+
+from type_definitions import Task
+
+IDENTIFIER_PATTERN = re.compile(r'[A-Za-z_][A-Za-z0-9_]+')
+CAMEL_CASE_PATTERN = re.compile(r'[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|[0-9]+')
+
+# Palavras frequentes nas descrições das tasks que não ajudam a escolher arquivos
+STOPWORDS = {
+    'the', 'and', 'for', 'with', 'from', 'that', 'this', 'para', 'com', 'que', 'uma', 'dos', 'das',
+    'por', 'como', 'deve', 'ser', 'nos', 'nas', 'seu', 'sua', 'ao', 'aos', 'quando', 'onde', 'sem',
+    'mais', 'import', 'return', 'public', 'private', 'static', 'void', 'class', 'def', 'self'
+}
+
+# Peso dos termos vindos do caminho do arquivo em relação aos do conteúdo
+PATH_WEIGHT = 3
+
+
+def tokenize(text: str) -> List[str]:
+    """Quebra o texto em termos normalizados (camelCase, snake_case, sem acentos)."""
+    text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii')
+    terms = []
+    for identifier in IDENTIFIER_PATTERN.findall(text):
+        for part in identifier.split('_'):
+            for term in CAMEL_CASE_PATTERN.findall(part):
+                term = term.lower()
+                if len(term) >= 3 and term not in STOPWORDS:
+                    terms.append(term)
+    return terms
+
+
+class ProjectIndex:
+    """Índice invertido (BM25) dos arquivos de um projeto, atualizado por blob do git.
+
+    Os termos de cada arquivo são salvos em disco com o blob, então ao reiniciar só os
+    arquivos modificados desde a última atualização são relidos.
+    """
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path = path
+        self.blobs: Dict[str, str] = {}
+        self.doc_terms: Dict[str, Counter] = {}
+        self.doc_lengths: Dict[str, int] = {}
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.lock = threading.Lock()
+        self.load()
+
+    def load(self) -> None:
+        if not self.path:
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as file:
+                docs = json.load(file)
+        except (OSError, ValueError):
+            return
+        for rel_fname, entry in docs.items():
+            self.add_terms(rel_fname, entry['blob'], Counter(entry['terms']))
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        docs = {
+            rel_fname: {'blob': blob, 'terms': self.doc_terms[rel_fname]}
+            for rel_fname, blob in self.blobs.items()
+        }
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(docs, file)
+        os.replace(tmp_path, self.path)
+
+    def remove(self, rel_fname: str) -> None:
+        for term in self.doc_terms.pop(rel_fname, {}):
+            postings = self.postings.get(term)
+            if postings is not None:
+                postings.pop(rel_fname, None)
+                if not postings:
+                    del self.postings[term]
+        self.doc_lengths.pop(rel_fname, None)
+        self.blobs.pop(rel_fname, None)
+
+    def add(self, rel_fname: str, blob: str, content: str) -> None:
+        terms = Counter(tokenize(content))
+        for term in tokenize(rel_fname):
+            terms[term] += PATH_WEIGHT
+        self.add_terms(rel_fname, blob, terms)
+
+    def add_terms(self, rel_fname: str, blob: str, terms: Counter) -> None:
+        self.blobs[rel_fname] = blob
+        self.doc_terms[rel_fname] = terms
+        self.doc_lengths[rel_fname] = sum(terms.values())
+        for term, frequency in terms.items():
+            self.postings.setdefault(term, {})[rel_fname] = frequency
+
+    def search(self, query_terms: List[str], k1: float = 1.5, b: float = 0.75) -> List[Tuple[str, float]]:
+        if not self.doc_lengths:
+            return []
+        total_docs = len(self.doc_lengths)
+        avg_length = sum(self.doc_lengths.values()) / total_docs
+        scores: Dict[str, float] = {}
+        for term in set(query_terms):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (total_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for rel_fname, frequency in postings.items():
+                length_norm = k1 * (1 - b + b * self.doc_lengths[rel_fname] / avg_length)
+                scores[rel_fname] = scores.get(rel_fname, 0.0) + idf * frequency * (k1 + 1) / (frequency + length_norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+class FileSelector:
+    """Escolhe os arquivos relevantes para uma task antes de criar o coder do Aider."""
+
+    def __init__(self, config: dict) -> None:
+        selection_config = config['aider'].get('file_selection', {})
+        self.enabled = selection_config.get('enabled', True)
+        self.max_editable_files = selection_config.get('max_editable_files', 8)
+        self.max_read_only_files = selection_config.get('max_read_only_files', 12)
+        self.max_file_size = selection_config.get('max_file_size', 200_000)
+        self.cache_dir = selection_config.get('cache_dir', '.task_to_code/file_index')
+        self._indexes: Dict[str, ProjectIndex] = {}
+        self._indexes_lock = threading.Lock()
+
+    def get_index(self, project: str) -> ProjectIndex:
+        with self._indexes_lock:
+            if project not in self._indexes:
+                self._indexes[project] = ProjectIndex(os.path.join(self.cache_dir, f'{project}.json'))
+            return self._indexes[project]
+
+    def refresh_index(self, project: str, project_dir: str) -> ProjectIndex:
+        """Reindexa apenas os arquivos cujo blob mudou desde a última atualização."""
+        index = self.get_index(project)
+        # `ls-files -s` traz o hash do blob, o que permite reaproveitar o índice entre worktrees
+        entries = Repo(project_dir).git.ls_files('-s', '-z').split('\0')
+        blobs = {}
+        for entry in filter(None, entries):
+            metadata, rel_fname = entry.split('\t', 1)
+            blobs[rel_fname] = metadata.split()[1]
+
+        with index.lock:
+            removed = set(index.blobs) - set(blobs)
+            for rel_fname in removed:
+                index.remove(rel_fname)
+            updated = 0
+            for rel_fname, blob in blobs.items():
+                if index.blobs.get(rel_fname) == blob:
+                    continue
+                index.remove(rel_fname)
+                content = self.read_file(os.path.join(project_dir, rel_fname))
+                if content is not None:
+                    index.add(rel_fname, blob, content)
+                    updated += 1
+            if removed or updated:
+                index.save()
+        if updated:
+            print(f"Índice de arquivos de {project}: {updated} arquivos (re)indexados")
+        return index
+
+    def read_file(self, path: str) -> Optional[str]:
+        try:
+            if os.path.getsize(path) > self.max_file_size:
+                return None
+            with open(path, 'rb') as file:
+                data = file.read()
+        except OSError:
+            return None
+        # Ignora arquivos binários
+        if b'\0' in data[:8192]:
+            return None
+        return data.decode('utf-8', errors='ignore')
+
+    def build_query(self, task: Task) -> List[str]:
+        """Monta a consulta com título, descrição e campos da task."""
+        parts = [task['title'], task['description']]
+        parts.extend(str(value) for value in task['fields'].values())
+        return tokenize('\n'.join(parts))
+
+    def get_branch_changes(self, project_dir: str, base_ref: str) -> List[str]:
+        """Arquivos alterados pela branch desde o ponto em que saiu da base (sem os removidos)."""
+        output = Repo(project_dir).git.diff('--name-only', '--diff-filter=d', '-z', f'{base_ref}...HEAD')
+        return [rel_fname for rel_fname in output.split('\0') if rel_fname]
+
+    def get_mentioned_files(self, index: ProjectIndex, texts: List[str]) -> List[str]:
+        """Arquivos do projeto citados nos textos pelo caminho ou por um nome de arquivo único."""
+        words = set()
+        for text in texts:
+            for word in text.split():
+                words.add(word.strip('"\'`*_()[]<>').rstrip(',.!;:?').replace('\\', '/'))
+
+        by_basename: Dict[str, List[str]] = {}
+        with index.lock:
+            rel_fnames = list(index.blobs)
+        for rel_fname in rel_fnames:
+            by_basename.setdefault(os.path.basename(rel_fname), []).append(rel_fname)
+
+        mentioned = []
+        for rel_fname in rel_fnames:
+            basename = os.path.basename(rel_fname)
+            if rel_fname in words or (basename in words and '.' in basename and len(by_basename[basename]) == 1):
+                mentioned.append(rel_fname)
+        return sorted(mentioned)
+
+    def select_correction_files(self, task: Task, corrections: List[Dict], project_dir: str,
+                                base_ref: str) -> Tuple[List[str], List[str]]:
+        """Restringe as correções aos arquivos do diff da branch e aos citados nos comentários.
+
+        Os citados são sempre editáveis; os do diff são ordenados pelo texto das correções.
+        Retorna listas vazias se não houver diff nem arquivos citados.
+        """
+        if not self.enabled:
+            return [], []
+        try:
+            index = self.refresh_index(task['project'], project_dir)
+            changed = self.get_branch_changes(project_dir, base_ref)
+        except Exception as e:
+            print(f"Erro ao obter os arquivos alterados pela branch: {e}")
+            return [], []
+
+        mentioned = self.get_mentioned_files(index, [correction['body'] for correction in corrections])
+        with index.lock:
+            scores = dict(index.search(tokenize('\n'.join(correction['body'] for correction in corrections))))
+        ranked = sorted(
+            (rel_fname for rel_fname in changed if rel_fname not in mentioned),
+            key=lambda rel_fname: scores.get(rel_fname, 0.0), reverse=True
+        )
+
+        editable = mentioned + ranked[:max(0, self.max_editable_files - len(mentioned))]
+        read_only = [rel_fname for rel_fname in ranked if rel_fname not in editable][:self.max_read_only_files]
+
+        print(f"\n=== Arquivos das correções de {task['key']} ({len(changed)} alterados pela branch) ===")
+        for rel_fname in editable:
+            print(f"[editável] {rel_fname}{' (citado)' if rel_fname in mentioned else ''}")
+        for rel_fname in read_only:
+            print(f"[leitura] {rel_fname}")
+        print("================================\n")
+
+        return (
+            [os.path.join(project_dir, rel_fname) for rel_fname in editable],
+            [os.path.join(project_dir, rel_fname) for rel_fname in read_only],
+        )
+
+    def select_files(self, task: Task, project_dir: str) -> Tuple[List[str], List[str]]:
+        """Retorna (arquivos editáveis, arquivos somente leitura) em caminhos absolutos."""
+        if not self.enabled:
+            return [], []
+        try:
+            index = self.refresh_index(task['project'], project_dir)
+        except Exception as e:
+            print(f"Erro ao indexar arquivos do projeto: {e}")
+            return [], []
+
+        with index.lock:
+            ranked = index.search(self.build_query(task))
+
+        editable: List[str] = []
+        read_only: List[str] = []
+        for rel_fname, _ in ranked:
+            if len(editable) < self.max_editable_files:
+                editable.append(rel_fname)
+            elif len(read_only) < self.max_read_only_files:
+                read_only.append(rel_fname)
+            else:
+                break
+
+        print(f"\n=== Arquivos selecionados para {task['key']} ===")
+        for rel_fname in editable:
+            print(f"[editável] {rel_fname}")
+        for rel_fname in read_only:
+            print(f"[leitura] {rel_fname}")
+        print("================================\n")
+
+        return (
+            [os.path.join(project_dir, rel_fname) for rel_fname in editable],
+            [os.path.join(project_dir, rel_fname) for rel_fname in read_only],
+        )
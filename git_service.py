@@ -0,0 +1,121 @@
+import base64
+import os
+import re
+import threading
+import time
+from typing import Dict, Optional
+
+from git import GitCommandError, Repo
+
+from instrumentation import tracer
+
+# Linha final do progresso do push, ex: "Writing objects: 100% (3/3), 1.20 KiB | 1.20 MiB/s, done."
+PUSH_BYTES_PATTERN = re.compile(r'Writing objects: .*?, ([\d.]+) (bytes|KiB|MiB|GiB)')
+UNIT_BYTES = {'bytes': 1, 'KiB': 1024, 'MiB': 1024 ** 2, 'GiB': 1024 ** 3}
+
+
+class GitService:
+    """Operações git compartilhadas entre as tasks.
+
+    Mantém um objeto Repo por diretório, consulta branches sem listar todas as refs,
+    autentica via cabeçalho HTTP em memória (sem gravar o token no remote) e limita
+    os fetches da branch base a um por intervalo para todo o repositório.
+    """
+
+    def __init__(self, github_user: str, github_token: str, config: Optional[dict] = None) -> None:
+        git_config = (config or {}).get('git', {})
+        self.fetch_interval = git_config.get('fetch_interval', 60)
+        self.fetch_depth = git_config.get('fetch_depth', 0)
+        self.remote_url_template = git_config.get('remote_url_template', 'https://github.com/{repository}.git')
+        self.github_user = github_user
+        self.github_token = github_token
+        self._repos: Dict[str, Repo] = {}
+        self._repos_lock = threading.Lock()
+        # Último fetch e lock por repositório (diretório git comum aos worktrees)
+        self._last_fetch: Dict[str, float] = {}
+        self._fetch_locks: Dict[str, threading.Lock] = {}
+
+    def get_repo(self, path: str) -> Repo:
+        """Retorna o objeto Repo do diretório, criado uma única vez."""
+        path = os.path.abspath(path)
+        with self._repos_lock:
+            if path not in self._repos:
+                self._repos[path] = Repo(path)
+            return self._repos[path]
+
+    def forget_repo(self, path: str) -> None:
+        """Descarta o Repo de um diretório removido (ex: worktree de uma task)."""
+        with self._repos_lock:
+            self._repos.pop(os.path.abspath(path), None)
+
+    def branch_exists(self, repo: Repo, branch_name: str) -> bool:
+        """Verifica a branch local diretamente pela ref, sem listar todas as referências."""
+        try:
+            repo.git.rev_parse('--verify', '--quiet', f'refs/heads/{branch_name}')
+            return True
+        except GitCommandError:
+            return False
+
+    def get_auth_env(self) -> Dict[str, str]:
+        """Variáveis de ambiente que injetam o cabeçalho de autenticação apenas no comando git."""
+        credentials = base64.b64encode(f'{self.github_user}:{self.github_token}'.encode()).decode()
+        return {
+            'GIT_CONFIG_COUNT': '1',
+            'GIT_CONFIG_KEY_0': 'http.https://github.com/.extraheader',
+            'GIT_CONFIG_VALUE_0': f'AUTHORIZATION: basic {credentials}',
+            'GIT_TERMINAL_PROMPT': '0',
+        }
+
+    def get_remote_url(self, repository: str) -> str:
+        return self.remote_url_template.format(repository=repository)
+
+    def push(self, repo: Repo, repository: str, refspec: str) -> None:
+        """Faz push para o repositório do GitHub autenticando em memória."""
+        with tracer.span('git.push', repository=repository, refspec=refspec) as span:
+            _, _, stderr = repo.git.push(
+                '--progress', self.get_remote_url(repository), refspec,
+                env=self.get_auth_env(), with_extended_output=True
+            )
+            matches = PUSH_BYTES_PATTERN.findall(stderr)
+            if matches:
+                size, unit = matches[-1]
+                span.set_attribute('bytes_pushed', int(float(size) * UNIT_BYTES[unit]))
+            else:
+                span.set_attribute('bytes_pushed', 0)
+
+    def delete_remote_branch(self, repo: Repo, repository: str, branch_name: str) -> None:
+        self.push(repo, repository, f':refs/heads/{branch_name}')
+
+    def _fetch_lock(self, key: str) -> threading.Lock:
+        with self._repos_lock:
+            return self._fetch_locks.setdefault(key, threading.Lock())
+
+    def fetch_base(self, repo: Repo, base_branch: str, force: bool = False) -> str:
+        """Atualiza apenas a branch base remota, no máximo uma vez por intervalo por repositório.
+
+        Retorna a referência remota (origin/<base>) para checkout ou criação de worktrees.
+        """
+        key = os.path.abspath(repo.common_dir)
+        # Tasks concorrentes aguardam o fetch em andamento em vez de disparar outro
+        with self._fetch_lock(key):
+            last_fetch = self._last_fetch.get(key, 0.0)
+            if force or time.monotonic() - last_fetch >= self.fetch_interval:
+                args = ['--no-tags', 'origin', f'+refs/heads/{base_branch}:refs/remotes/origin/{base_branch}']
+                if self.fetch_depth and repo.git.rev_parse('--is-shallow-repository') == 'true':
+                    args.insert(0, f'--depth={self.fetch_depth}')
+                repo.git.fetch(*args, env=self.get_auth_env())
+                self._last_fetch[key] = time.monotonic()
+        return f'origin/{base_branch}'
+
+    def fetch_all(self, repo: Repo) -> None:
+        """Atualiza todas as branches remotas (usado pela atualização em segundo plano dos mirrors)."""
+        key = os.path.abspath(repo.common_dir)
+        with self._fetch_lock(key):
+            repo.git.fetch('--no-tags', '--prune', 'origin', env=self.get_auth_env())
+            self._last_fetch[key] = time.monotonic()
+
+    def update_base(self, repo: Repo, base_branch: str) -> None:
+        """Faz checkout da branch base e avança até a versão remota (substitui o `git pull`)."""
+        remote_ref = self.fetch_base(repo, base_branch)
+        repo.git.checkout(base_branch)
+        repo.git.merge('--ff-only', remote_ref)
@@ -0,0 +1,163 @@
+import asyncio
+import random
+import threading
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Dict, Optional, TypeVar
+from urllib.parse import urlsplit
+
+import httpx
+
+from instrumentation import Span, tracer
+
+T = TypeVar('T')
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# As sessões do litellm são globais e configuradas uma única vez por processo
+_llm_sessions_configured = False
+_llm_sessions_lock = threading.Lock()
+
+
+def get_retry_after(response: httpx.Response) -> Optional[float]:
+    """Lê o cabeçalho Retry-After (segundos ou data HTTP)."""
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class AsyncHttpClient:
+    """Cliente HTTP assíncrono com pool de conexões compartilhado, limite por host e retries."""
+
+    def __init__(self, config: dict) -> None:
+        http_config = config.get('http', {})
+        self.max_retries = http_config.get('max_retries', 4)
+        self.backoff_base = http_config.get('backoff_base', 0.5)
+        self.backoff_max = http_config.get('backoff_max', 30.0)
+        self.per_host_limit = http_config.get('per_host_limit', 8)
+        self.client = httpx.AsyncClient(
+            timeout=http_config.get('timeout', 30.0),
+            limits=httpx.Limits(
+                max_connections=http_config.get('max_connections', 32),
+                max_keepalive_connections=http_config.get('max_keepalive_connections', 16),
+            ),
+        )
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+
+    def _host_limit(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(self.per_host_limit)
+        return self._host_limits[host]
+
+    def _backoff(self, attempt: int) -> float:
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    async def request(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        """Faz a requisição, repetindo em 429/5xx e erros de rede com backoff exponencial."""
+        attempt = 0
+        with tracer.span('http.request', method=method, host=urlsplit(url).netloc) as span:
+            while True:
+                try:
+                    async with self._host_limit(url):
+                        response = await self.client.request(method, url, **kwargs)
+                except httpx.TransportError as e:
+                    if attempt >= self.max_retries:
+                        raise
+                    delay = self._backoff(attempt)
+                    print(f"Erro de rede em {method} {url}: {e}. Nova tentativa em {delay:.1f}s")
+                else:
+                    span.set_attribute('status_code', response.status_code)
+                    if response.status_code not in RETRY_STATUS_CODES or attempt >= self.max_retries:
+                        response.raise_for_status()
+                        return response
+                    if response.status_code == 429:
+                        span.increment('rate_limited')
+                        if span.root is not span:
+                            span.root.increment('http_rate_limited')
+                    retry_after = get_retry_after(response)
+                    delay = min(self.backoff_max, retry_after) if retry_after is not None else self._backoff(attempt)
+                    print(f"{method} {url} retornou {response.status_code}. Nova tentativa em {delay:.1f}s")
+                attempt += 1
+                span.increment('retries')
+                if span.root is not span:
+                    span.root.increment('http_retries')
+                await asyncio.sleep(delay)
+
+    async def get_json(self, url: str, **kwargs: Any) -> Any:
+        response = await self.request('GET', url, **kwargs)
+        return response.json()
+
+    async def post_json(self, url: str, payload: Any, **kwargs: Any) -> Any:
+        response = await self.request('POST', url, json=payload, **kwargs)
+        return response.json() if response.content else None
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+
+class AsyncRuntime:
+    """Event loop em uma thread dedicada, compartilhado pelos handlers e pelas threads do pool.
+
+    Mantém um único AsyncHttpClient vivo, de forma que as conexões keep-alive sejam
+    reaproveitadas entre tasks.
+    """
+
+    def __init__(self, config: dict) -> None:
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name='async-runtime', daemon=True)
+        self.thread.start()
+        self.http = self.run(self._create_client(config))
+
+    @staticmethod
+    async def _create_client(config: dict) -> AsyncHttpClient:
+        return AsyncHttpClient(config)
+
+    def run(self, coroutine: Awaitable[T]) -> T:
+        """Executa a corrotina no loop compartilhado e aguarda o resultado.
+
+        A corrotina herda o span atual de quem chamou, então os spans abertos nela (ex: `http.request`)
+        ficam no trace da task.
+        """
+        return asyncio.run_coroutine_threadsafe(self._in_span(tracer.current_span(), coroutine), self.loop).result()
+
+    @staticmethod
+    async def _in_span(span: Optional[Span], coroutine: Awaitable[T]) -> T:
+        with tracer.use_span(span):
+            return await coroutine
+
+    def close(self) -> None:
+        self.run(self.http.aclose())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+
+
+def configure_llm_sessions(config: dict) -> None:
+    """Faz o litellm (usado pelo Aider) reaproveitar um pool de conexões keep-alive.
+
+    Chamadas seguintes não trocam as sessões, que podem estar em uso por outras execuções.
+    """
+    global _llm_sessions_configured
+    with _llm_sessions_lock:
+        if _llm_sessions_configured:
+            return
+        import litellm
+
+        http_config = config.get('http', {})
+        limits = httpx.Limits(
+            max_connections=http_config.get('max_connections', 32),
+            max_keepalive_connections=http_config.get('max_keepalive_connections', 16),
+        )
+        litellm.client_session = httpx.Client(limits=limits)
+        litellm.aclient_session = httpx.AsyncClient(limits=limits)
+        _llm_sessions_configured = True
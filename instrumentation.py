@@ -0,0 +1,245 @@
+import atexit
+import json
+import os
+import queue
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+from type_definitions import SpanRecord
+
+_current_span: ContextVar[Optional['Span']] = ContextVar('current_span', default=None)
+
+
+class Span:
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attributes: Dict[str, Any]) -> None:
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.status = 'ok'
+        self.start = time.time()
+        self._started_at = time.perf_counter()
+        self.duration_ms = 0.0
+        # Span raiz do trace (ex: task.process), que acumula os contadores das etapas de rede
+        self.root = self
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def increment(self, key: str, amount: int = 1) -> None:
+        self.attributes[key] = self.attributes.get(key, 0) + amount
+
+    def finish(self) -> None:
+        self.duration_ms = (time.perf_counter() - self._started_at) * 1000
+
+    def to_record(self) -> SpanRecord:
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start': self.start,
+            'duration_ms': round(self.duration_ms, 3),
+            'status': self.status,
+            'attributes': self.attributes,
+        }
+
+
+class JsonlExporter:
+    """Grava os spans finalizados em um arquivo JSONL."""
+
+    def __init__(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path = path
+        self.lock = threading.Lock()
+
+    def export(self, records: List[SpanRecord]) -> None:
+        with self.lock, open(self.path, 'a', encoding='utf-8') as file:
+            for record in records:
+                file.write(json.dumps(record, default=str) + '\n')
+
+
+class OtlpExporter:
+    """Envia os spans para um endpoint OTLP/HTTP (JSON), como um OpenTelemetry Collector local."""
+
+    def __init__(self, endpoint: str, service_name: str = 'task-to-code') -> None:
+        import httpx
+
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.client = httpx.Client(timeout=5.0)
+
+    @staticmethod
+    def to_otlp_value(value: Any) -> Dict[str, Any]:
+        if isinstance(value, bool):
+            return {'boolValue': value}
+        if isinstance(value, int):
+            return {'intValue': str(value)}
+        if isinstance(value, float):
+            return {'doubleValue': value}
+        return {'stringValue': str(value)}
+
+    def to_otlp_span(self, record: SpanRecord) -> Dict[str, Any]:
+        start_ns = int(record['start'] * 1e9)
+        span = {
+            'traceId': record['trace_id'],
+            'spanId': record['span_id'],
+            'name': record['name'],
+            'kind': 1,
+            'startTimeUnixNano': str(start_ns),
+            'endTimeUnixNano': str(start_ns + int(record['duration_ms'] * 1e6)),
+            'attributes': [
+                {'key': key, 'value': self.to_otlp_value(value)} for key, value in record['attributes'].items()
+            ],
+            'status': {'code': 1 if record['status'] == 'ok' else 2},
+        }
+        if record['parent_id']:
+            span['parentSpanId'] = record['parent_id']
+        return span
+
+    def export(self, records: List[SpanRecord]) -> None:
+        payload = {
+            'resourceSpans': [{
+                'resource': {'attributes': [
+                    {'key': 'service.name', 'value': {'stringValue': self.service_name}}
+                ]},
+                'scopeSpans': [{
+                    'scope': {'name': 'task-to-code'},
+                    'spans': [self.to_otlp_span(record) for record in records],
+                }],
+            }]
+        }
+        try:
+            self.client.post(self.endpoint, json=payload).raise_for_status()
+        except Exception as e:
+            print(f"Erro ao exportar spans para {self.endpoint}: {e}")
+
+
+class Tracer:
+    """Registra a duração e os atributos de cada etapa do pipeline.
+
+    Os spans são exportados em segundo plano, em lotes, para não atrasar o pipeline.
+    Sem exportadores configurados, os spans são descartados.
+    """
+
+    def __init__(self) -> None:
+        self.exporters: List[Any] = []
+        self._queue: 'queue.Queue[SpanRecord]' = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+
+    def configure(self, config: dict) -> None:
+        tracing_config = config.get('tracing', {})
+        if not tracing_config.get('enabled', True):
+            return
+        if tracing_config.get('jsonl_path'):
+            self.add_exporter(JsonlExporter(tracing_config['jsonl_path']))
+        if tracing_config.get('otlp_endpoint'):
+            self.add_exporter(OtlpExporter(tracing_config['otlp_endpoint']))
+
+    def add_exporter(self, exporter: Any) -> None:
+        """Registra um exportador (objeto com `export(records)`) e inicia a exportação em segundo plano."""
+        self.exporters.append(exporter)
+        if not self._worker:
+            self._worker = threading.Thread(target=self._export_loop, name='tracer', daemon=True)
+            self._worker.start()
+            atexit.register(self.flush)
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Span]:
+        """Abre um span filho do span atual (ou um novo trace)."""
+        parent = _current_span.get()
+        span = Span(name, parent.trace_id if parent else secrets.token_hex(16),
+                    parent.span_id if parent else None, attributes)
+        if parent:
+            span.root = parent.root
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException:
+            span.status = 'error'
+            raise
+        finally:
+            _current_span.reset(token)
+            span.finish()
+            if self.exporters:
+                self._queue.put(span.to_record())
+
+    def current_span(self) -> Optional[Span]:
+        return _current_span.get()
+
+    @contextmanager
+    def use_span(self, span: Optional[Span]) -> Iterator[None]:
+        """Torna `span` o span atual (ex: em corrotinas executadas no loop de outra thread)."""
+        token = _current_span.set(span)
+        try:
+            yield
+        finally:
+            _current_span.reset(token)
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        """Define um atributo no span atual, se houver."""
+        span = _current_span.get()
+        if span:
+            span.set_attribute(key, value)
+
+    def increment(self, key: str, amount: int = 1) -> None:
+        """Incrementa um contador (ex: retries) no span atual, se houver."""
+        span = _current_span.get()
+        if span:
+            span.increment(key, amount)
+
+    def _export_loop(self) -> None:
+        while True:
+            records = [self._queue.get()]
+            # Agrupa o que chegar em seguida para exportar em lote
+            deadline = time.monotonic() + 1.0
+            while len(records) < 512:
+                try:
+                    records.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            for exporter in self.exporters:
+                try:
+                    exporter.export(records)
+                except Exception as e:
+                    print(f"Erro ao exportar spans: {e}")
+            for _ in records:
+                self._queue.task_done()
+
+    def flush(self) -> None:
+        """Aguarda a exportação dos spans pendentes."""
+        if self._worker:
+            self._queue.join()
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def print_stage_report(jsonl_path: str) -> None:
+    """Imprime contagem, p50, p95 e máximo de duração por etapa a partir do arquivo JSONL."""
+    if not os.path.exists(jsonl_path):
+        print(f"Nenhum span registrado em {jsonl_path}. Verifique `tracing.jsonl_path` no config.yaml "
+              f"e execute o pipeline com o tracing habilitado.")
+        return
+    durations: Dict[str, List[float]] = {}
+    with open(jsonl_path, 'r', encoding='utf-8') as file:
+        for line in file:
+            if line.strip():
+                record = json.loads(line)
+                durations.setdefault(record['name'], []).append(record['duration_ms'])
+
+    print(f"{'Etapa':<28}{'Qtd':>8}{'p50 (ms)':>12}{'p95 (ms)':>12}{'máx (ms)':>12}")
+    for name, values in sorted(durations.items()):
+        print(f"{name:<28}{len(values):>8}{percentile(values, 0.5):>12.1f}"
+              f"{percentile(values, 0.95):>12.1f}{max(values):>12.1f}")
+
+
+tracer = Tracer()
@@ -1,117 +1,216 @@
+import asyncio
 import os
+import threading
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional, Set
 
 import ftfy
 from dateutil import parser
-from jira import JIRA
+from jira import JIRA, JIRAError
+from jira.resources import Issue
 
-from type_definitions import Task
+from description_parser import DescriptionParser
+from http_client import AsyncHttpClient
+from instrumentation import tracer
+
+from type_definitions import Task, TaskPattern, TaskSnapshot
+
+
+# Campos necessários para montar a task e as correções
+ISSUE_FIELDS = 'summary,description,updated,comment,priority'
+
+# Chaves por consulta `key in (...)` na busca em lote
+SEARCH_BATCH_SIZE = 100
 
 
 class JiraHandler:
-    def __init__(self, jira_url: str, jira_email: str, jira_token: str) -> None:
+    def __init__(self, jira_url: str, jira_email: str, jira_token: str,
+                 task_patterns: Optional[List[TaskPattern]] = None) -> None:
         self.jira = JIRA(
             server=jira_url,
-            basic_auth=(jira_email, jira_token)
+            basic_auth=(jira_email, jira_token),
+            max_retries=3
         )
+        self.jira_url = jira_url.rstrip('/') if jira_url else jira_url
+        self.auth = (jira_email, jira_token)
+        # Snapshots por chave; o campo `updated` evita refazer o parse de issues inalteradas
+        self._snapshots: Dict[str, TaskSnapshot] = {}
+        self._cycle_keys: Set[str] = set()
+        self._snapshots_lock = threading.Lock()
+        self.description_parser = DescriptionParser(task_patterns or [])
 
     def parse_description_fields(self, description: str) -> Dict[str, str]:
         """Extrai os campos da descrição da task."""
-        fields = {}
-        current_field = None
-        current_content = []
-
-        for line in description.split('\n'):
-            line = line.strip()
-            if not line:
-                continue
-
-            # Verifica se a linha é um cabeçalho de campo
-            if ':' in line:
-                # Se já estávamos processando um campo, salva ele
-                if current_field:
-                    fields[current_field] = '\n'.join(current_content).strip()
-                    current_content = []
-                
-                # Divide a linha no primeiro ':'
-                field_name, field_value = line.split(':', 1)
-                field_name = field_name.strip()
-                field_value = field_value.strip()
-                
-                # Se o valor não está vazio, salva o campo imediatamente
-                if field_value:
-                    fields[field_name] = field_value
-                else:
-                    current_field = field_name
-            elif current_field:
-                current_content.append(line)
-
-        # Salva o último campo
-        if current_field and current_content:
-            fields[current_field] = '\n'.join(current_content).strip()
-
-        return fields
-
-    def get_task(self, task_key: str) -> Task:
-        """Obtém os detalhes de uma task do Jira."""
-        issue = self.jira.issue(task_key)
-        
-        # Extrai os campos da descrição e corrige a codificação
-        description = issue.fields.description
-        if isinstance(description, bytes):
-            description = description.decode('utf-8')
-        description = ftfy.fix_text(description)
-        
-        fields = self.parse_description_fields(description)
+        return self.description_parser.parse(description)['fields']
+
+    def fetch_issue(self, task_key: str) -> Any:
+        """Busca a issue trazendo apenas os campos usados pelo pipeline."""
+        return self.jira.issue(task_key, fields=ISSUE_FIELDS)
+
+    async def fetch_issue_async(self, http: AsyncHttpClient, task_key: str) -> Issue:
+        """Versão assíncrona de fetch_issue, usando o pool de conexões compartilhado."""
+        raw = await http.get_json(
+            f"{self.jira_url}/rest/api/2/issue/{task_key}", params={'fields': ISSUE_FIELDS}, auth=self.auth
+        )
+        return Issue(self.jira._options, self.jira._session, raw=raw)
+
+    async def get_snapshot_async(self, http: AsyncHttpClient, task_key: str) -> TaskSnapshot:
+        """Versão assíncrona de get_snapshot."""
+        with self._snapshots_lock:
+            cached = self._snapshots.get(task_key)
+            if cached and task_key in self._cycle_keys:
+                return cached
+        issue = await self.fetch_issue_async(http, task_key)
+        return self.get_snapshot(task_key, issue)
+
+    async def prefetch_snapshots(self, http: AsyncHttpClient, task_keys: List[str]) -> None:
+        """Busca em paralelo os snapshots das tasks do ciclo."""
+        results = await asyncio.gather(
+            *(self.get_snapshot_async(http, task_key) for task_key in task_keys), return_exceptions=True
+        )
+        for task_key, result in zip(task_keys, results):
+            if isinstance(result, Exception):
+                print(f"Erro ao buscar task {task_key}: {result}")
+
+    async def comment_task_async(self, http: AsyncHttpClient, task_key: str, comment: str) -> None:
+        """Versão assíncrona de comment_task."""
+        await http.post_json(
+            f"{self.jira_url}/rest/api/2/issue/{task_key}/comment", {'body': comment}, auth=self.auth
+        )
+
+    async def transition_task_async(self, http: AsyncHttpClient, task_key: str, status: str) -> None:
+        """Move a issue para o status informado (nome da transição ou do status de destino)."""
+        issue = await http.get_json(
+            f"{self.jira_url}/rest/api/2/issue/{task_key}", params={'fields': 'status'}, auth=self.auth
+        )
+        wanted = status.strip().lower()
+        if issue['fields'].get('status', {}).get('name', '').lower() == wanted:
+            return
+        url = f"{self.jira_url}/rest/api/2/issue/{task_key}/transitions"
+        transitions = (await http.get_json(url, auth=self.auth)).get('transitions', [])
+        for transition in transitions:
+            if wanted in (transition['name'].lower(), transition.get('to', {}).get('name', '').lower()):
+                await http.post_json(url, {'transition': {'id': transition['id']}}, auth=self.auth)
+                return
+        raise ValueError(f"Nenhuma transição para '{status}' disponível na task {task_key}")
+
+    def search_issues(self, jql: str) -> List[Any]:
+        """Busca todas as issues da consulta JQL, paginando em lotes, já com os campos do snapshot."""
+        return list(self.jira.search_issues(jql, maxResults=False, fields=ISSUE_FIELDS))
+
+    def search_issues_by_keys(self, task_keys: List[str], batch_size: int = SEARCH_BATCH_SIZE) -> List[Any]:
+        """Busca as issues das chaves com consultas `key in (...)` em vez de uma requisição por chave."""
+        issues = []
+        for start in range(0, len(task_keys), batch_size):
+            keys = task_keys[start:start + batch_size]
+            try:
+                issues.extend(self.search_issues(f'key in ({", ".join(keys)})'))
+            except JIRAError as e:
+                # Uma chave inexistente invalida a consulta inteira; busca as do lote individualmente
+                print(f"Erro na busca em lote ({e.text}), buscando as tasks uma a uma")
+                for task_key in keys:
+                    try:
+                        issues.append(self.fetch_issue(task_key))
+                    except JIRAError as e:
+                        print(f"Task {task_key} não encontrada: {e.text}")
+        return issues
+
+    def search_updated_issues(self, jql: str, since: Optional[datetime] = None) -> List[Any]:
+        """Busca em uma única consulta JQL as issues atualizadas desde o cursor."""
+        if since:
+            jql = f'({jql}) AND updated >= "{since.strftime("%Y/%m/%d %H:%M")}"'
+        return self.search_issues(f'{jql} ORDER BY updated ASC')
+
+    def begin_cycle(self) -> None:
+        """Inicia um novo ciclo: cada issue volta a ser buscada no máximo uma vez."""
+        with self._snapshots_lock:
+            self._cycle_keys.clear()
+
+    def get_snapshot(self, task_key: str, issue: Optional[Any] = None) -> TaskSnapshot:
+        """Obtém a task e suas correções a partir de uma única busca da issue por ciclo."""
+        with self._snapshots_lock:
+            cached = self._snapshots.get(task_key)
+            if issue is None and cached and task_key in self._cycle_keys:
+                return cached
+
+        if issue is None:
+            issue = self.fetch_issue(task_key)
+
+        # Issue sem alterações desde o último snapshot: reaproveita o parse já feito
+        if not cached or cached['updated'] != issue.fields.updated:
+            cached = self.build_snapshot(issue)
+
+        with self._snapshots_lock:
+            self._snapshots[task_key] = cached
+            self._cycle_keys.add(task_key)
+        return cached
+
+    def build_snapshot(self, issue: Any) -> TaskSnapshot:
+        """Monta o snapshot da task a partir do payload da issue."""
+        # Extrai os campos da descrição e corrige a codificação (com cache pelo hash da descrição)
+        with tracer.span('jira.parse_description', task=issue.key):
+            description = issue.fields.description or ''
+            if isinstance(description, bytes):
+                description = description.decode('utf-8')
+            parsed = self.description_parser.parse(description)
+            fields = parsed['fields']
         
         # Converte a data de atualização para datetime
         updated = parser.parse(issue.fields.updated)
-        
-        return {
+
+        task: Task = {
             'key': issue.key,
             'title': ftfy.fix_text(issue.fields.summary),
-            'description': description,
+            'description': parsed['description'],
             'type': fields.get('Tipo', ''),
             'project': fields.get('Projeto', ''),
             'fields': fields,
-            'updated': updated
+            'updated': updated,
+            'priority': issue.fields.priority.name if getattr(issue.fields, 'priority', None) else '',
+            'errors': parsed['errors']
+        }
+
+        corrections = []
+        for comment in issue.fields.comment.comments:
+            # Verifica se é um comentário de correção (começa com [CORREÇÃO])
+            if comment.body.startswith('[CORREÇÃO]'):
+                corrections.append({
+                    'id': comment.id,
+                    'author': comment.author.displayName,
+                    'body': comment.body.replace('[CORREÇÃO]', '').strip(),
+                    # Converte a data do comentário para datetime
+                    'updated': parser.parse(comment.updated).replace(tzinfo=None)
+                })
+
+        return {
+            'key': issue.key,
+            'updated': issue.fields.updated,
+            'task': task,
+            'corrections': corrections
         }
 
+    def get_task(self, task_key: str, issue: Optional[Any] = None) -> Task:
+        """Obtém os detalhes de uma task do Jira."""
+        return self.get_snapshot(task_key, issue)['task']
+
     def comment_task(self, task_key: str, comment: str) -> None:
         """Comenta a task no jira"""
         self.jira.add_comment(task_key, comment)
 
-    def get_correction_comments(self, task_key: str, since: Optional[datetime] = None) -> List[Dict]:
+    def get_correction_comments(self, task_key: str, since: Optional[datetime] = None,
+                                issue: Optional[Any] = None) -> List[Dict]:
         """Obtém os comentários de correção desde uma data específica."""
-        issue = self.jira.issue(task_key)
-        comments = []
-        
-        for comment in issue.fields.comment.comments:
-            # Converte a data do comentário para datetime
-            comment_updated = parser.parse(comment.updated).replace(tzinfo=None)
-            
-            # Se não houver data de referência ou o comentário for mais recente
-            if not since or comment_updated > since:
-                # Verifica se é um comentário de correção (começa com [CORREÇÃO])
-                if comment.body.startswith('[CORREÇÃO]'):
-                    comments.append({
-                        'author': comment.author.displayName,
-                        'body': comment.body.replace('[CORREÇÃO]', '').strip(),
-                        'updated': comment_updated
-                    })
-        
-        return comments
+        corrections = self.get_snapshot(task_key, issue)['corrections']
+        # Se não houver data de referência, retorna todos os comentários de correção
+        return [correction for correction in corrections if not since or correction['updated'] > since]
 
-    def has_description_changed(self, task_key: str, last_updated: datetime) -> bool:
+    def has_description_changed(self, task_key: str, last_updated: datetime, issue: Optional[Any] = None) -> bool:
         """Verifica se a descrição da task foi alterada desde a última atualização."""
-        issue = self.jira.issue(task_key)
-        # Converte a data de atualização para datetime
-        issue_updated = parser.parse(issue.fields.updated).replace(tzinfo=None)
-        return issue_updated > last_updated
+        task = self.get_snapshot(task_key, issue)['task']
+        return task['updated'].replace(tzinfo=None) > last_updated
 
-    def get_task_updates(self, task_key: str, last_updated: datetime) -> Optional[Task]:
+    def get_task_updates(self, task_key: str, last_updated: datetime, issue: Optional[Any] = None) -> Optional[Task]:
         """Obtém as atualizações da task se houver mudanças na descrição."""
-        if self.has_description_changed(task_key, last_updated):
-            return self.get_task(task_key)
+        if self.has_description_changed(task_key, last_updated, issue):
+            return self.get_task(task_key, issue)
         return None 
\ No newline at end of file
@@ -0,0 +1,196 @@
+import json
+import queue
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+from dateutil import parser
+
+from state_store import StateStore
+
+if TYPE_CHECKING:
+    from main import TaskToCode
+
+
+class JiraWebhookServer:
+    """Receptor local de webhooks do Jira que enfileira as chaves das issues alteradas."""
+
+    def __init__(self, host: str, port: int, events: 'queue.Queue[str]') -> None:
+        self.events = events
+        self.server = ThreadingHTTPServer((host, port), self._build_handler())
+        self.thread = threading.Thread(target=self.server.serve_forever, name='jira-webhook', daemon=True)
+
+    def _build_handler(self) -> type:
+        events = self.events
+
+        class WebhookRequestHandler(BaseHTTPRequestHandler):
+            def do_POST(self) -> None:
+                try:
+                    length = int(self.headers.get('Content-Length', 0))
+                    payload = json.loads(self.rfile.read(length) or b'{}')
+                    issue_key = payload.get('issue', {}).get('key')
+                except (ValueError, AttributeError):
+                    issue_key = None
+
+                if issue_key:
+                    events.put(issue_key)
+                    self.send_response(202)
+                else:
+                    self.send_response(400)
+                self.end_headers()
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+        return WebhookRequestHandler
+
+    def start(self) -> None:
+        self.thread.start()
+        host, port = self.server.server_address[:2]
+        print(f"Receptor de webhooks do Jira ouvindo em http://{host}:{port}")
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class JiraWatcher:
+    """Daemon que busca as issues alteradas com uma única consulta JQL por intervalo."""
+
+    def __init__(self, task_to_code: 'TaskToCode') -> None:
+        self.task_to_code = task_to_code
+        self.config = task_to_code.config
+        watcher_config = self.config['jira'].get('watcher', {})
+        self.interval = watcher_config.get('interval', 60)
+        self.jql = watcher_config.get('jql') or self.build_jql()
+        self.webhook_config = watcher_config.get('webhook', {})
+        self.events: 'queue.Queue[str]' = queue.Queue()
+
+        # Cursor e últimas atualizações processadas ficam no state store para sobreviver a reinícios
+        self.state_store = task_to_code.state_store
+        cursor = self.state_store.get_meta('watcher.cursor')
+        self.cursor: Optional[datetime] = datetime.fromisoformat(cursor) if cursor else None
+        # Última atualização processada por issue (a JQL tem precisão de minutos)
+        self.seen: Dict[str, str] = json.loads(self.state_store.get_meta('watcher.seen') or '{}')
+
+    def build_jql(self) -> str:
+        """Monta a JQL cobrindo todos os projetos configurados."""
+        return f"project in ({', '.join(self.config['projects'])})"
+
+    def save_state(self) -> None:
+        self.state_store.set_meta('watcher.cursor', self.cursor.isoformat() if self.cursor else None)
+        self.state_store.set_meta('watcher.seen', json.dumps(self.seen))
+
+    def run(self) -> None:
+        """Executa o loop do watcher até Ctrl+C."""
+        webhook_server = None
+        if self.webhook_config.get('enabled'):
+            webhook_server = JiraWebhookServer(
+                self.webhook_config.get('host', '127.0.0.1'),
+                self.webhook_config.get('port', 8085),
+                self.events
+            )
+            webhook_server.start()
+
+        print(f"Observando o Jira a cada {self.interval}s com a JQL: {self.jql}")
+        next_poll = 0.0
+        try:
+            while True:
+                timeout = max(0.0, next_poll - time.monotonic())
+                try:
+                    issue_key = self.events.get(timeout=timeout)
+                    self.handle_webhook_event(issue_key)
+                except queue.Empty:
+                    self.poll()
+                    next_poll = time.monotonic() + self.interval
+        except KeyboardInterrupt:
+            print("\nEncerrando...")
+        finally:
+            if webhook_server:
+                webhook_server.stop()
+
+    def poll(self) -> None:
+        """Busca as issues alteradas desde o cursor e despacha as que mudaram."""
+        self.task_to_code.jira_handler.begin_cycle()
+        try:
+            issues = self.task_to_code.jira_handler.search_updated_issues(self.jql, self.cursor)
+        except Exception as e:
+            print(f"Erro ao buscar issues atualizadas: {e}")
+            return
+
+        since = self.cursor
+        for issue in issues:
+            self.dispatch(issue, since)
+            updated = parser.parse(issue.fields.updated).replace(tzinfo=None)
+            if not self.cursor or updated > self.cursor:
+                self.cursor = updated
+
+        # Só é preciso lembrar das issues que ainda caem no minuto do cursor
+        if self.cursor:
+            cursor_minute = self.cursor.replace(second=0, microsecond=0)
+            self.seen = {
+                key: updated for key, updated in self.seen.items()
+                if datetime.fromisoformat(updated) >= cursor_minute
+            }
+        self.save_state()
+
+    def handle_webhook_event(self, issue_key: str) -> None:
+        self.task_to_code.jira_handler.begin_cycle()
+        try:
+            issue = self.task_to_code.jira_handler.fetch_issue(issue_key)
+        except Exception as e:
+            print(f"Erro ao buscar issue {issue_key} do webhook: {e}")
+            return
+        self.dispatch(issue, self.cursor)
+        self.save_state()
+
+    def dispatch(self, issue: Any, since: Optional[datetime]) -> None:
+        """Despacha a issue para o pipeline se houver correções novas ou mudança na descrição."""
+        updated = parser.parse(issue.fields.updated).replace(tzinfo=None)
+        previous = self.seen.get(issue.key)
+        if previous and datetime.fromisoformat(previous) >= updated:
+            return
+        self.seen[issue.key] = updated.isoformat()
+
+        task = self.task_to_code.jira_handler.get_task(issue.key, issue)
+        if task['project'] not in self.config['projects']:
+            return
+        state = self.state_store.get_task_state(issue.key)
+        if not (state and state.get('branch')):
+            project_dir = self.task_to_code.get_project_dir(task['project'])
+            if not project_dir:
+                return
+            if not self.task_to_code.github_handler.branch_exists(task, self.config, project_dir):
+                return
+
+        if not (state and state.get('description_hash')):
+            # Task com branch mas sem estado: a descrição atual e as correções anteriores
+            # ao cursor passam a ser a referência
+            applied = [
+                int(correction['id'])
+                for correction in self.task_to_code.jira_handler.get_correction_comments(issue.key, issue=issue)
+                if since is None or correction['updated'] <= since
+            ]
+            self.state_store.save_task_state(
+                issue.key,
+                project=task['project'],
+                branch=f"feature/{issue.key}",
+                description_hash=StateStore.hash_description(task['description']),
+                last_comment_id=max(applied, default=0)
+            )
+
+        # Sem cursor (primeira execução) apenas registra o estado atual como referência
+        if since is None:
+            return
+
+        # Alterações de status, labels ou os próprios comentários do bot não geram trabalho
+        _, corrections, description_changed = self.task_to_code.get_pending_work(issue.key, since, issue)
+        if not corrections and not description_changed:
+            return
+
+        try:
+            self.task_to_code.process_corrections(issue.key, since, issue=issue)
+        except Exception as e:
+            print(f"Erro ao processar task {issue.key}: {e}")
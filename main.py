@@ -1,102 +1,549 @@
+import argparse
 import os
+import threading
 from datetime import datetime
-from typing import Any, Dict, Optional
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
 
 import yaml
 from dotenv import load_dotenv
 
-from aider_handler import AiderHandler
-from github_handler import GitHubHandler
-from jira_handler import JiraHandler
-from type_definitions import Config, Task
+from instrumentation import print_stage_report, tracer
+from jira_watcher import JiraWatcher
+from state_store import StateStore
+from type_definitions import Config, Task, TaskChanges
+
+if TYPE_CHECKING:
+    from aider_handler import AiderHandler
+    from git_service import GitService
+    from github_handler import GitHubHandler
+    from http_client import AsyncRuntime
+    from jira_handler import JiraHandler
+    from metrics import MetricsRegistry
+    from mirror_cache import MirrorCache
+    from verifier import Verifier
+    from write_back import WriteBackQueue
 
 
 class TaskToCode:
+    """Pipeline Jira -> Aider -> GitHub.
+
+    Os handlers são criados no primeiro uso: Aider/litellm, jira e GitPython levam
+    segundos para importar, e uma verificação de correções sem pendências não precisa do modelo.
+    """
+
     def __init__(self) -> None:
         load_dotenv()
         self.config: Config = self.load_config()
-        
-        # Inicializa os handlers
-        self.jira_handler = JiraHandler(
-            jira_url=os.getenv('JIRA_URL'),
-            jira_email=os.getenv('JIRA_EMAIL'),
-            jira_token=os.getenv('JIRA_API_TOKEN')
-        )
-        
-        self.github_handler = GitHubHandler(
-            github_token=os.getenv('GITHUB_TOKEN'),
-            github_user=os.getenv('GITHUB_USER')
-        )
-        
-        self.aider_handler = AiderHandler(self.config)
+        tracer.configure(self.config)
+
+        self.state_store = StateStore(self.config.get('state', {}).get('path', '.task_to_code/state.db'))
+        self.metrics = self.start_metrics()
+
+        self._handlers: Dict[str, Any] = {}
+        self._handlers_lock = threading.RLock()
+        # Checkouts do cache de mirrors dos projetos sem `directory` no config.yaml
+        self._project_dirs: Dict[str, str] = {}
+        self._project_dirs_lock = threading.Lock()
+
+    def _get_handler(self, name: str, factory) -> Any:
+        with self._handlers_lock:
+            if name not in self._handlers:
+                self._handlers[name] = factory()
+            return self._handlers[name]
+
+    @property
+    def runtime(self) -> 'AsyncRuntime':
+        """Pool de conexões assíncrono compartilhado por Jira e GitHub."""
+        def create() -> 'AsyncRuntime':
+            from http_client import AsyncRuntime
+            return AsyncRuntime(self.config)
+        return self._get_handler('runtime', create)
+
+    @property
+    def jira_handler(self) -> 'JiraHandler':
+        def create() -> 'JiraHandler':
+            from jira_handler import JiraHandler
+            return JiraHandler(
+                jira_url=os.getenv('JIRA_URL'),
+                jira_email=os.getenv('JIRA_EMAIL'),
+                jira_token=os.getenv('JIRA_API_TOKEN'),
+                task_patterns=self.config['jira'].get('task_patterns', [])
+            )
+        return self._get_handler('jira', create)
+
+    @property
+    def git_service(self) -> 'GitService':
+        def create() -> 'GitService':
+            from git_service import GitService
+            return GitService(
+                github_user=os.getenv('GITHUB_USER'),
+                github_token=os.getenv('GITHUB_TOKEN'),
+                config=self.config
+            )
+        return self._get_handler('git', create)
+
+    @property
+    def mirrors(self) -> 'MirrorCache':
+        def create() -> 'MirrorCache':
+            from mirror_cache import MirrorCache
+            return MirrorCache(self.config, self.git_service)
+        return self._get_handler('mirrors', create)
+
+    def get_project_dir(self, project: str) -> Optional[str]:
+        """Diretório do projeto; sem `directory` no config.yaml, usa um checkout do cache de mirrors."""
+        directory = self.config['projects'][project].get('directory')
+        if directory:
+            return directory
+        with self._project_dirs_lock:
+            checkout = self._project_dirs.get(project)
+        # O checkout é recriado se o mirror foi removido (ex: por outro processo)
+        if checkout and os.path.isdir(checkout):
+            return checkout
+        try:
+            checkout = self.mirrors.get_checkout(project)
+        except Exception as e:
+            print(f"Erro ao preparar o repositório do projeto {project}: {e}")
+            return None
+        with self._project_dirs_lock:
+            self._project_dirs[project] = checkout
+        return checkout
+
+    @property
+    def github_handler(self) -> 'GitHubHandler':
+        def create() -> 'GitHubHandler':
+            from github_handler import GitHubHandler
+            return GitHubHandler(
+                github_token=os.getenv('GITHUB_TOKEN'),
+                github_user=os.getenv('GITHUB_USER'),
+                runtime=self.runtime,
+                git_service=self.git_service
+            )
+        return self._get_handler('github', create)
+
+    @property
+    def aider_handler(self) -> 'AiderHandler':
+        def create() -> 'AiderHandler':
+            from aider_handler import AiderHandler
+            return AiderHandler(self.config)
+        return self._get_handler('aider', create)
+
+    @property
+    def verifier(self) -> 'Verifier':
+        def create() -> 'Verifier':
+            from verifier import Verifier
+            return Verifier(self.config)
+        return self._get_handler('verifier', create)
+
+    @property
+    def write_back(self) -> 'WriteBackQueue':
+        """Fila de comentários e transições enviados ao Jira e ao GitHub em segundo plano."""
+        def create() -> 'WriteBackQueue':
+            from write_back import WriteBackQueue
+            return WriteBackQueue(self)
+        return self._get_handler('write_back', create)
+
+    def start_metrics(self) -> Optional['MetricsRegistry']:
+        """Métricas derivadas dos spans e do state store (expostas por `serve_metrics`)."""
+        if not self.config.get('metrics', {}).get('enabled', True):
+            return None
+        from metrics import MetricsExporter, MetricsRegistry, state_collector
+
+        registry = MetricsRegistry()
+        registry.collectors.append(state_collector(self.state_store))
+        tracer.add_exporter(MetricsExporter(registry))
+        return registry
+
+    def serve_metrics(self) -> None:
+        """Expõe as métricas em `metrics.host:metrics.port`; só os comandos de longa duração chamam."""
+        metrics_config = self.config.get('metrics', {})
+        port = metrics_config.get('port', 9464)
+        if not self.metrics or not port:
+            return
+        from metrics import MetricsServer
+
+        host = metrics_config.get('host', '127.0.0.1')
+        try:
+            MetricsServer(self.metrics, host, port).start()
+        except OSError as e:
+            # Outro processo já usa a porta (ex: o servidor residente)
+            print(f"Endpoint de métricas indisponível em {host}:{port}: {e}")
 
     def load_config(self) -> Config:
         with open('config.yaml', 'r') as file:
             return yaml.safe_load(file)
 
-    def process_task(self, task_key: str) -> None:
+    def validate_task(self, task: Task) -> bool:
+        """Rejeita tasks fora do padrão do tipo antes de gastar uma execução do modelo."""
+        if not task['errors']:
+            return True
+        print(f"Task {task['key']} inválida: {'; '.join(task['errors'])}")
+        # Avisa no Jira uma vez por versão da descrição
+        errors = '\n'.join(f"- {error}" for error in task['errors'])
+        self.write_back.comment_issue(
+            task['key'], f"⚠️ A task não segue o padrão esperado e não foi processada:\n\n{errors}",
+            dedupe_key=f"invalid:{task['key']}:{StateStore.hash_description(task['description'])}"
+        )
+        self.state_store.record_run(task['key'], 'invalid', project=task['project'])
+        return False
+
+    def process_task(self, task_key: str, work_dir: Optional[str] = None) -> Optional[str]:
         """Processa uma task do Jira completa."""
+        with tracer.span('task.process', task=task_key):
+            return self._process_task(task_key, work_dir)
+
+    def _process_task(self, task_key: str, work_dir: Optional[str] = None) -> Optional[str]:
         print(f"Processando task {task_key}...")
         
         # Obtém os detalhes da task
-        task = self.jira_handler.get_task(task_key)
+        with tracer.span('jira.fetch', task=task_key):
+            task = self.jira_handler.get_task(task_key)
+        if not self.validate_task(task):
+            return None
 
         # Verifica se o projeto está configurado
         if task['project'] not in self.config['projects']:
             print(f"Projeto {task['project']} não está configurado no config.yaml")
-            return
-        
+            return None
+        # Sem worktree, a task roda no checkout do projeto
+        project_dir = work_dir or self.get_project_dir(task['project'])
+        if not project_dir:
+            return None
+
+        return self.implement_task(task, project_dir)
+
+    def get_existing_pr(self, task: Task) -> Optional[str]:
+        """PR já aberto para a mesma descrição da task, se houver."""
+        state = self.state_store.get_task_state(task['key'])
+        if state and state.get('pr_url') and state.get('description_hash') == StateStore.hash_description(task['description']):
+            return state['pr_url']
+        return None
+
+    def implement_task(self, task: Task, work_dir: str) -> Optional[str]:
+        """Gera o código da task e abre o Pull Request."""
+        # Evita reimplementar uma task que já tem PR para a mesma descrição
+        pr_url = self.get_existing_pr(task)
+        if pr_url:
+            print(f"Task {task['key']} já possui PR: {pr_url}")
+            return pr_url
+
         # Gera o prompt para o Aider
-        prompt = self.aider_handler.generate_prompt(task)
+        with tracer.span('prompt.render', task=task['key']):
+            prompt = self.aider_handler.generate_prompt(task)
         
         # Executa o Aider
-        changes = self.aider_handler.execute_command(task, prompt)
+        with tracer.span('aider.run', task=task['key']):
+            changes = self.aider_handler.execute_command(task, prompt, work_dir)
         if not changes:
             print("Falha ao executar o Aider")
-            return
+            self.state_store.record_run(task['key'], 'aider_failed', project=task['project'])
+            return None
+
+        # Build e testes afetados antes de abrir o PR
+        changes = self.verify_changes(task, changes, work_dir)
+        if not changes:
+            self.state_store.record_run(task['key'], 'verification_failed', project=task['project'])
+            return None
  
         # Cria o Pull Request
-        pr_url = self.github_handler.create_pull_request(task, changes, self.config)
-        if pr_url:
-            self.jira_handler.comment_task(task_key, f"🎉 PR criado com sucesso!\n\n🔗 Link: {pr_url}\n\n🤖 Código gerado automaticamente com IA\n\n💡 Dica: Revise as alterações e aproveite o tempo economizado!")
+        with tracer.span('github.create_pr', task=task['key']):
+            pr_url = self.github_handler.create_pull_request(task, changes, self.config, work_dir)
+        if not pr_url:
+            self.state_store.record_run(task['key'], 'pr_failed', project=task['project'])
+            return None
+
+        # Correções feitas antes desta implementação não precisam ser reaplicadas
+        corrections = self.jira_handler.get_correction_comments(task['key'])
+        self.state_store.record_run(
+            task['key'],
+            'pr_created',
+            project=task['project'],
+            description_hash=StateStore.hash_description(task['description']),
+            last_comment_id=max([int(correction['id']) for correction in corrections], default=0),
+            branch=f"feature/{task['key']}",
+            pr_number=int(pr_url.rstrip('/').rsplit('/', 1)[-1]),
+            pr_url=pr_url
+        )
+        self.write_back.comment_issue(
+            task['key'],
+            f"🎉 PR criado com sucesso!\n\n🔗 Link: {pr_url}\n\n🤖 Código gerado automaticamente com IA\n\n💡 Dica: Revise as alterações e aproveite o tempo economizado!",
+            dedupe_key=f"pr_created:{pr_url}"
+        )
+        self.write_back.transition_issue(task['key'], 'pr_created', dedupe_key=f"pr_created:{pr_url}:status")
+        return pr_url
 
-    def process_corrections(self, task_key: str, last_updated: datetime) -> None:
+    def verify_changes(self, task: Task, changes: TaskChanges, work_dir: str) -> Optional[TaskChanges]:
+        """Roda build e testes afetados; nas falhas, devolve a saída ao Aider até `max_fix_iterations` vezes."""
+        from git import Repo
+
+        verifier = self.verifier
+        for iteration in range(verifier.max_fix_iterations + 1):
+            with tracer.span('verify.run', task=task['key'], iteration=iteration):
+                result = verifier.verify(task['project'], work_dir, changes['files'])
+                tracer.set_attribute('ok', result['ok'])
+            if result['ok']:
+                return changes
+
+            print(f"Verificação falhou no {result['stage']} (tentativa {iteration + 1})")
+            if iteration == verifier.max_fix_iterations:
+                break
+            with tracer.span('aider.fix', task=task['key'], iteration=iteration + 1):
+                fixed = self.aider_handler.fix_failures(task, result, changes, work_dir)
+            if not fixed:
+                break
+            # O PR descreve todas as alterações desde a base, mantendo a explicação da implementação
+            changes = {
+                **changes,
+                **self.aider_handler.artifacts.diff_summary(Repo(work_dir), changes['base_sha'])
+            }
+
+        print(f"Alterações da task {task['key']} não passaram na verificação:\n{result['output'][-2000:]}")
+        return None
+
+    def get_pending_work(self, task_key: str, last_updated: Optional[datetime] = None,
+                         issue: Optional[Any] = None) -> Tuple[Task, List[Dict], bool]:
+        """Retorna a task, as correções ainda não aplicadas e se a descrição mudou."""
+        task = self.jira_handler.get_task(task_key, issue)
+        state = self.state_store.get_task_state(task_key)
+        if state and state.get('description_hash'):
+            # Com estado salvo, só comentários novos e mudanças reais na descrição geram trabalho
+            last_comment_id = state.get('last_comment_id') or 0
+            corrections = [
+                correction for correction in self.jira_handler.get_correction_comments(task_key, issue=issue)
+                if int(correction['id']) > last_comment_id
+            ]
+            description_changed = state['description_hash'] != StateStore.hash_description(task['description'])
+            return task, corrections, description_changed
+
+        # Sem estado (tasks anteriores ao state store) compara pelas datas
+        corrections = self.jira_handler.get_correction_comments(task_key, last_updated, issue)
+        description_changed = bool(last_updated) and self.jira_handler.has_description_changed(task_key, last_updated, issue)
+        return task, corrections, description_changed
+
+    def process_corrections(self, task_key: str, last_updated: Optional[datetime] = None,
+                            work_dir: Optional[str] = None, issue: Optional[Any] = None) -> Optional[str]:
         """Processa correções para uma task existente."""
+        with tracer.span('task.corrections', task=task_key):
+            return self._process_corrections(task_key, last_updated, work_dir, issue)
+
+    def _process_corrections(self, task_key: str, last_updated: Optional[datetime] = None,
+                             work_dir: Optional[str] = None, issue: Optional[Any] = None) -> Optional[str]:
         print(f"Verificando correções para task {task_key}...")
         
-        # Verifica se houve atualização na descrição da task
-        updated_task = self.jira_handler.get_task_updates(task_key, last_updated)
-
-        # Verifica se há comentários de correção
-        corrections = self.jira_handler.get_correction_comments(task_key, last_updated)
+        # Verifica se houve atualização na descrição e se há comentários de correção
+        with tracer.span('jira.fetch', task=task_key):
+            task, corrections, description_changed = self.get_pending_work(task_key, last_updated, issue)
+        project_dir = work_dir or self.get_project_dir(task['project'])
+        if not project_dir:
+            return None
         if corrections:
             print(f"🔧 Encontradas {len(corrections)} correções para aplicar...")
             
             # Aplica as correções
-            changes = self.aider_handler.apply_corrections(updated_task or self.jira_handler.get_task(task_key), corrections)
+            with tracer.span('aider.run', task=task_key, corrections=len(corrections)):
+                changes = self.aider_handler.apply_corrections(task, corrections, project_dir)
+            if changes:
+                changes = self.verify_changes(task, changes, project_dir)
+            pr_url = None
             if changes:
                 # Atualiza a branch existente com as correções
-                pr_url = self.github_handler.update_existing_branch(
-                    updated_task or self.jira_handler.get_task(task_key),
-                    changes,
-                    self.config
-                )
-                if pr_url:
-                    self.jira_handler.comment_task(task_key, f"✨ Correções aplicadas com sucesso!\n\n🔗 Link do PR atualizado: {pr_url}")
-                return
+                with tracer.span('github.update_branch', task=task_key):
+                    pr_url = self.github_handler.update_existing_branch(
+                        task,
+                        changes,
+                        self.config,
+                        project_dir
+                    )
+
+            if not pr_url:
+                self.state_store.record_run(task_key, 'corrections_failed', project=task['project'])
+                return None
+
+            values: Dict[str, Any] = {'last_comment_id': max(int(correction['id']) for correction in corrections)}
+            state = self.state_store.get_task_state(task_key)
+            if not state or not state.get('description_hash'):
+                # Primeira vez com estado: a descrição atual passa a ser a referência
+                values['description_hash'] = StateStore.hash_description(task['description'])
+            self.state_store.record_run(
+                task_key, 'corrections_applied', project=task['project'], branch=f"feature/{task_key}",
+                pr_url=pr_url, **values
+            )
+            # Rodadas próximas de correções chegam ao Jira e ao PR como um único comentário
+            dedupe_key = f"corrections:{task_key}:{values['last_comment_id']}"
+            self.write_back.comment_pull(
+                self.config['projects'][task['project']]['repository'],
+                int(pr_url.rstrip('/').rsplit('/', 1)[-1]),
+                self.github_handler.build_corrections_comment(changes, self.config),
+                dedupe_key=f"{dedupe_key}:pr"
+            )
+            self.write_back.comment_issue(
+                task_key, f"✨ Correções aplicadas com sucesso!\n\n🔗 Link do PR atualizado: {pr_url}", dedupe_key=dedupe_key
+            )
+            self.write_back.transition_issue(task_key, 'corrections_applied', dedupe_key=f"{dedupe_key}:status")
+            return pr_url
 
         
-        if updated_task:
+        if description_changed:
             print("📝 Descrição da task foi atualizada. Recriando implementação...")
             
             # Reseta a branch
-            if self.github_handler.reset_branch(updated_task, self.config):
+            if self.github_handler.reset_branch(task, self.config, project_dir):
                 # Processa a task novamente com a nova descrição
-                self.process_task(task_key)
-            return   
+                return self.process_task(task_key, project_dir)
+        return None
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Transforma tasks do Jira em código usando IA")
+    subparsers = parser.add_subparsers(dest='command')
+
+    pool_parser = subparsers.add_parser('pool', help="Processa várias tasks em paralelo")
+    pool_parser.add_argument('task_keys', nargs='+', help="Chaves das tasks do Jira (ex: PROJ-123)")
+    pool_parser.add_argument('--corrections-since', type=datetime.fromisoformat, metavar='DATA',
+                             help="Aplica apenas as correções feitas desde a data (ex: 2025-05-17T10:00)")
+
+    batch_parser = subparsers.add_parser('batch', help="Processa todas as tasks de uma consulta JQL ou lista de chaves")
+    batch_source = batch_parser.add_mutually_exclusive_group(required=True)
+    batch_source.add_argument('--jql', help="Consulta JQL (ex: 'sprint in openSprints() AND status = \"To Do\"')")
+    batch_source.add_argument('--file', metavar='ARQUIVO', help="Arquivo com uma chave por linha (use - para stdin)")
+
+    queue_parser = subparsers.add_parser('queue', help="Fila persistente com prioridade e divisão justa entre projetos")
+    queue_commands = queue_parser.add_subparsers(dest='queue_command', required=True)
+    queue_add = queue_commands.add_parser('add', help="Coloca tasks na fila")
+    queue_add.add_argument('task_keys', nargs='+', help="Chaves das tasks do Jira (ex: PROJ-123)")
+    queue_add.add_argument('--corrections-since', type=datetime.fromisoformat, metavar='DATA',
+                           help="Enfileira as correções feitas desde a data (ex: 2025-05-17T10:00)")
+    queue_list = queue_commands.add_parser('list', help="Mostra os itens da fila")
+    queue_list.add_argument('--all', action='store_true', help="Inclui itens concluídos e com falha")
+    queue_run = queue_commands.add_parser('run', help="Processa a fila")
+    queue_run.add_argument('--wait', action='store_true', help="Continua aguardando novos itens quando a fila esvaziar")
+
+    subparsers.add_parser('watch', help="Observa o Jira e aplica correções das tasks alteradas")
+
+    subparsers.add_parser('serve', help="Mantém um processo residente com handlers e caches aquecidos")
+
+    submit_parser = subparsers.add_parser('submit', help="Envia tasks ao processo residente (serve)")
+    submit_parser.add_argument('task_keys', nargs='+', help="Chaves das tasks do Jira (ex: PROJ-123)")
+    submit_parser.add_argument('--corrections-since', type=datetime.fromisoformat, metavar='DATA',
+                               help="Aplica apenas as correções feitas desde a data (ex: 2025-05-17T10:00)")
+
+    stats_parser = subparsers.add_parser('stats', help="Mostra a latência p50/p95 de cada etapa do pipeline")
+    stats_parser.add_argument('--traces', default=None, help="Arquivo JSONL de spans (padrão: tracing.jsonl_path)")
+
+    dashboard_parser = subparsers.add_parser('dashboard', help="Painel com fila, vazão, latência e custo por modelo")
+    dashboard_parser.add_argument('--interval', type=float, default=5.0, help="Segundos entre atualizações")
+    dashboard_parser.add_argument('--once', action='store_true', help="Mostra o painel uma vez e sai")
+
+    bench_parser = subparsers.add_parser('benchmark', help="Mede a vazão do pipeline com Jira, GitHub e modelo simulados")
+    bench_parser.add_argument('--tasks', type=int, default=10, help="Quantidade de tasks sintéticas (1 a 500)")
+    bench_parser.add_argument('--repo-size', choices=['small', 'large'], default='small', help="Tamanho do repositório")
+    bench_parser.add_argument('--corrections', type=int, default=0, help="Comentários de correção por task")
+    bench_parser.add_argument('--workers', type=int, default=0, help="Workers do pool (0 = sequencial)")
+    bench_parser.add_argument('--api-latency', type=int, default=0, metavar='MS', help="Latência simulada do Jira/GitHub")
+    bench_parser.add_argument('--llm-latency', type=int, default=0, metavar='MS', help="Latência simulada do modelo")
+    bench_parser.add_argument('--fixtures', help="Arquivo JSON com issues gravadas do Jira")
+    bench_parser.add_argument('--keep', action='store_true', help="Mantém o diretório temporário do benchmark")
+
+    return parser.parse_args()
+
 
 def main() -> None:
+    args = parse_args()
+
+    if args.command == 'stats':
+        with open('config.yaml', 'r') as file:
+            config = yaml.safe_load(file)
+        print_stage_report(args.traces or config.get('tracing', {}).get('jsonl_path', '.task_to_code/traces.jsonl'))
+        return
+
+    if args.command == 'dashboard':
+        from metrics import run_dashboard
+        with open('config.yaml', 'r') as file:
+            config = yaml.safe_load(file)
+        run_dashboard(config, args.interval, args.once)
+        return
+
+    if args.command == 'submit':
+        from task_server import send_request
+        with open('config.yaml', 'r') as file:
+            config = yaml.safe_load(file)
+        socket_path = config.get('server', {}).get('socket_path', '.task_to_code/server.sock')
+        request: Dict[str, Any] = {'command': 'process', 'task_keys': args.task_keys}
+        if args.corrections_since:
+            request.update(command='corrections', since=args.corrections_since.isoformat())
+        try:
+            response = send_request(socket_path, request)
+        except OSError as e:
+            # Sem servidor residente, processa neste mesmo processo como o comando pool
+            print(f"Servidor indisponível em {socket_path} ({e}), processando localmente")
+        else:
+            if not response['ok']:
+                print(f"Erro no servidor: {response['error']}")
+                return
+            for task_key, result in response['results'].items():
+                print(f"{task_key}: {result or 'sem PR'}")
+            return
+
+    if args.command == 'benchmark':
+        from benchmark import run_benchmark
+        run_benchmark(
+            tasks=max(1, min(args.tasks, 500)),
+            repo_size=args.repo_size,
+            corrections=args.corrections,
+            workers=args.workers,
+            api_latency_ms=args.api_latency,
+            llm_latency_ms=args.llm_latency,
+            fixtures=args.fixtures,
+            keep=args.keep
+        )
+        return
+
     task_to_code = TaskToCode()
+
+    # Endpoint de métricas apenas nos comandos que ficam em execução; o `submit` sem servidor
+    # não abre a porta, para que vários possam rodar ao mesmo tempo
+    if args.command in ('pool', 'serve', 'watch') or (args.command == 'queue' and args.queue_command == 'run'):
+        task_to_code.serve_metrics()
+
+    if args.command in ('pool', 'submit'):
+        from worker_pool import TaskWorkerPool
+        pool = TaskWorkerPool(task_to_code)
+        if args.corrections_since:
+            pool.run_corrections(args.task_keys, args.corrections_since)
+        else:
+            pool.run(args.task_keys)
+        return
+
+    if args.command == 'batch':
+        from batch_runner import BatchRunner
+        runner = BatchRunner(task_to_code)
+        if args.jql:
+            runner.run(jql=args.jql)
+        else:
+            runner.run(task_keys=runner.read_task_keys(args.file))
+        return
+
+    if args.command == 'queue':
+        from scheduler import TaskScheduler
+        scheduler = TaskScheduler(task_to_code)
+        if args.queue_command == 'add':
+            added = scheduler.enqueue(args.task_keys, args.corrections_since)
+            print(f"{len(added)} tasks adicionadas à fila")
+        elif args.queue_command == 'list':
+            scheduler.print_queue(include_finished=args.all)
+        else:
+            scheduler.run(wait=args.wait)
+        return
+
+    if args.command == 'serve':
+        from task_server import TaskServer
+        TaskServer(
+            task_to_code, task_to_code.config.get('server', {}).get('socket_path', '.task_to_code/server.sock')
+        ).run()
+        return
+
+    if args.command == 'watch':
+        JiraWatcher(task_to_code).run()
+        return
     
     # Exemplo de uso
     task_key = input("Digite a chave da task do Jira (ex: PROJ-123): ")
@@ -109,6 +556,7 @@ def main() -> None:
     while True:
         try:
             input("\nPressione Enter para verificar correções (ou Ctrl+C para sair)...")
+            task_to_code.jira_handler.begin_cycle()
             task_to_code.process_corrections(task_key, last_updated)
             last_updated = datetime.now()
         except KeyboardInterrupt:
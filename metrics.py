@@ -0,0 +1,347 @@
+import json
+import os
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from state_store import StateStore
+from type_definitions import SpanRecord
+
+# Limites dos histogramas de duração (segundos) e de tamanho de push (bytes)
+DURATION_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+BYTES_BUCKETS = (1024, 10240, 102400, 1048576, 10485760, 104857600)
+
+# nome -> (tipo, descrição, buckets)
+METRICS: Dict[str, Tuple[str, str, Tuple[float, ...]]] = {
+    'task_to_code_tasks_total': ('counter', 'Tasks processadas por tipo, projeto e resultado', ()),
+    'task_to_code_stage_duration_seconds': ('histogram', 'Duração de cada etapa do pipeline', DURATION_BUCKETS),
+    'task_to_code_pr_lead_time_seconds': ('histogram', 'Tempo da busca no Jira até o PR criado', DURATION_BUCKETS),
+    'task_to_code_llm_runs_total': ('counter', 'Execuções do Aider por modelo e projeto', ()),
+    'task_to_code_llm_tokens_total': ('counter', 'Tokens enviados e recebidos por modelo e projeto', ()),
+    'task_to_code_llm_cost_usd_total': ('counter', 'Custo estimado em dólares por modelo e projeto', ()),
+    'task_to_code_completion_cache_hits_total': ('counter', 'Execuções atendidas pelo cache de completions', ()),
+    'task_to_code_api_requests_total': ('counter', 'Requisições às APIs do Jira e do GitHub por host e status', ()),
+    'task_to_code_rate_limit_hits_total': ('counter', 'Respostas 429 das APIs e esperas pelo limite dos modelos', ()),
+    'task_to_code_git_push_bytes': ('histogram', 'Bytes enviados por push', BYTES_BUCKETS),
+    'task_to_code_queue_items': ('gauge', 'Itens da fila do agendador por status', ()),
+    'task_to_code_pending_writes': ('gauge', 'Escritas no Jira/GitHub por status', ()),
+    'task_to_code_task_states': ('gauge', 'Tasks por resultado da última execução', ()),
+}
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def escape_label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(labels: LabelKey) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{escape_label(value)}"' for name, value in labels) + '}'
+
+
+def format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class MetricsRegistry:
+    """Contadores, histogramas e gauges no formato de exposição do Prometheus.
+
+    Os gauges vêm de `collectors`, funções chamadas a cada leitura que devolvem
+    (métrica, labels, valor) — ex: a profundidade da fila no state store.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.values: Dict[str, Dict[LabelKey, float]] = {}
+        self.histograms: Dict[str, Dict[LabelKey, List[float]]] = {}
+        self.collectors: List[Callable[[], List[Tuple[str, Dict[str, str], float]]]] = []
+
+    @staticmethod
+    def label_key(labels: Dict[str, Any]) -> LabelKey:
+        return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+    def inc(self, name: str, amount: float = 1, **labels: Any) -> None:
+        key = self.label_key(labels)
+        with self.lock:
+            series = self.values.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        buckets = METRICS[name][2]
+        key = self.label_key(labels)
+        with self.lock:
+            # Contagem por bucket (o último é +Inf), soma e total
+            series = self.histograms.setdefault(name, {})
+            state = series.setdefault(key, [0.0] * (len(buckets) + 3))
+            for index, bound in enumerate(buckets):
+                if value <= bound:
+                    state[index] += 1
+            state[len(buckets)] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def collect(self) -> Dict[str, Dict[LabelKey, Any]]:
+        """Valores atuais de todas as métricas, incluindo os gauges dos collectors."""
+        gauges: Dict[str, Dict[LabelKey, float]] = {}
+        for collector in self.collectors:
+            try:
+                for name, labels, value in collector():
+                    gauges.setdefault(name, {})[self.label_key(labels)] = value
+            except Exception as e:
+                print(f"Erro ao coletar métricas: {e}")
+        with self.lock:
+            collected = {name: dict(series) for name, series in self.values.items()}
+            collected.update({name: {key: list(state) for key, state in series.items()}
+                              for name, series in self.histograms.items()})
+        collected.update(gauges)
+        return collected
+
+    def render(self) -> str:
+        """Texto no formato de exposição do Prometheus (text/plain; version=0.0.4)."""
+        lines = []
+        collected = self.collect()
+        for name, (kind, help_text, buckets) in METRICS.items():
+            series = collected.get(name)
+            if not series:
+                continue
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            for key, value in sorted(series.items()):
+                if kind != 'histogram':
+                    lines.append(f'{name}{format_labels(key)} {format_value(value)}')
+                    continue
+                for bound, count in zip([*map(format_value, buckets), '+Inf'], value):
+                    lines.append(f'{name}_bucket{format_labels(key + (("le", bound),))} {format_value(count)}')
+                lines.append(f'{name}_sum{format_labels(key)} {format_value(value[-2])}')
+                lines.append(f'{name}_count{format_labels(key)} {format_value(value[-1])}')
+        return '\n'.join(lines) + '\n'
+
+    def snapshot(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Séries em JSON, lidas pelo comando `dashboard`."""
+        return {
+            name: [{'labels': dict(key), 'value': value} for key, value in sorted(series.items())]
+            for name, series in self.collect().items()
+        }
+
+
+class MetricsExporter:
+    """Exportador do tracer que converte os spans finalizados em métricas."""
+
+    def __init__(self, registry: MetricsRegistry) -> None:
+        self.registry = registry
+
+    def export(self, records: List[SpanRecord]) -> None:
+        for record in records:
+            self.record_span(record)
+
+    def record_span(self, record: SpanRecord) -> None:
+        registry = self.registry
+        name, attributes = record['name'], record['attributes']
+        seconds = record['duration_ms'] / 1000
+        registry.observe('task_to_code_stage_duration_seconds', seconds, stage=name)
+
+        if name in ('task.process', 'task.corrections'):
+            status = attributes.get('run_status') or ('error' if record['status'] == 'error' else 'skipped')
+            project = attributes.get('project', '')
+            kind = 'implement' if name == 'task.process' else 'corrections'
+            registry.inc('task_to_code_tasks_total', kind=kind, project=project, status=status)
+            if status == 'pr_created':
+                registry.observe('task_to_code_pr_lead_time_seconds', seconds, project=project)
+        elif name == 'aider.run':
+            if attributes.get('cache_hit'):
+                registry.inc('task_to_code_completion_cache_hits_total')
+            if attributes.get('rate_limited'):
+                registry.inc('task_to_code_rate_limit_hits_total', attributes['rate_limited'], source='llm')
+            if attributes.get('model'):
+                labels = {'model': attributes['model'], 'project': attributes.get('project', '')}
+                registry.inc('task_to_code_llm_runs_total', **labels)
+                registry.inc('task_to_code_llm_tokens_total', attributes.get('tokens_sent', 0), direction='sent', **labels)
+                registry.inc('task_to_code_llm_tokens_total', attributes.get('tokens_received', 0),
+                             direction='received', **labels)
+                registry.inc('task_to_code_llm_cost_usd_total', attributes.get('cost', 0.0), **labels)
+        elif name == 'http.request':
+            host = attributes.get('host', '')
+            registry.inc('task_to_code_api_requests_total', host=host,
+                         status_code=attributes.get('status_code', 'error'))
+            if attributes.get('rate_limited'):
+                registry.inc('task_to_code_rate_limit_hits_total', attributes['rate_limited'], source=host)
+        elif name == 'git.push':
+            registry.observe('task_to_code_git_push_bytes', attributes.get('bytes_pushed', 0),
+                             repository=attributes.get('repository', ''))
+
+
+def state_collector(state_store: StateStore) -> Callable[[], List[Tuple[str, Dict[str, str], float]]]:
+    """Gauges lidos do state store a cada coleta: fila, escritas pendentes e resultado das tasks."""
+    def collect() -> List[Tuple[str, Dict[str, str], float]]:
+        gauges = []
+        for name, table, column in (
+            ('task_to_code_queue_items', 'queue', 'status'),
+            ('task_to_code_pending_writes', 'writes', 'status'),
+            ('task_to_code_task_states', 'tasks', 'last_run_status'),
+        ):
+            for status, total in state_store.count_statuses(table, column).items():
+                gauges.append((name, {'status': status}, total))
+        return gauges
+    return collect
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    server: 'MetricsServer'
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        path = self.path.split('?', 1)[0]
+        if path == '/metrics':
+            data = self.server.registry.render().encode('utf-8')
+            content_type = 'text/plain; version=0.0.4; charset=utf-8'
+        elif path == '/metrics.json':
+            data = json.dumps(self.server.registry.snapshot()).encode('utf-8')
+            content_type = 'application/json'
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class MetricsServer(ThreadingHTTPServer):
+    """Listener local com `/metrics` (Prometheus) e `/metrics.json` (dashboard)."""
+
+    daemon_threads = True
+
+    def __init__(self, registry: MetricsRegistry, host: str, port: int) -> None:
+        super().__init__((host, port), MetricsHandler)
+        self.registry = registry
+
+    def start(self) -> None:
+        threading.Thread(target=self.serve_forever, name='metrics', daemon=True).start()
+
+
+def get_metrics_url(config: dict) -> str:
+    metrics_config = config.get('metrics', {})
+    return f"http://{metrics_config.get('host', '127.0.0.1')}:{metrics_config.get('port', 9464)}/metrics.json"
+
+
+def load_snapshot(config: dict) -> Tuple[Dict[str, List[Dict[str, Any]]], str]:
+    """Métricas do processo em execução; sem ele, reconstrói a partir dos spans gravados e do state store."""
+    import httpx
+
+    url = get_metrics_url(config)
+    try:
+        return httpx.get(url, timeout=2.0).json(), url
+    except (httpx.HTTPError, ValueError):
+        pass
+
+    registry = MetricsRegistry()
+    jsonl_path = config.get('tracing', {}).get('jsonl_path', '.task_to_code/traces.jsonl')
+    if os.path.exists(jsonl_path):
+        exporter = MetricsExporter(registry)
+        with open(jsonl_path, 'r', encoding='utf-8') as file:
+            for line in file:
+                if line.strip():
+                    exporter.record_span(json.loads(line))
+    state_path = config.get('state', {}).get('path', '.task_to_code/state.db')
+    if os.path.exists(state_path):
+        registry.collectors.append(state_collector(StateStore(state_path)))
+    return registry.snapshot(), jsonl_path
+
+
+def histogram_quantile(metric: str, value: List[float], fraction: float) -> float:
+    """Quantil aproximado pelos buckets do histograma (limite superior do bucket)."""
+    buckets = METRICS[metric][2]
+    total = value[-1]
+    if not total:
+        return 0.0
+    for bound, count in zip(buckets, value):
+        if count >= fraction * total:
+            return bound
+    return float('inf')
+
+
+def sum_by(series: List[Dict[str, Any]], *labels: str) -> Dict[Tuple[str, ...], float]:
+    totals: Counter = Counter()
+    for sample in series:
+        totals[tuple(sample['labels'].get(label, '') for label in labels)] += sample['value']
+    return totals
+
+
+def render_dashboard(snapshot: Dict[str, List[Dict[str, Any]]], source: str,
+                     previous: Optional[Dict[Tuple[str, ...], float]], elapsed: float) -> str:
+    lines = [f"=== Task to Code — {time.strftime('%H:%M:%S')} ({source}) ===", '']
+
+    queue = sum_by(snapshot.get('task_to_code_queue_items', []), 'status')
+    writes = sum_by(snapshot.get('task_to_code_pending_writes', []), 'status')
+    lines.append('Fila: ' + (', '.join(f"{status} {int(total)}" for (status,), total in sorted(queue.items())) or 'vazia'))
+    lines.append('Escritas Jira/GitHub: ' + (', '.join(
+        f"{status} {int(total)}" for (status,), total in sorted(writes.items())) or 'nenhuma'))
+
+    tasks = sum_by(snapshot.get('task_to_code_tasks_total', []), 'kind', 'status')
+    if tasks:
+        lines += ['', f"{'Tasks':<14}{'Resultado':<22}{'Total':>8}{'/min':>8}"]
+        for key, total in sorted(tasks.items()):
+            rate = (total - previous.get(key, 0)) * 60 / elapsed if previous is not None and elapsed else None
+            lines.append(f"{key[0]:<14}{key[1]:<22}{int(total):>8}{'-' if rate is None else f'{rate:.1f}':>8}")
+
+    stages = snapshot.get('task_to_code_stage_duration_seconds', [])
+    if stages:
+        metric = 'task_to_code_stage_duration_seconds'
+        lines += ['', f"{'Etapa':<26}{'Qtd':>8}{'p50 (s)':>10}{'p95 (s)':>10}{'média (s)':>11}"]
+        for sample in stages:
+            value = sample['value']
+            lines.append(f"{sample['labels']['stage']:<26}{int(value[-1]):>8}"
+                         f"{histogram_quantile(metric, value, 0.5):>10g}{histogram_quantile(metric, value, 0.95):>10g}"
+                         f"{value[-2] / value[-1]:>11.2f}")
+
+    tokens = sum_by(snapshot.get('task_to_code_llm_tokens_total', []), 'model', 'project', 'direction')
+    costs = sum_by(snapshot.get('task_to_code_llm_cost_usd_total', []), 'model', 'project')
+    runs = sum_by(snapshot.get('task_to_code_llm_runs_total', []), 'model', 'project')
+    if runs:
+        lines += ['', f"{'Modelo':<48}{'Projeto':<10}{'Execuções':>10}{'Enviados':>12}{'Recebidos':>11}{'Custo':>10}"]
+        for (model, project), total in sorted(runs.items()):
+            lines.append(f"{model:<48}{project:<10}{int(total):>10}{int(tokens[(model, project, 'sent')]):>12}"
+                         f"{int(tokens[(model, project, 'received')]):>11}{costs[(model, project)]:>10.4f}")
+
+    requests = sum_by(snapshot.get('task_to_code_api_requests_total', []), 'host', 'status_code')
+    if requests:
+        lines += ['', 'Requisições: ' + ', '.join(
+            f"{host} {status} {int(total)}" for (host, status), total in sorted(requests.items()))]
+    rate_limits = sum_by(snapshot.get('task_to_code_rate_limit_hits_total', []), 'source')
+    if rate_limits:
+        lines.append('Limites atingidos: ' + ', '.join(
+            f"{source} {int(total)}" for (source,), total in sorted(rate_limits.items())))
+    pushes = snapshot.get('task_to_code_git_push_bytes', [])
+    if pushes:
+        count = sum(sample['value'][-1] for sample in pushes)
+        size = sum(sample['value'][-2] for sample in pushes)
+        lines.append(f"Pushes: {int(count)}, {size / 1024:.1f} KiB no total")
+    return '\n'.join(lines)
+
+
+def run_dashboard(config: dict, interval: float = 5.0, once: bool = False) -> None:
+    """Painel no terminal com as métricas do processo em execução (ou dos spans gravados)."""
+    previous: Optional[Dict[Tuple[str, ...], float]] = None
+    last_read = time.monotonic()
+    try:
+        while True:
+            snapshot, source = load_snapshot(config)
+            now = time.monotonic()
+            output = render_dashboard(snapshot, source, previous, now - last_read)
+            if once:
+                print(output)
+                return
+            # Limpa a tela e redesenha o painel
+            print(f"\033[2J\033[H{output}\n\n(Ctrl+C para sair)", flush=True)
+            previous = sum_by(snapshot.get('task_to_code_tasks_total', []), 'kind', 'status')
+            last_read = now
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,177 @@
+import os
+import shutil
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from git import Repo
+
+from git_service import GitService
+from instrumentation import tracer
+
+# Arquivo dentro do mirror cuja data de modificação marca o último uso
+LAST_USED_FILE = 'task_to_code_last_used'
+
+
+def get_directory_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+class MirrorCache:
+    """Mirrors bare dos repositórios dos projetos, clonados no primeiro uso.
+
+    Projetos sem `directory` no config.yaml ganham um mirror em `git.mirrors.directory` e um
+    checkout leve (worktree do mirror) usado como diretório do projeto. Os worktrees das tasks
+    também saem do mirror, então os objetos de cada repositório são baixados e guardados uma
+    única vez por máquina. Uma thread mantém atualizados os mirrors em uso, e os usados há mais
+    tempo são removidos quando o cache passa de `max_size_mb` ou `max_mirrors`.
+    """
+
+    def __init__(self, config: dict, git_service: GitService) -> None:
+        mirrors_config = config.get('git', {}).get('mirrors', {})
+        self.config = config
+        self.git = git_service
+        self.directory = os.path.abspath(mirrors_config.get('directory', '.task_to_code/mirrors'))
+        self.refresh_interval = mirrors_config.get('refresh_interval', 300)
+        self.max_size_mb = mirrors_config.get('max_size_mb', 0)
+        self.max_mirrors = mirrors_config.get('max_mirrors', 0)
+        # Checkouts por projeto; os mirrors usados por este processo nunca são removidos por ele
+        self.checkouts: Dict[str, str] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._fetcher: Optional[threading.Thread] = None
+
+    def get_paths(self, project: str) -> Tuple[str, str]:
+        """Caminhos do mirror bare e do checkout do projeto."""
+        slug = self.config['projects'][project]['repository'].replace('/', '__')
+        return os.path.join(self.directory, f'{slug}.git'), os.path.join(self.directory, slug)
+
+    def _project_lock(self, project: str) -> threading.Lock:
+        with self._lock:
+            return self._locks.setdefault(project, threading.Lock())
+
+    def get_checkout(self, project: str) -> str:
+        """Checkout do projeto sobre o mirror, clonando o repositório se ainda não estiver no cache."""
+        mirror_path, checkout_path = self.get_paths(project)
+        cloned = False
+        with self._project_lock(project):
+            if not os.path.isdir(mirror_path):
+                self.clone(self.config['projects'][project]['repository'], mirror_path)
+                cloned = True
+            mirror = self.git.get_repo(mirror_path)
+            if not os.path.isdir(checkout_path):
+                base_ref = self.git.fetch_base(mirror, self.config['github']['base_branch'])
+                mirror.git.worktree('prune')
+                mirror.git.worktree('add', '--detach', checkout_path, base_ref)
+            self.touch(mirror_path)
+            with self._lock:
+                self.checkouts[project] = checkout_path
+        self.start_fetcher()
+        if cloned:
+            self.evict()
+        return checkout_path
+
+    def clone(self, repository: str, mirror_path: str) -> None:
+        """Clona o repositório como mirror bare (apenas refs remotas; as branches locais são das tasks)."""
+        print(f"Clonando {repository} para o cache de mirrors...")
+        os.makedirs(self.directory, exist_ok=True)
+        # Clona em um diretório temporário para que um clone interrompido não fique no cache
+        tmp_path = f'{mirror_path}.tmp-{os.getpid()}'
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        with tracer.span('git.mirror_clone', repository=repository) as span:
+            repo = Repo.init(tmp_path, bare=True)
+            repo.git.remote('add', 'origin', self.git.get_remote_url(repository))
+            repo.git.fetch('--no-tags', 'origin', env=self.git.get_auth_env())
+            repo.close()
+            span.set_attribute('bytes', get_directory_size(tmp_path))
+        try:
+            os.rename(tmp_path, mirror_path)
+        except OSError:
+            # Outro processo terminou o clone primeiro
+            shutil.rmtree(tmp_path, ignore_errors=True)
+
+    @staticmethod
+    def touch(mirror_path: str) -> None:
+        marker = os.path.join(mirror_path, LAST_USED_FILE)
+        with open(marker, 'a'):
+            os.utime(marker)
+
+    @staticmethod
+    def get_last_used(mirror_path: str) -> float:
+        try:
+            return os.path.getmtime(os.path.join(mirror_path, LAST_USED_FILE))
+        except OSError:
+            return 0.0
+
+    def start_fetcher(self) -> None:
+        with self._lock:
+            if self._fetcher or not self.refresh_interval:
+                return
+            self._fetcher = threading.Thread(target=self._fetch_loop, name='mirror-fetcher', daemon=True)
+            self._fetcher.start()
+
+    def _fetch_loop(self) -> None:
+        """Atualiza os mirrors em uso, de forma que as tasks encontrem a base já buscada."""
+        while True:
+            time.sleep(self.refresh_interval)
+            with self._lock:
+                mirrors = [self.get_paths(project)[0] for project in self.checkouts]
+            for mirror_path in mirrors:
+                try:
+                    self.git.fetch_all(self.git.get_repo(mirror_path))
+                    # Mantém o mirror como recente para a remoção feita por outros processos
+                    self.touch(mirror_path)
+                except Exception as e:
+                    print(f"Erro ao atualizar o mirror {os.path.basename(mirror_path)}: {e}")
+            # Os fetches também aumentam o cache
+            try:
+                self.evict()
+            except Exception as e:
+                print(f"Erro ao limpar o cache de mirrors: {e}")
+
+    @staticmethod
+    def has_task_worktrees(mirror_path: str) -> bool:
+        """Verifica se há worktrees de tasks além do checkout do projeto (ex: outro processo)."""
+        repo = Repo(mirror_path)
+        try:
+            repo.git.worktree('prune')
+            worktrees = [line for line in repo.git.worktree('list', '--porcelain').splitlines()
+                         if line.startswith('worktree ')]
+        finally:
+            repo.close()
+        # O próprio mirror e o checkout do projeto
+        return len(worktrees) > 2
+
+    def evict(self) -> None:
+        """Remove os mirrors usados há mais tempo até o cache voltar aos limites configurados."""
+        if not self.max_size_mb and not self.max_mirrors:
+            return
+        with self._lock:
+            active = {self.get_paths(project)[0] for project in self.checkouts}
+        mirrors: List[str] = [
+            os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.endswith('.git')
+        ]
+        sizes = {path: get_directory_size(path) + get_directory_size(path[:-len('.git')]) for path in mirrors}
+        total_size, count = sum(sizes.values()), len(mirrors)
+
+        for mirror_path in sorted(mirrors, key=self.get_last_used):
+            over_size = self.max_size_mb and total_size > self.max_size_mb * 1024 * 1024
+            over_count = self.max_mirrors and count > self.max_mirrors
+            if not (over_size or over_count):
+                break
+            if mirror_path in active or self.has_task_worktrees(mirror_path):
+                continue
+            print(f"Removendo {os.path.basename(mirror_path)} do cache de mirrors "
+                  f"({sizes[mirror_path] / 1024 / 1024:.0f} MB, sem uso recente)")
+            self.git.forget_repo(mirror_path)
+            shutil.rmtree(mirror_path[:-len('.git')], ignore_errors=True)
+            shutil.rmtree(mirror_path, ignore_errors=True)
+            total_size -= sizes[mirror_path]
+            count -= 1
@@ -0,0 +1,180 @@
+import os
+import threading
+import time
+from collections import deque
+from typing import TYPE_CHECKING, Callable, Deque, Dict, List, Optional, Tuple
+
+from description_parser import match_task_pattern
+from http_client import configure_llm_sessions
+from instrumentation import tracer
+from rate_limiter import RateLimiter
+from type_definitions import ModelCandidate, Task
+
+if TYPE_CHECKING:
+    from aider.models import Model
+
+# Aproximação usada para estimar o contexto a partir do tamanho dos arquivos
+BYTES_PER_TOKEN = 4
+
+
+class ModelStats:
+    """Janela móvel das últimas chamadas de um modelo: (segundos, sucesso, tokens recebidos)."""
+
+    def __init__(self, window: int) -> None:
+        self.calls: Deque[Tuple[float, bool, int]] = deque(maxlen=window)
+        self.consecutive_failures = 0
+        self.unavailable_until = 0.0
+
+    def record(self, seconds: float, ok: bool, tokens: int) -> None:
+        self.calls.append((seconds, ok, tokens))
+        self.consecutive_failures = 0 if ok else self.consecutive_failures + 1
+
+    @property
+    def latency(self) -> Optional[float]:
+        """Duração média das chamadas bem-sucedidas (None sem histórico)."""
+        durations = [seconds for seconds, ok, _ in self.calls if ok]
+        return sum(durations) / len(durations) if durations else None
+
+    @property
+    def error_rate(self) -> float:
+        return sum(1 for _, ok, _ in self.calls if not ok) / len(self.calls) if self.calls else 0.0
+
+    @property
+    def tokens_per_second(self) -> float:
+        seconds = sum(seconds for seconds, ok, _ in self.calls if ok)
+        return sum(tokens for _, ok, tokens in self.calls if ok) / seconds if seconds else 0.0
+
+
+class ModelRouter:
+    """Escolhe o modelo de cada execução do Aider entre os candidatos de `openrouter.models`.
+
+    Correções e tasks dos tipos em `routing.fast_task_types` vão para os modelos `fast`, a não ser
+    que o contexto estimado passe de `routing.large_context_tokens`; o resto vai para os `strong`.
+    Dentro do tier, vence o modelo com menor latência recente (penalizada pela taxa de erros e pela
+    espera no limite de requisições). Modelos que falham seguidamente ficam em pausa por
+    `routing.cooldown` segundos e as tasks seguintes usam os outros candidatos.
+    """
+
+    def __init__(self, config: dict, rate_limiter: RateLimiter) -> None:
+        self.config = config
+        self.rate_limiter = rate_limiter
+        openrouter_config = config['openrouter']
+        routing_config = openrouter_config.get('routing', {})
+        self.default_model = openrouter_config['model']
+        self.candidates: List[ModelCandidate] = (
+            openrouter_config.get('models') or [{'name': self.default_model, 'tier': 'strong'}]
+        )
+        self.fast_task_types = [task_type.lower() for task_type in routing_config.get('fast_task_types', [])]
+        self.large_context_tokens = routing_config.get('large_context_tokens', 12000)
+        self.max_error_rate = routing_config.get('max_error_rate', 0.5)
+        self.max_consecutive_failures = routing_config.get('max_consecutive_failures', 2)
+        self.cooldown = routing_config.get('cooldown', 120)
+        self.window = routing_config.get('window', 20)
+        self.stats: Dict[str, ModelStats] = {
+            candidate['name']: ModelStats(self.window) for candidate in self.candidates
+        }
+        self._stats_lock = threading.Lock()
+        self._models: Dict[str, 'Model'] = {}
+        self._models_lock = threading.Lock()
+
+    def get_model(self, name: str) -> 'Model':
+        """Modelo do Aider, criado no primeiro uso (importa o Aider/litellm e carrega os metadados)."""
+        with self._models_lock:
+            if name not in self._models:
+                from aider.models import Model
+
+                # Keep-alive para o LLM
+                configure_llm_sessions(self.config)
+                model = Model(name)
+                # O tempo máximo da task também limita cada requisição, para abortar gerações travadas
+                max_seconds = self.config['aider'].get('budget', {}).get('max_seconds')
+                if max_seconds:
+                    model.extra_params = {**(model.extra_params or {}), 'timeout': max_seconds}
+                model.send_completion = self.limit_requests(name, model.send_completion)
+                self._models[name] = model
+            return self._models[name]
+
+    def limit_requests(self, name: str, send_completion: Callable) -> Callable:
+        """Consome uma ficha do limite do modelo a cada chamada ao LLM, inclusive nas retentativas do Aider."""
+        def limited_send_completion(*args, **kwargs):
+            if self.rate_limiter.acquire(name):
+                tracer.increment('rate_limited')
+            return send_completion(*args, **kwargs)
+        return limited_send_completion
+
+    @staticmethod
+    def estimate_context_tokens(prompt: str, paths: List[str]) -> int:
+        """Estimativa grosseira dos tokens de contexto: prompt mais o tamanho dos arquivos."""
+        size = len(prompt.encode('utf-8'))
+        for path in paths:
+            if os.path.isfile(path):
+                size += os.path.getsize(path)
+        return size // BYTES_PER_TOKEN
+
+    def get_task_type(self, task: Task) -> str:
+        """Nome do padrão de `jira.task_patterns` do tipo da task (ex: `Bug` → `bugfix`)."""
+        matched = match_task_pattern(self.config.get('jira', {}).get('task_patterns', []), task['type'])
+        return matched[1]['name'].lower() if matched else task['type'].strip().lower()
+
+    def get_tier(self, task: Task, kind: str, context_tokens: int) -> str:
+        if context_tokens >= self.large_context_tokens:
+            return 'strong'
+        if kind == 'corrections' or self.get_task_type(task) in self.fast_task_types:
+            return 'fast'
+        return 'strong'
+
+    def score(self, name: str) -> float:
+        """Tempo esperado (s) de uma chamada ao modelo; sem histórico o modelo é experimentado."""
+        stats = self.stats[name]
+        latency = stats.latency or 0.0
+        return latency * (1 + 4 * stats.error_rate) + self.rate_limiter.wait_time(name)
+
+    def route(self, task: Task, kind: str, context_tokens: int) -> List[str]:
+        """Ordem de tentativa dos modelos para a execução."""
+        tier = self.get_tier(task, kind, context_tokens)
+        candidates = [
+            candidate for candidate in self.candidates
+            if context_tokens <= candidate.get('max_context_tokens', context_tokens)
+        ] or self.candidates
+        now = time.monotonic()
+        with self._stats_lock:
+            ranked = sorted(candidates, key=lambda candidate: (
+                self.stats[candidate['name']].unavailable_until > now,
+                candidate.get('tier', 'strong') != tier,
+                self.score(candidate['name']),
+                -self.stats[candidate['name']].tokens_per_second
+            ))
+        return [candidate['name'] for candidate in ranked]
+
+    def record(self, name: str, seconds: float, ok: bool, tokens: int = 0) -> None:
+        """Registra o resultado de uma chamada e pausa o modelo se ele estiver degradado."""
+        with self._stats_lock:
+            stats = self.stats.setdefault(name, ModelStats(self.window))
+            stats.record(seconds, ok, tokens)
+            degraded = (
+                stats.consecutive_failures >= self.max_consecutive_failures
+                or (len(stats.calls) >= 4 and stats.error_rate > self.max_error_rate)
+            )
+            if not ok and degraded:
+                stats.unavailable_until = time.monotonic() + self.cooldown
+                print(f"Modelo {name} degradado ({stats.error_rate:.0%} de erros), pausado por {self.cooldown}s")
+
+    def wait_time(self) -> float:
+        """Menor espera no limite de requisições entre os modelos disponíveis."""
+        now = time.monotonic()
+        names = [
+            candidate['name'] for candidate in self.candidates
+            if self.stats[candidate['name']].unavailable_until <= now
+        ] or [candidate['name'] for candidate in self.candidates]
+        return min(self.rate_limiter.wait_time(name) for name in names)
+
+    def report(self) -> str:
+        lines = []
+        for candidate in self.candidates:
+            stats = self.stats[candidate['name']]
+            latency = f"{stats.latency:.1f}s" if stats.latency is not None else '-'
+            lines.append(
+                f"{candidate['name']} ({candidate.get('tier', 'strong')}): {len(stats.calls)} chamadas, "
+                f"latência {latency}, {stats.error_rate:.0%} de erros, {stats.tokens_per_second:.0f} tokens/s"
+            )
+        return '\n'.join(lines)
@@ -0,0 +1,60 @@
+import threading
+import time
+from typing import Dict, Optional
+
+
+class TokenBucket:
+    """Token bucket: `rate` fichas por segundo, acumulando no máximo `capacity`."""
+
+    def __init__(self, rate: float, capacity: int) -> None:
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def wait_time(self) -> float:
+        """Segundos até haver uma ficha disponível (0 se já houver)."""
+        with self.lock:
+            self._refill()
+            return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def acquire(self) -> bool:
+        """Consome uma ficha, aguardando a reposição se necessário; True se precisou aguardar."""
+        waited = False
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) / self.rate
+            waited = True
+            time.sleep(delay)
+
+
+class RateLimiter:
+    """Limites de requisições por modelo (`openrouter.rate_limits`)."""
+
+    def __init__(self, config: dict) -> None:
+        self.buckets: Dict[str, TokenBucket] = {
+            model: TokenBucket(limit['requests_per_minute'] / 60, limit.get('burst', 1))
+            for model, limit in config.get('openrouter', {}).get('rate_limits', {}).items()
+            if limit.get('requests_per_minute')
+        }
+
+    def get_bucket(self, model: str) -> Optional[TokenBucket]:
+        return self.buckets.get(model)
+
+    def wait_time(self, model: str) -> float:
+        bucket = self.buckets.get(model)
+        return bucket.wait_time() if bucket else 0.0
+
+    def acquire(self, model: str) -> bool:
+        bucket = self.buckets.get(model)
+        return bucket.acquire() if bucket else False
@@ -0,0 +1,168 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from description_parser import match_task_pattern
+from type_definitions import QueueItem, Task
+from worker_pool import TaskWorkerPool
+
+if TYPE_CHECKING:
+    from main import TaskToCode
+
+# Correções passam à frente de implementações novas: há revisores esperando por elas
+KIND_RANKS = {'corrections': 0, 'implement': 1}
+DEFAULT_JIRA_PRIORITIES = ['Highest', 'High', 'Medium', 'Low', 'Lowest']
+
+
+class TaskScheduler:
+    """Fila persistente de tasks com prioridade, divisão justa entre projetos e limite por modelo.
+
+    A ordem é: correções antes de implementações, depois a prioridade do Jira e o tipo da task
+    (`priority` em `jira.task_patterns`). Entre projetos, o próximo worker vai para o projeto com
+    menos execuções em andamento em relação ao seu peso (`projects.<CHAVE>.weight`).
+    """
+
+    def __init__(self, task_to_code: 'TaskToCode') -> None:
+        self.task_to_code = task_to_code
+        self.config = task_to_code.config
+        self.store = task_to_code.state_store
+        self.pool = TaskWorkerPool(task_to_code)
+        scheduler_config = self.config.get('scheduler', {})
+        self.jira_priorities = [
+            name.lower() for name in scheduler_config.get('jira_priorities', DEFAULT_JIRA_PRIORITIES)
+        ]
+        self.poll_interval = scheduler_config.get('poll_interval', 5)
+        self.running: Dict[str, int] = {}
+        self.last_served: Dict[str, float] = {}
+        self.condition = threading.Condition()
+
+    def get_type_rank(self, task_type: str) -> int:
+        patterns = self.config['jira'].get('task_patterns', [])
+        matched = match_task_pattern(patterns, task_type)
+        if matched:
+            index, pattern = matched
+            return pattern.get('priority', index)
+        return max([pattern.get('priority', index) for index, pattern in enumerate(patterns)], default=0) + 1
+
+    def get_priority(self, task: Task, kind: str) -> int:
+        """Chave de ordenação da task (menor primeiro)."""
+        jira_priority = task.get('priority', '').lower()
+        jira_rank = (
+            self.jira_priorities.index(jira_priority) if jira_priority in self.jira_priorities
+            else len(self.jira_priorities)
+        )
+        return KIND_RANKS[kind] * 10000 + jira_rank * 100 + min(self.get_type_rank(task['type']), 99)
+
+    def enqueue(self, task_keys: List[str], corrections_since: Optional[datetime] = None) -> List[str]:
+        """Busca as tasks e as coloca na fila. Retorna as chaves efetivamente adicionadas."""
+        jira_handler = self.task_to_code.jira_handler
+        jira_handler.begin_cycle()
+        runtime = self.task_to_code.runtime
+        runtime.run(jira_handler.prefetch_snapshots(runtime.http, task_keys))
+
+        kind = 'corrections' if corrections_since else 'implement'
+        added = []
+        for task_key in task_keys:
+            try:
+                task = jira_handler.get_task(task_key)
+            except Exception as e:
+                print(f"Erro ao obter a task {task_key}: {e}")
+                continue
+            # Tasks fora do padrão não chegam a ocupar a fila
+            if not corrections_since and not self.task_to_code.validate_task(task):
+                continue
+            if task['project'] not in self.config['projects']:
+                print(f"Projeto {task['project']} não está configurado no config.yaml")
+                continue
+            since = corrections_since.isoformat() if corrections_since else None
+            if self.store.enqueue(task_key, kind, task['project'], self.get_priority(task, kind), since):
+                added.append(task_key)
+            else:
+                print(f"{task_key} já está na fila")
+        with self.condition:
+            self.condition.notify_all()
+        return added
+
+    def get_project_limit(self, project: str) -> int:
+        return self.config['projects'].get(project, {}).get('max_workers', self.pool.max_workers)
+
+    def next_item(self) -> Optional[QueueItem]:
+        """Escolhe o próximo item respeitando a classe de prioridade e a divisão justa entre projetos."""
+        queued = [
+            item for item in self.store.get_queue(('queued',))
+            if self.running.get(item['project'], 0) < self.get_project_limit(item['project'])
+        ]
+        if not queued:
+            return None
+
+        # Correções pendentes de qualquer projeto passam à frente das implementações
+        best_kind = min(KIND_RANKS[item['kind']] for item in queued)
+        candidates = [item for item in queued if KIND_RANKS[item['kind']] == best_kind]
+
+        def share(project: str) -> tuple:
+            weight = self.config['projects'].get(project, {}).get('weight', 1) or 1
+            return self.running.get(project, 0) / weight, self.last_served.get(project, 0.0)
+
+        # Projetos na ordem do seu item mais prioritário, que desempata as partes iguais
+        project = min(dict.fromkeys(item['project'] for item in candidates), key=share)
+        # A fila já vem ordenada por prioridade
+        return next(item for item in candidates if item['project'] == project)
+
+    def execute(self, item: QueueItem) -> None:
+        try:
+            if item['kind'] == 'corrections':
+                result = self.pool.process_corrections(item['task_key'], datetime.fromisoformat(item['since']))
+            else:
+                result = self.pool.process_task(item['task_key'])
+            status = 'done' if result else 'failed'
+        except Exception as e:
+            print(f"Erro ao processar task {item['task_key']}: {e}")
+            result, status = None, 'failed'
+        finally:
+            with self.condition:
+                self.running[item['project']] -= 1
+                self.condition.notify_all()
+        self.store.update_queue_item(item['id'], status=status, result=result, finished_at=datetime.now().isoformat())
+
+    def run(self, wait: bool = False) -> None:
+        """Processa a fila até esvaziá-la (ou continuamente, com `wait`)."""
+        requeued = self.store.requeue_running()
+        if requeued:
+            print(f"{requeued} itens interrompidos voltaram para a fila")
+
+        router = self.task_to_code.aider_handler.router
+        with ThreadPoolExecutor(max_workers=self.pool.max_workers, thread_name_prefix='task') as executor:
+            while True:
+                with self.condition:
+                    busy = sum(self.running.values())
+                    item = self.next_item() if busy < self.pool.max_workers else None
+                    if not item:
+                        if not busy and not wait and not self.store.get_queue(('queued',)):
+                            break
+                        self.condition.wait(self.poll_interval)
+                        continue
+
+                    # Sem fichas em nenhum modelo, aguarda em vez de ocupar um worker bloqueado
+                    delay = router.wait_time()
+                    if delay > 0:
+                        self.condition.wait(delay)
+                        continue
+
+                    self.running[item['project']] = self.running.get(item['project'], 0) + 1
+                    self.last_served[item['project']] = datetime.now().timestamp()
+                self.store.update_queue_item(item['id'], status='running', started_at=datetime.now().isoformat())
+                print(f"Iniciando {item['task_key']} ({item['kind']}, prioridade {item['priority']})")
+                executor.submit(self.execute, item)
+        # Envia os comentários pendentes sem aguardar a janela de agrupamento
+        self.task_to_code.write_back.flush()
+
+    def print_queue(self, include_finished: bool = False) -> None:
+        statuses = ('queued', 'running', 'done', 'failed') if include_finished else ('queued', 'running')
+        items = self.store.get_queue(statuses)
+        print(f"{'ID':>5}  {'Status':<8} {'Tipo':<12} {'Prioridade':>10}  {'Projeto':<10} {'Task':<14} Resultado")
+        for item in items:
+            print(f"{item['id']:>5}  {item['status']:<8} {item['kind']:<12} {item['priority']:>10}  "
+                  f"{item['project']:<10} {item['task_key']:<14} {item['result'] or ''}")
+        if not items:
+            print("Fila vazia")
@@ -0,0 +1,207 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from instrumentation import tracer
+from type_definitions import PendingWrite, QueueItem, TaskState
+
+
+class StateStore:
+    """Estado persistente das tasks (SQLite), usado para tornar reinícios e reprocessamentos incrementais."""
+
+    TASK_COLUMNS = (
+        'project', 'description_hash', 'last_comment_id', 'branch', 'pr_number', 'pr_url',
+        'last_run_status', 'last_run_at'
+    )
+
+    def __init__(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        # A conexão é compartilhada entre as threads do pool, protegida por um lock
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        self.lock = threading.Lock()
+        with self.lock, self.connection:
+            self.connection.execute('PRAGMA journal_mode=WAL')
+            self.connection.execute('''
+                CREATE TABLE IF NOT EXISTS tasks (
+                    task_key TEXT PRIMARY KEY,
+                    project TEXT,
+                    description_hash TEXT,
+                    last_comment_id INTEGER,
+                    branch TEXT,
+                    pr_number INTEGER,
+                    pr_url TEXT,
+                    last_run_status TEXT,
+                    last_run_at TEXT,
+                    created_at TEXT NOT NULL,
+                    updated_at TEXT NOT NULL
+                )
+            ''')
+            self.connection.execute('''
+                CREATE TABLE IF NOT EXISTS meta (
+                    name TEXT PRIMARY KEY,
+                    value TEXT
+                )
+            ''')
+            # Fila do agendador: `kind` é 'corrections' ou 'implement'; menor `priority` sai primeiro
+            self.connection.execute('''
+                CREATE TABLE IF NOT EXISTS queue (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    task_key TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    project TEXT NOT NULL,
+                    priority INTEGER NOT NULL,
+                    status TEXT NOT NULL,
+                    since TEXT,
+                    result TEXT,
+                    enqueued_at TEXT NOT NULL,
+                    started_at TEXT,
+                    finished_at TEXT
+                )
+            ''')
+            self.connection.execute('CREATE INDEX IF NOT EXISTS queue_status ON queue (status, priority, id)')
+            # Escritas no Jira/GitHub: `target` é 'jira_comment', 'jira_transition' ou 'pr_comment';
+            # `resource` é a chave da issue ou 'owner/repo#numero'. `dedupe_key` torna o envio idempotente
+            self.connection.execute('''
+                CREATE TABLE IF NOT EXISTS writes (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    target TEXT NOT NULL,
+                    resource TEXT NOT NULL,
+                    body TEXT NOT NULL,
+                    dedupe_key TEXT UNIQUE,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    next_attempt_at REAL NOT NULL DEFAULT 0,
+                    error TEXT,
+                    created_at TEXT NOT NULL,
+                    sent_at TEXT
+                )
+            ''')
+            self.connection.execute('CREATE INDEX IF NOT EXISTS writes_status ON writes (status, id)')
+
+    @staticmethod
+    def hash_description(description: str) -> str:
+        """Hash da descrição, para detectar mudanças reais independentemente do campo `updated`."""
+        return hashlib.sha256(description.encode('utf-8')).hexdigest()
+
+    def get_task_state(self, task_key: str) -> Optional[TaskState]:
+        """Obtém o estado salvo de uma task."""
+        with self.lock:
+            row = self.connection.execute('SELECT * FROM tasks WHERE task_key = ?', (task_key,)).fetchone()
+        return dict(row) if row else None
+
+    def save_task_state(self, task_key: str, **values: Any) -> None:
+        """Cria ou atualiza o estado de uma task com os valores informados."""
+        unknown = set(values) - set(self.TASK_COLUMNS)
+        if unknown:
+            raise ValueError(f"Campos de estado desconhecidos: {', '.join(sorted(unknown))}")
+
+        now = datetime.now().isoformat()
+        columns = list(values)
+        assignments = ', '.join(f'{column} = excluded.{column}' for column in columns + ['updated_at'])
+        with self.lock, self.connection:
+            self.connection.execute(
+                f'''
+                INSERT INTO tasks (task_key, {', '.join(columns + ['created_at', 'updated_at'])})
+                VALUES ({', '.join('?' * (len(columns) + 3))})
+                ON CONFLICT(task_key) DO UPDATE SET {assignments}
+                ''',
+                [task_key, *values.values(), now, now]
+            )
+
+    def record_run(self, task_key: str, status: str, **values: Any) -> None:
+        """Registra o resultado da última execução do pipeline para a task."""
+        # O resultado fica no span da task, para as métricas por status e projeto
+        tracer.set_attribute('run_status', status)
+        if values.get('project'):
+            tracer.set_attribute('project', values['project'])
+        self.save_task_state(task_key, last_run_status=status, last_run_at=datetime.now().isoformat(), **values)
+
+    def get_meta(self, name: str) -> Optional[str]:
+        with self.lock:
+            row = self.connection.execute('SELECT value FROM meta WHERE name = ?', (name,)).fetchone()
+        return row['value'] if row else None
+
+    def set_meta(self, name: str, value: Optional[str]) -> None:
+        with self.lock, self.connection:
+            self.connection.execute(
+                'INSERT INTO meta (name, value) VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET value = excluded.value',
+                (name, value)
+            )
+
+    def enqueue(self, task_key: str, kind: str, project: str, priority: int, since: Optional[str] = None) -> bool:
+        """Adiciona a task à fila, exceto se já houver um item igual aguardando ou em execução."""
+        with self.lock, self.connection:
+            active = self.connection.execute(
+                "SELECT id FROM queue WHERE task_key = ? AND kind = ? AND status IN ('queued', 'running')",
+                (task_key, kind)
+            ).fetchone()
+            if active:
+                return False
+            self.connection.execute(
+                '''
+                INSERT INTO queue (task_key, kind, project, priority, status, since, enqueued_at)
+                VALUES (?, ?, ?, ?, 'queued', ?, ?)
+                ''',
+                (task_key, kind, project, priority, since, datetime.now().isoformat())
+            )
+            return True
+
+    def get_queue(self, statuses: tuple = ('queued', 'running')) -> List[QueueItem]:
+        """Itens da fila nos status informados, na ordem de prioridade."""
+        with self.lock:
+            rows = self.connection.execute(
+                f"SELECT * FROM queue WHERE status IN ({', '.join('?' * len(statuses))}) ORDER BY priority, id",
+                statuses
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def update_queue_item(self, item_id: int, **values: Any) -> None:
+        assignments = ', '.join(f'{column} = ?' for column in values)
+        with self.lock, self.connection:
+            self.connection.execute(f'UPDATE queue SET {assignments} WHERE id = ?', [*values.values(), item_id])
+
+    def requeue_running(self) -> int:
+        """Devolve à fila os itens que estavam em execução quando o processo foi interrompido."""
+        with self.lock, self.connection:
+            return self.connection.execute(
+                "UPDATE queue SET status = 'queued', started_at = NULL WHERE status = 'running'"
+            ).rowcount
+
+    def add_write(self, target: str, resource: str, body: str, dedupe_key: Optional[str] = None) -> bool:
+        """Registra uma escrita pendente; False se já existe uma com a mesma `dedupe_key`."""
+        with self.lock, self.connection:
+            return self.connection.execute(
+                '''
+                INSERT OR IGNORE INTO writes (target, resource, body, dedupe_key, status, created_at)
+                VALUES (?, ?, ?, ?, 'pending', ?)
+                ''',
+                (target, resource, body, dedupe_key, datetime.now().isoformat())
+            ).rowcount > 0
+
+    def get_writes(self, statuses: tuple = ('pending',)) -> List[PendingWrite]:
+        """Escritas nos status informados, na ordem em que foram registradas."""
+        with self.lock:
+            rows = self.connection.execute(
+                f"SELECT * FROM writes WHERE status IN ({', '.join('?' * len(statuses))}) ORDER BY id",
+                statuses
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def update_writes(self, write_ids: List[int], **values: Any) -> None:
+        assignments = ', '.join(f'{column} = ?' for column in values)
+        with self.lock, self.connection:
+            self.connection.executemany(
+                f'UPDATE writes SET {assignments} WHERE id = ?', [[*values.values(), write_id] for write_id in write_ids]
+            )
+
+    def count_statuses(self, table: str, column: str = 'status') -> Dict[str, int]:
+        """Quantidade de linhas de `table` (queue, writes ou tasks) por valor de `column`."""
+        with self.lock:
+            rows = self.connection.execute(
+                f'SELECT {column} AS value, COUNT(*) AS total FROM {table} GROUP BY {column}'
+            ).fetchall()
+        return {row['value']: row['total'] for row in rows if row['value'] is not None}
@@ -0,0 +1,119 @@
+import hashlib
+import os
+import threading
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+
+if TYPE_CHECKING:
+    from aider.repomap import RepoMap
+
+
+def get_blob_sha(data: bytes) -> str:
+    """Hash do conteúdo no formato de blob do git (o mesmo de `git hash-object`)."""
+    return hashlib.sha1(b'blob %d\0' % len(data) + data).hexdigest()
+
+
+class WorktreeTags:
+    """Visão do cache de tags de um projeto para o repo map de um diretório.
+
+    Substitui o `TAGS_CACHE` do RepoMap do Aider, que é indexado pelo caminho absoluto e pelo
+    mtime. Aqui a chave é o blob do arquivo e a linguagem, e as tags voltam com o caminho do
+    diretório atual, então qualquer worktree do projeto reaproveita o que outra já indexou.
+    """
+
+    def __init__(self, store, root: str) -> None:
+        self.store = store
+        self.root = root
+        self.hits = 0
+        self.misses = 0
+        self._keys: Dict[str, Tuple[float, Optional[str]]] = {}
+
+    def get_key(self, fname: str) -> Optional[str]:
+        from grep_ast import filename_to_lang
+
+        try:
+            mtime = os.path.getmtime(fname)
+            cached = self._keys.get(fname)
+            if cached and cached[0] == mtime:
+                return cached[1]
+            with open(fname, 'rb') as file:
+                blob = get_blob_sha(file.read())
+        except OSError:
+            return None
+        key = f"{filename_to_lang(fname) or ''}:{blob}"
+        self._keys[fname] = (mtime, key)
+        return key
+
+    def lookup(self, fname: str) -> Optional[Dict]:
+        from aider.repomap import Tag
+
+        key = self.get_key(fname)
+        tags = self.store.get(key) if key else None
+        if tags is None:
+            return None
+        rel_fname = os.path.relpath(fname, self.root)
+        data = [Tag(rel_fname, fname, line, name, kind) for line, name, kind in tags]
+        # O RepoMap compara o mtime para validar a entrada; o blob já garante o conteúdo
+        return {'mtime': os.path.getmtime(fname), 'data': data}
+
+    def get(self, fname: str, default=None):
+        # O RepoMap chama `get` uma vez por arquivo antes de ler a entrada
+        value = self.lookup(fname)
+        if value is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def __getitem__(self, fname: str):
+        value = self.lookup(fname)
+        if value is None:
+            raise KeyError(fname)
+        return value
+
+    def __setitem__(self, fname: str, value: Dict) -> None:
+        key = self.get_key(fname)
+        if key:
+            self.store[key] = [(tag.line, tag.name, tag.kind) for tag in value['data']]
+
+    def __len__(self) -> int:
+        return len(self.store)
+
+
+class TagsCache:
+    """Tags (símbolos e referências) do repo map do Aider, compartilhadas entre worktrees.
+
+    Cada projeto tem um cache em disco fora do diretório de trabalho, indexado pelo blob do git,
+    então uma worktree nova só analisa os arquivos que mudaram desde a última execução.
+    """
+
+    def __init__(self, directory: str, max_size_mb: int = 256) -> None:
+        self.directory = directory
+        self.size_limit = max_size_mb * 1024 * 1024
+        self._stores: Dict[str, object] = {}
+        self._stores_lock = threading.Lock()
+
+    def get_store(self, project: str, cache_dir: str):
+        from diskcache import Cache
+
+        with self._stores_lock:
+            if project not in self._stores:
+                path = os.path.join(self.directory, project, cache_dir)
+                os.makedirs(path, exist_ok=True)
+                self._stores[project] = Cache(path, size_limit=self.size_limit)
+            return self._stores[project]
+
+    def attach(self, repo_map: 'RepoMap', project: str) -> WorktreeTags:
+        """Troca o cache de tags do repo map pelo cache do projeto."""
+        # O diretório da versão acompanha o formato das tags do Aider
+        view = WorktreeTags(self.get_store(project, repo_map.TAGS_CACHE_DIR.lstrip('.')), repo_map.root)
+        if hasattr(repo_map.TAGS_CACHE, 'close'):
+            repo_map.TAGS_CACHE.close()
+        repo_map.TAGS_CACHE = view
+        return view
+
+    @staticmethod
+    def report(view: WorktreeTags) -> str:
+        total = view.hits + view.misses
+        rate = view.hits / total * 100 if total else 0.0
+        return f"Cache de tags: {view.hits} reaproveitadas, {view.misses} analisadas ({rate:.1f}% de acerto)"
+
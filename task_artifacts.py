@@ -0,0 +1,153 @@
+import os
+import re
+from datetime import datetime
+from typing import Dict, List, Optional, Union
+
+import ftfy
+from git import Repo
+
+from type_definitions import TaskChanges
+
+# Limite de caracteres do corpo de PRs e comentários no GitHub
+GITHUB_BODY_LIMIT = 65536
+TRUNCATION_MARKER = '\n\n[... truncado ...]'
+
+
+def truncate_text(text: str, limit: int, marker: str = TRUNCATION_MARKER) -> str:
+    """Corta o texto em `limit` caracteres, indicando o corte."""
+    if len(text) <= limit:
+        return text
+    return text[:max(0, limit - len(marker))].rstrip() + marker
+
+
+class ResponseLog:
+    """Grava a resposta do Aider em disco à medida que chega.
+
+    Em memória fica apenas a explicação do modelo (o texto fora dos blocos de código), limitada a
+    `max_rationale_chars`, para montar o resumo do PR.
+    """
+
+    def __init__(self, path: str, max_rationale_chars: int) -> None:
+        self.path = path
+        self.max_rationale_chars = max_rationale_chars
+        self.size = 0
+        self.has_content = False
+        self.truncated = False
+        self._rationale: List[str] = []
+        self._rationale_size = 0
+        self._pending = ''
+        self._in_code = False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._file = open(path, 'w', encoding='utf-8')
+
+    def __enter__(self) -> 'ResponseLog':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def write(self, text: str) -> None:
+        self._file.write(text)
+        self.size += len(text)
+        self.has_content = self.has_content or bool(text.strip())
+        self._pending += text
+        *lines, self._pending = self._pending.split('\n')
+        # Uma "linha" sem quebra não pode crescer sem limite
+        if len(self._pending) > self.max_rationale_chars:
+            lines.append(self._pending)
+            self._pending = ''
+        for line in lines:
+            self._add_line(line)
+
+    def _add_line(self, line: str) -> None:
+        if line.lstrip().startswith('```'):
+            self._in_code = not self._in_code
+            return
+        if self._in_code:
+            return
+        if self.truncated:
+            return
+        remaining = self.max_rationale_chars - self._rationale_size - 1
+        if len(line) > remaining:
+            line = line[:max(0, remaining)]
+            self.truncated = True
+        self._rationale.append(line)
+        self._rationale_size += len(line) + 1
+
+    def close(self) -> None:
+        if self._pending:
+            self._add_line(self._pending)
+            self._pending = ''
+        if not self._file.closed:
+            self._file.close()
+
+    @property
+    def rationale(self) -> str:
+        text = ftfy.fix_text(re.sub(r'\n{3,}', '\n\n', '\n'.join(self._rationale)).strip())
+        return text + TRUNCATION_MARKER if self.truncated else text
+
+
+class ArtifactStore:
+    """Artefatos de cada execução: o log completo da resposta e um resumo limitado das alterações.
+
+    O PR e o commit recebem só o resumo (arquivos, diffstat e o início da explicação do modelo);
+    o log fica em `artifacts.directory` e, com `artifacts.url_template`, é referenciado por link.
+    """
+
+    def __init__(self, config: dict) -> None:
+        artifacts_config = config.get('artifacts', {})
+        self.directory = artifacts_config.get('directory', '.task_to_code/artifacts')
+        self.url_template = artifacts_config.get('url_template', '')
+        self.max_rationale_chars = artifacts_config.get('max_rationale_chars', 3000)
+        self.max_files = artifacts_config.get('max_files', 50)
+
+    def open_log(self, task_key: str, kind: str, model: str) -> ResponseLog:
+        model_slug = re.sub(r'[^\w.-]+', '_', model)
+        name = f"{datetime.now():%Y%m%dT%H%M%S}-{kind}-{model_slug}.md"
+        return ResponseLog(os.path.join(self.directory, task_key, name), self.max_rationale_chars)
+
+    def get_log_url(self, path: str) -> Optional[str]:
+        if not self.url_template:
+            return None
+        return self.url_template.format(path=os.path.relpath(path, self.directory).replace(os.sep, '/'))
+
+    def diff_summary(self, repo: Repo, base_sha: str) -> Dict[str, Union[str, List[str]]]:
+        """Arquivos e diffstat (limitado) das alterações feitas sobre `base_sha`, commitadas ou não."""
+        files = repo.git.diff('--name-only', base_sha).splitlines()
+        stat_lines = repo.git.diff('--stat=100', base_sha).splitlines()
+        if len(stat_lines) > self.max_files + 1:
+            # Mantém a última linha (totais) do diffstat
+            omitted = len(stat_lines) - self.max_files - 1
+            stat_lines = stat_lines[:self.max_files] + [f" ... e mais {omitted} arquivos", stat_lines[-1]]
+        return {'files': files, 'diffstat': '\n'.join(stat_lines)}
+
+    def summarize(self, log: ResponseLog, repo: Repo, base_sha: str) -> TaskChanges:
+        """Resumo das alterações feitas sobre `base_sha` (commitadas ou não)."""
+        diff = self.diff_summary(repo, base_sha)
+        return {
+            'rationale': log.rationale,
+            'files': diff['files'],
+            'diffstat': diff['diffstat'],
+            'log_path': log.path,
+            'log_url': self.get_log_url(log.path),
+            'base_sha': base_sha,
+        }
+
+
+def format_changes(changes: TaskChanges, limit: int) -> str:
+    """Texto das alterações para o corpo do PR ou comentário, limitado a `limit` caracteres."""
+    log_reference = changes['log_url'] or f"`{os.path.basename(changes['log_path'])}` (artefato da execução)"
+    footer = f"\n\n{len(changes['files'])} arquivos alterados. Resposta completa do modelo: {log_reference}"
+    diffstat = f"```\n{changes['diffstat']}\n```\n\n" if changes['diffstat'] else ''
+    return truncate_text(diffstat + changes['rationale'], max(0, limit - len(footer))) + footer
+
+
+def build_commit_message(subject: str, changes: TaskChanges, max_files: int = 50) -> str:
+    """Mensagem de commit com assunto curto e a lista (limitada) de arquivos no corpo."""
+    files = changes['files'][:max_files]
+    body = '\n'.join(f"- {name}" for name in files)
+    if len(changes['files']) > max_files:
+        body += f"\n- ... e mais {len(changes['files']) - max_files} arquivos"
+    if changes['log_url']:
+        body += f"\n\nLog: {changes['log_url']}"
+    return f"{truncate_text(subject, 72, '...')}\n\n{body}".rstrip()
@@ -0,0 +1,107 @@
+import json
+import os
+import socket
+import socketserver
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Dict
+
+if TYPE_CHECKING:
+    from main import TaskToCode
+
+
+class TaskRequestHandler(socketserver.StreamRequestHandler):
+    """Lê uma requisição JSON por conexão e responde com o resultado, também em uma linha JSON."""
+
+    server: 'TaskServer'
+
+    def handle(self) -> None:
+        try:
+            request = json.loads(self.rfile.readline())
+            response = self.server.execute(request)
+        except Exception as e:
+            print(f"Erro ao processar requisição: {e}")
+            response = {'ok': False, 'error': str(e)}
+        self.wfile.write((json.dumps(response) + '\n').encode('utf-8'))
+
+
+class TaskServer(socketserver.ThreadingUnixStreamServer):
+    """Processo residente que mantém handlers, modelo e caches dos repositórios aquecidos.
+
+    Hooks de CI enviam as chaves das tasks pelo socket (`python main.py submit`) em vez de
+    pagar a importação do Aider e a criação do modelo a cada evento. Cada conexão roda em sua
+    thread; o pool serializa as requisições da mesma task, e cada lote usa sua própria base.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, task_to_code: 'TaskToCode', socket_path: str) -> None:
+        from batch_runner import BatchRunner
+
+        os.makedirs(os.path.dirname(socket_path) or '.', exist_ok=True)
+        # Remove o socket de uma execução anterior encerrada sem limpeza
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        super().__init__(socket_path, TaskRequestHandler)
+        self.socket_path = socket_path
+        self.task_to_code = task_to_code
+        self.batch_runner = BatchRunner(task_to_code)
+        self.pool = self.batch_runner.pool
+
+    def warm_up(self) -> None:
+        """Cria os handlers, carrega o modelo e indexa os projetos antes da primeira requisição."""
+        task_to_code = self.task_to_code
+        task_to_code.jira_handler
+        task_to_code.github_handler
+        router = task_to_code.aider_handler.router
+        for candidate in router.candidates:
+            router.get_model(candidate['name'])
+        for project, project_config in task_to_code.config['projects'].items():
+            # Projetos do cache de mirrors são clonados só quando recebem uma task
+            project_dir = project_config.get('directory')
+            if not project_dir or not os.path.exists(os.path.join(project_dir, '.git')):
+                continue
+            try:
+                task_to_code.git_service.get_repo(project_dir)
+                task_to_code.aider_handler.file_selector.refresh_index(project, project_dir)
+            except Exception as e:
+                print(f"Erro ao preparar o projeto {project}: {e}")
+
+    def execute(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        command = request.get('command')
+        task_keys = request.get('task_keys') or []
+        if command == 'ping':
+            return {'ok': True}
+        if command == 'process':
+            results = self.pool.run(task_keys)
+        elif command == 'corrections':
+            results = self.pool.run_corrections(task_keys, datetime.fromisoformat(request['since']))
+        elif command == 'batch':
+            results = self.batch_runner.run(jql=request.get('jql'), task_keys=task_keys or None)
+        else:
+            return {'ok': False, 'error': f'Comando desconhecido: {command}'}
+        return {'ok': True, 'results': results}
+
+    def run(self) -> None:
+        print("Preparando handlers e caches...")
+        self.warm_up()
+        print(f"Servidor aguardando tasks em {self.socket_path}")
+        try:
+            self.serve_forever()
+        except KeyboardInterrupt:
+            print("\nEncerrando servidor...")
+        finally:
+            self.server_close()
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+
+
+def send_request(socket_path: str, request: Dict[str, Any]) -> Dict[str, Any]:
+    """Envia a requisição ao servidor residente e aguarda o resultado.
+
+    Lança OSError (ex: FileNotFoundError, ConnectionRefusedError) se o servidor não estiver ativo.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(socket_path)
+        client.sendall((json.dumps(request) + '\n').encode('utf-8'))
+        with client.makefile('r', encoding='utf-8') as response:
+            return json.loads(response.readline())
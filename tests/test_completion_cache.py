@@ -0,0 +1,65 @@
+import json
+import os
+import time
+
+from completion_cache import CompletionCache
+
+
+def read_stats(cache):
+    with open(cache.stats_file, 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+
+def test_contadores_ficam_em_memoria_ate_o_flush(tmp_path):
+    cache = CompletionCache(str(tmp_path))
+    cache.get('0' * 64)
+    cache.get('1' * 64)
+    assert not os.path.exists(cache.stats_file)
+    assert 'falhas' in cache.report() and cache.stats['misses'] == 2
+
+    cache.flush_stats()
+    assert read_stats(cache)['misses'] == 2
+
+    # Outro processo usando o mesmo diretório soma aos contadores já gravados
+    other = CompletionCache(str(tmp_path))
+    other.get('2' * 64)
+    other.flush_stats()
+    assert read_stats(cache)['misses'] == 3
+
+
+def test_put_guarda_o_modelo_que_respondeu(tmp_path):
+    cache = CompletionCache(str(tmp_path))
+    key = CompletionCache.build_key('fallback-model', 0.7, 'prompt', 'abc', ['a.py'])
+    cache.put(key, 'resposta', 'diff', 'fallback-model')
+    entry = cache.get(key)
+    assert entry['model'] == 'fallback-model'
+    assert entry['diff'] == 'diff'
+    assert cache.get(CompletionCache.build_key('primary-model', 0.7, 'prompt', 'abc', ['a.py'])) is None
+
+
+def test_get_first_encontra_a_resposta_de_um_fallback(tmp_path):
+    cache = CompletionCache(str(tmp_path))
+    keys = [CompletionCache.build_key(model, 0.7, 'prompt', 'abc', ['a.py']) for model in ('primary', 'fallback')]
+    cache.put(keys[1], 'resposta', 'diff', 'fallback')
+
+    assert cache.get_first(keys)['model'] == 'fallback'
+    assert cache.get_first(keys[:1]) is None
+    # Cada busca conta uma vez, qualquer que seja o número de candidatos
+    assert (cache.stats['hits'], cache.stats['misses']) == (1, 1)
+
+
+def test_remove_as_menos_usadas_so_acima_do_limite(tmp_path):
+    cache = CompletionCache(str(tmp_path), max_size_mb=1)
+    body = 'x' * 300 * 1024
+    keys = [CompletionCache.build_key('model', 0.0, str(index), 'sha', []) for index in range(5)]
+    now = time.time()
+    for index, key in enumerate(keys):
+        cache.put(key, '', body, 'model')
+        # Entradas mais antigas primeiro, todas dentro de max_age
+        os.utime(cache.get_path(key), (now - 100 + index, now - 100 + index))
+
+    remaining = [key for key in keys if os.path.exists(cache.get_path(key))]
+    # A quarta entrada passa de 1 MB: a limpeza volta para 80% do limite mantendo as mais recentes,
+    # e a quinta cabe sem nova varredura
+    assert remaining == keys[2:]
+    assert cache.stats['evictions'] == 2
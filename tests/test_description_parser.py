@@ -0,0 +1,88 @@
+import os
+
+import pytest
+import yaml
+
+from description_parser import DescriptionParser, match_task_pattern
+
+
+@pytest.fixture(scope='module')
+def task_patterns():
+    config_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config.yaml')
+    with open(config_path, 'r', encoding='utf-8') as file:
+        return yaml.safe_load(file)['jira']['task_patterns']
+
+
+@pytest.fixture
+def parser(task_patterns):
+    return DescriptionParser(task_patterns)
+
+
+@pytest.mark.parametrize('task_type, expected', [
+    ('Feature', 'feature'),
+    ('feature', 'feature'),
+    ('Bug', 'bugfix'),
+    ('BUGFIX', 'bugfix'),
+    ('Improvement', 'improvement'),
+    (' Melhoria ', 'improvement'),
+])
+def test_match_task_pattern_por_nome_ou_alias(task_patterns, task_type, expected):
+    _, pattern = match_task_pattern(task_patterns, task_type)
+    assert pattern['name'] == expected
+
+
+@pytest.mark.parametrize('task_type', ['', 'B', 'Feat', 'Features', 'Improvements', 'Bug fix'])
+def test_match_task_pattern_rejeita_prefixos(task_patterns, task_type):
+    assert match_task_pattern(task_patterns, task_type) is None
+
+
+def test_parse_campos_e_valida_improvement(parser):
+    parsed = parser.parse(
+        "Tipo: Improvement\n"
+        "Projeto: PROJ\n"
+        "Descrição: Deixar a busca mais rápida\n"
+        "*Objetivo:*\n"
+        "- Reduzir a latência\n"
+        "Critérios de Aceitação:\n"
+        "- p95 abaixo de 200ms\n"
+    )
+    assert parsed['errors'] == []
+    assert parsed['fields']['Tipo'] == 'Improvement'
+    assert parsed['fields']['Objetivo'] == '- Reduzir a latência'
+    assert parsed['fields']['Critérios de Aceitação'] == '- p95 abaixo de 200ms'
+
+
+def test_valida_campos_obrigatorios_do_tipo(parser):
+    parsed = parser.parse("Tipo: Bug\nProjeto: PROJ\nDescrição do Bug: Falha ao salvar\n")
+    assert parsed['errors'] == [
+        'Campo obrigatório ausente: Passos para Reproduzir',
+        'Campo obrigatório ausente: Comportamento Esperado',
+    ]
+
+
+def test_valida_tipo_e_projeto(parser):
+    errors = parser.parse("Tipo: Epic\nDescrição: Algo\n")['errors']
+    assert errors[0] == 'Campo obrigatório ausente: Projeto'
+    assert errors[1].startswith("Tipo 'Epic' não corresponde a nenhum padrão")
+
+
+def test_cabecalhos_dentro_de_codigo_e_urls_fazem_parte_do_conteudo(parser):
+    fields = parser.parse(
+        "Tipo: Feature\n"
+        "Projeto: PROJ\n"
+        "Objetivo:\n"
+        "Ver https://example.com/docs\n"
+        "```\n"
+        "Requisitos: isto é código\n"
+        "```\n"
+        "Requisitos:\n"
+        "- Um requisito\n"
+    )['fields']
+    assert fields['Objetivo'] == 'Ver https://example.com/docs\n```\nRequisitos: isto é código\n```'
+    assert fields['Requisitos'] == '- Um requisito'
+
+
+def test_descricao_do_bug_nao_e_lida_como_descricao(parser):
+    fields = parser.parse("Tipo: Bug\nDescrição do Bug: Quebra ao abrir\n")['fields']
+    assert fields['Descrição do Bug'] == 'Quebra ao abrir'
+    assert 'Descrição' not in fields
@@ -0,0 +1,56 @@
+from git import Repo
+
+from file_selector import FileSelector
+
+
+def create_repo(path):
+    repo = Repo.init(path)
+    (path / 'UserService.java').write_text('class UserService { void findUser() {} }\n', encoding='utf-8')
+    (path / 'OrderService.java').write_text('class OrderService { void createOrder() {} }\n', encoding='utf-8')
+    repo.index.add(['UserService.java', 'OrderService.java'])
+    return repo
+
+
+def create_selector(tmp_path):
+    return FileSelector({'aider': {'file_selection': {'cache_dir': str(tmp_path / 'index')}}})
+
+
+def count_reads(selector, monkeypatch):
+    reads = []
+    read_file = selector.read_file
+
+    def tracked_read_file(path):
+        reads.append(path)
+        return read_file(path)
+
+    monkeypatch.setattr(selector, 'read_file', tracked_read_file)
+    return reads
+
+
+def test_indice_salvo_evita_reindexar_ao_reiniciar(tmp_path, monkeypatch):
+    project_dir = tmp_path / 'repo'
+    repo = create_repo(project_dir)
+    create_selector(tmp_path).refresh_index('PROJ', str(project_dir))
+
+    # Novo processo: só o arquivo com blob diferente é relido
+    (project_dir / 'OrderService.java').write_text('class OrderService { void cancelOrder() {} }\n', encoding='utf-8')
+    repo.index.add(['OrderService.java'])
+    selector = create_selector(tmp_path)
+    reads = count_reads(selector, monkeypatch)
+    index = selector.refresh_index('PROJ', str(project_dir))
+
+    assert reads == [str(project_dir / 'OrderService.java')]
+    assert index.search(['user'])[0][0] == 'UserService.java'
+    assert index.search(['cancel'])[0][0] == 'OrderService.java'
+    assert index.search(['create']) == []
+
+
+def test_arquivo_removido_sai_do_indice_salvo(tmp_path):
+    project_dir = tmp_path / 'repo'
+    repo = create_repo(project_dir)
+    create_selector(tmp_path).refresh_index('PROJ', str(project_dir))
+
+    repo.git.rm('-f', 'OrderService.java')
+    create_selector(tmp_path).refresh_index('PROJ', str(project_dir))
+
+    assert set(create_selector(tmp_path).get_index('PROJ').blobs) == {'UserService.java'}
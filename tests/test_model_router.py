@@ -0,0 +1,70 @@
+import pytest
+
+from model_router import ModelRouter
+from rate_limiter import RateLimiter
+
+
+@pytest.fixture
+def router():
+    config = {
+        'jira': {'task_patterns': [
+            {'name': 'feature', 'description': '', 'fields': []},
+            {'name': 'bugfix', 'aliases': ['bug'], 'description': '', 'fields': []},
+        ]},
+        'openrouter': {
+            'model': 'strong-model',
+            'models': [{'name': 'strong-model', 'tier': 'strong'}, {'name': 'fast-model', 'tier': 'fast'}],
+            'routing': {'fast_task_types': ['bugfix'], 'large_context_tokens': 1000},
+        },
+    }
+    return ModelRouter(config, RateLimiter(config))
+
+
+def make_task(task_type):
+    return {'key': 'PROJ-1', 'type': task_type, 'project': 'PROJ'}
+
+
+@pytest.mark.parametrize('task_type', ['Bug', 'bug', 'bugfix', 'BugFix'])
+def test_tipo_bug_vai_para_o_tier_fast(router, task_type):
+    assert router.get_tier(make_task(task_type), 'implement', 10) == 'fast'
+    assert router.route(make_task(task_type), 'implement', 10)[0] == 'fast-model'
+
+
+def test_feature_vai_para_o_tier_strong(router):
+    assert router.get_tier(make_task('Feature'), 'implement', 10) == 'strong'
+    assert router.route(make_task('Feature'), 'implement', 10)[0] == 'strong-model'
+
+
+def test_correcoes_vao_para_o_tier_fast(router):
+    assert router.get_tier(make_task('Feature'), 'corrections', 10) == 'fast'
+
+
+def test_contexto_grande_vai_para_o_tier_strong(router):
+    assert router.get_tier(make_task('Bug'), 'implement', 1000) == 'strong'
+    assert router.get_tier(make_task('Bug'), 'corrections', 5000) == 'strong'
+
+
+def test_limite_de_requisicoes_vale_para_cada_chamada_ao_llm():
+    config = {'openrouter': {'model': 'strong-model', 'rate_limits': {'strong-model': {'requests_per_minute': 1, 'burst': 3}}}}
+    rate_limiter = RateLimiter(config)
+    router = ModelRouter(config, rate_limiter)
+    calls = []
+    send_completion = router.limit_requests('strong-model', lambda *args, **kwargs: calls.append(kwargs) or 'ok')
+
+    # Uma execução do Aider pode fazer várias chamadas (ex: retentativas, confirmação de edição)
+    assert send_completion(stream=True) == 'ok'
+    send_completion(stream=True)
+    assert len(calls) == 2
+    assert rate_limiter.get_bucket('strong-model').tokens < 2
+    assert router.limit_requests('fast-model', lambda: 'ok')() == 'ok'
+
+
+def test_sessoes_do_litellm_configuradas_uma_vez():
+    import litellm
+
+    from http_client import configure_llm_sessions
+
+    configure_llm_sessions({})
+    session, async_session = litellm.client_session, litellm.aclient_session
+    configure_llm_sessions({'http': {'max_connections': 1}})
+    assert litellm.client_session is session and litellm.aclient_session is async_session
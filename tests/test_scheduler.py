@@ -0,0 +1,111 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from scheduler import TaskScheduler
+from state_store import StateStore
+
+CONFIG = {
+    'jira': {
+        'task_patterns': [
+            {'name': 'feature', 'priority': 2},
+            {'name': 'bugfix', 'aliases': ['bug'], 'priority': 1},
+            {'name': 'improvement', 'priority': 3},
+        ]
+    },
+    'projects': {
+        'API': {'weight': 3},
+        'WEB': {},
+        'OPS': {'max_workers': 1},
+    },
+    'workers': {'max_workers': 4},
+}
+
+
+class FakeJiraHandler:
+    def __init__(self) -> None:
+        self.tasks = {}
+
+    def add(self, key, project, task_type='feature', priority='Medium'):
+        self.tasks[key] = {'key': key, 'project': project, 'type': task_type, 'priority': priority}
+
+    def begin_cycle(self):
+        pass
+
+    def prefetch_snapshots(self, http, task_keys):
+        return None
+
+    def get_task(self, task_key):
+        return self.tasks[task_key]
+
+
+@pytest.fixture
+def scheduler(tmp_path):
+    task_to_code = SimpleNamespace(
+        config=CONFIG,
+        state_store=StateStore(str(tmp_path / 'state.db')),
+        git_service=None,
+        jira_handler=FakeJiraHandler(),
+        runtime=SimpleNamespace(http=None, run=lambda coro: coro),
+        validate_task=lambda task: True,
+    )
+    return TaskScheduler(task_to_code)
+
+
+def dequeue(scheduler):
+    """Retira os itens na ordem do agendador, marcando cada um como em execução."""
+    order = []
+    while True:
+        item = scheduler.next_item()
+        if not item:
+            return order
+        scheduler.store.update_queue_item(item['id'], status='running')
+        order.append((item['kind'], item['task_key']))
+
+
+def test_correcoes_passam_a_frente_de_tasks_novas(scheduler):
+    jira = scheduler.task_to_code.jira_handler
+    jira.add('WEB-1', 'WEB', priority='Highest')
+    jira.add('WEB-2', 'WEB', priority='Lowest')
+    scheduler.enqueue(['WEB-1'])
+    scheduler.enqueue(['WEB-2'], corrections_since=datetime(2025, 5, 17))
+
+    assert dequeue(scheduler) == [('corrections', 'WEB-2'), ('implement', 'WEB-1')]
+
+
+def test_prioridade_do_jira_e_depois_a_do_tipo(scheduler):
+    jira = scheduler.task_to_code.jira_handler
+    jira.add('WEB-1', 'WEB', 'improvement', 'High')
+    jira.add('WEB-2', 'WEB', 'feature', 'Low')
+    jira.add('WEB-3', 'WEB', 'Bug', 'Low')
+    jira.add('WEB-4', 'WEB', 'desconhecido', 'Low')
+    jira.add('WEB-5', 'WEB', 'bugfix', 'Sem prioridade')
+    scheduler.enqueue(['WEB-1', 'WEB-2', 'WEB-3', 'WEB-4', 'WEB-5'])
+
+    assert [task_key for _, task_key in dequeue(scheduler)] == ['WEB-1', 'WEB-3', 'WEB-2', 'WEB-4', 'WEB-5']
+
+
+def test_divisao_justa_pelo_peso_do_projeto(scheduler):
+    jira = scheduler.task_to_code.jira_handler
+    jira.add('API-1', 'API', priority='Lowest')
+    jira.add('WEB-1', 'WEB', priority='Highest')
+    scheduler.enqueue(['API-1', 'WEB-1'])
+
+    # WEB (peso 1) com um worker ocupa mais da sua parte que API (peso 3) com dois
+    scheduler.running = {'API': 2, 'WEB': 1}
+    assert scheduler.next_item()['task_key'] == 'API-1'
+    scheduler.running = {'API': 3, 'WEB': 0}
+    assert scheduler.next_item()['task_key'] == 'WEB-1'
+
+
+def test_projeto_no_limite_de_workers_fica_de_fora(scheduler):
+    jira = scheduler.task_to_code.jira_handler
+    jira.add('OPS-1', 'OPS', priority='Highest')
+    jira.add('WEB-1', 'WEB', priority='Lowest')
+    scheduler.enqueue(['OPS-1', 'WEB-1'], corrections_since=datetime(2025, 5, 17))
+
+    scheduler.running = {'OPS': 1}
+    assert scheduler.next_item()['task_key'] == 'WEB-1'
+    scheduler.running = {}
+    assert scheduler.next_item()['task_key'] == 'OPS-1'
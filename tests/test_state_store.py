@@ -0,0 +1,54 @@
+import pytest
+
+from state_store import StateStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return StateStore(str(tmp_path / 'state.db'))
+
+
+def test_estado_da_task_e_resultado_da_execucao(store):
+    assert store.get_task_state('PROJ-1') is None
+    store.record_run('PROJ-1', 'pr_created', project='PROJ', pr_url='https://github.com/o/r/pull/1',
+                     description_hash=StateStore.hash_description('descrição'))
+    store.record_run('PROJ-1', 'corrections_applied', last_comment_id=10)
+
+    state = store.get_task_state('PROJ-1')
+    assert state['last_run_status'] == 'corrections_applied'
+    assert state['pr_url'] == 'https://github.com/o/r/pull/1'
+    assert state['last_comment_id'] == 10
+    assert state['description_hash'] == StateStore.hash_description('descrição')
+    with pytest.raises(ValueError):
+        store.save_task_state('PROJ-1', desconhecido=1)
+
+
+def test_enqueue_ignora_item_igual_ativo(store):
+    assert store.enqueue('PROJ-1', 'implement', 'PROJ', 100)
+    assert not store.enqueue('PROJ-1', 'implement', 'PROJ', 50)
+    # Correções da mesma task são outro item
+    assert store.enqueue('PROJ-1', 'corrections', 'PROJ', 10, since='2025-05-17T10:00:00')
+
+    item = store.get_queue()[1]
+    store.update_queue_item(item['id'], status='done')
+    assert store.enqueue('PROJ-1', 'implement', 'PROJ', 100)
+
+
+def test_get_queue_ordena_por_prioridade(store):
+    store.enqueue('PROJ-1', 'implement', 'PROJ', 300)
+    store.enqueue('PROJ-2', 'implement', 'PROJ', 100)
+    store.enqueue('OTHER-1', 'corrections', 'OTHER', 100)
+    assert [item['task_key'] for item in store.get_queue()] == ['PROJ-2', 'OTHER-1', 'PROJ-1']
+
+
+def test_requeue_running_e_contagem_por_status(store):
+    store.enqueue('PROJ-1', 'implement', 'PROJ', 1)
+    store.enqueue('PROJ-2', 'implement', 'PROJ', 2)
+    first, second = store.get_queue()
+    store.update_queue_item(first['id'], status='running', started_at='2025-05-17T10:00:00')
+    store.update_queue_item(second['id'], status='failed')
+    assert store.count_statuses('queue') == {'running': 1, 'failed': 1}
+
+    assert store.requeue_running() == 1
+    assert store.count_statuses('queue') == {'queued': 1, 'failed': 1}
+    assert store.get_queue()[0]['started_at'] is None
@@ -0,0 +1,58 @@
+import os
+
+from aider.io import InputOutput
+from aider.repomap import RepoMap
+
+from tags_cache import TagsCache, get_blob_sha
+
+SOURCE = '''class UserService:
+    def find_user(self, user_id):
+        return user_id
+'''
+
+
+def create_repo_map(root):
+    with open(os.path.join(root, 'service.py'), 'w', encoding='utf-8') as file:
+        file.write(SOURCE)
+    return RepoMap(root=str(root), io=InputOutput(yes=True, pretty=False))
+
+
+def test_blob_sha_igual_ao_do_git():
+    # git hash-object de um arquivo com "hello\n"
+    assert get_blob_sha(b'hello\n') == 'ce013625030ba8dba906f756967f9e9ca394464a'
+
+
+def test_tags_reaproveitadas_em_outra_worktree(tmp_path):
+    cache = TagsCache(str(tmp_path / 'tags'))
+    first_dir, second_dir = tmp_path / 'wt1', tmp_path / 'wt2'
+    first_dir.mkdir()
+    second_dir.mkdir()
+
+    first_map = create_repo_map(first_dir)
+    first = cache.attach(first_map, 'PROJ')
+    first_tags = first_map.get_tags(str(first_dir / 'service.py'), 'service.py')
+    assert (first.hits, first.misses) == (0, 1)
+    assert 'UserService' in {tag.name for tag in first_tags}
+
+    second_map = create_repo_map(second_dir)
+    second = cache.attach(second_map, 'PROJ')
+    second_tags = second_map.get_tags(str(second_dir / 'service.py'), 'service.py')
+    assert (second.hits, second.misses) == (1, 0)
+    # As tags voltam com o caminho da worktree atual
+    assert {tag.fname for tag in second_tags} == {str(second_dir / 'service.py')}
+    assert [tag[2:] for tag in second_tags] == [tag[2:] for tag in first_tags]
+
+
+def test_arquivo_alterado_e_analisado_de_novo(tmp_path):
+    cache = TagsCache(str(tmp_path / 'tags'))
+    repo_map = create_repo_map(tmp_path)
+    view = cache.attach(repo_map, 'PROJ')
+    fname = str(tmp_path / 'service.py')
+    repo_map.get_tags(fname, 'service.py')
+
+    with open(fname, 'a', encoding='utf-8') as file:
+        file.write('\n\ndef delete_user(user_id):\n    return None\n')
+    os.utime(fname, (1, 1))
+    tags = repo_map.get_tags(fname, 'service.py')
+    assert view.misses == 2
+    assert 'delete_user' in {tag.name for tag in tags}
@@ -0,0 +1,71 @@
+from task_artifacts import TRUNCATION_MARKER, ResponseLog, build_commit_message, format_changes
+
+
+def make_changes(rationale='', files=None, log_url=None):
+    return {
+        'rationale': rationale,
+        'files': files if files is not None else ['src/UserService.java'],
+        'diffstat': ' src/UserService.java | 2 +-\n 1 file changed, 1 insertion(+), 1 deletion(-)',
+        'log_path': '/tmp/artifacts/PROJ-1/20250517T100000-implement-model.md',
+        'log_url': log_url,
+        'base_sha': 'abc',
+    }
+
+
+def test_resposta_maior_que_o_limite_fica_inteira_so_no_log(tmp_path):
+    path = tmp_path / 'PROJ-1' / 'log.md'
+    chunk = 'Alteração no serviço de usuários. ' * 30 + '\n'
+    with ResponseLog(str(path), 200) as log:
+        for _ in range(1000):
+            log.write(chunk)
+
+    assert log.truncated
+    assert log.rationale.endswith(TRUNCATION_MARKER)
+    assert len(log.rationale) <= 200 + len(TRUNCATION_MARKER)
+    assert log.size == len(chunk) * 1000
+    assert path.read_text(encoding='utf-8') == chunk * 1000
+
+
+def test_linha_sem_quebra_nao_cresce_sem_limite(tmp_path):
+    with ResponseLog(str(tmp_path / 'log.md'), 50) as log:
+        for _ in range(100):
+            log.write('x' * 100)
+
+    assert log.truncated
+    assert len(log.rationale) <= 50 + len(TRUNCATION_MARKER)
+
+
+def test_blocos_de_codigo_ficam_fora_da_explicacao(tmp_path):
+    response = 'Criei o método.\n```java\nclass UserService {}\n```\nAjustei os testes.\n  ```\nassert true;\n```\nFim'
+    with ResponseLog(str(tmp_path / 'log.md'), 1000) as log:
+        # Os trechos do streaming chegam quebrados em qualquer ponto
+        for index in range(0, len(response), 3):
+            log.write(response[index:index + 3])
+
+    assert log.rationale == 'Criei o método.\nAjustei os testes.\nFim'
+    assert not log.truncated
+
+
+def test_format_changes_respeita_o_limite_e_mantem_o_rodape():
+    text = format_changes(make_changes('explicação ' * 10000), 1000)
+    assert len(text) <= 1000
+    assert TRUNCATION_MARKER in text
+    assert text.startswith('```\n src/UserService.java')
+    assert text.endswith('1 arquivos alterados. Resposta completa do modelo: '
+                         '`20250517T100000-implement-model.md` (artefato da execução)')
+
+    linked = format_changes(make_changes('curta', log_url='https://ci/logs/PROJ-1.md'), 1000)
+    assert 'curta' in linked and TRUNCATION_MARKER not in linked
+    assert linked.endswith('https://ci/logs/PROJ-1.md')
+
+
+def test_commit_message_com_assunto_curto_e_arquivos_limitados():
+    files = [f'src/File{index}.java' for index in range(60)]
+    message = build_commit_message('fix: ' + 'correção ' * 30, make_changes(files=files, log_url='https://ci/log'), 50)
+    subject, body = message.split('\n\n', 1)
+
+    assert len(subject) == 72 and subject.endswith('...')
+    assert body.count('\n- src/') == 49
+    assert '- ... e mais 10 arquivos' in body
+    assert body.endswith('Log: https://ci/log')
+    assert build_commit_message('fix: curto', make_changes()) == 'fix: curto\n\n- src/UserService.java'
@@ -0,0 +1,73 @@
+import pytest
+from git import Repo
+
+from verifier import Verifier
+
+FILES = {
+    'src/user_service.py': 'class UserService:\n    pass\n',
+    'src/order.py': 'class Order:\n    pass\n',
+    'tests/test_user.py': 'from src.user_service import UserService\n',
+    'tests/test_order.py': 'from src.order import Order\n',
+    'requirements.txt': 'requests\n',
+}
+
+
+@pytest.fixture
+def project_dir(tmp_path):
+    path = tmp_path / 'repo'
+    repo = Repo.init(path)
+    for rel_fname, content in FILES.items():
+        (path / rel_fname).parent.mkdir(parents=True, exist_ok=True)
+        (path / rel_fname).write_text(content, encoding='utf-8')
+    repo.index.add(list(FILES))
+    return path
+
+
+def make_verifier(tmp_path, **verify):
+    verify = {'test': 'exit 0', 'test_selected': 'exit 0', **verify}
+    return Verifier({
+        'verification': {'cache_dir': str(tmp_path / 'test_deps')},
+        'projects': {'PROJ': {'verify': verify}},
+    })
+
+
+def select(verifier, project_dir, changed_files):
+    return verifier.select_tests('PROJ', str(project_dir), verifier.get_verify_config('PROJ'), changed_files)
+
+
+def test_seleciona_os_testes_que_citam_os_arquivos_alterados(tmp_path, project_dir):
+    verifier = make_verifier(tmp_path)
+    assert select(verifier, project_dir, ['src/user_service.py']) == ['tests/test_user.py']
+    assert select(verifier, project_dir, ['src/order.py', 'tests/test_user.py']) == ['tests/test_order.py', 'tests/test_user.py']
+    assert select(verifier, project_dir, ['README.md']) == []
+
+
+def test_arquivo_de_build_alterado_roda_a_suite_completa(tmp_path, project_dir):
+    verifier = make_verifier(tmp_path)
+    assert select(verifier, project_dir, ['src/order.py', 'requirements.txt']) is None
+    # Sem comando para testes selecionados, a suíte completa sempre roda
+    assert select(make_verifier(tmp_path, test_selected=''), project_dir, ['src/order.py']) is None
+
+
+def test_mapa_salvo_acompanha_os_testes_alterados(tmp_path, project_dir):
+    select(make_verifier(tmp_path), project_dir, ['src/order.py'])
+
+    (project_dir / 'tests' / 'test_order.py').write_text('from src.user_service import UserService\n', encoding='utf-8')
+    Repo(project_dir).index.add(['tests/test_order.py'])
+    # Novo processo: o mapa vem do disco e o teste com blob novo é relido
+    verifier = make_verifier(tmp_path)
+    assert set(verifier.get_dependency_map('PROJ').tests) == {'tests/test_order.py', 'tests/test_user.py'}
+    assert select(verifier, project_dir, ['src/user_service.py']) == ['tests/test_order.py', 'tests/test_user.py']
+    assert select(verifier, project_dir, ['src/order.py']) == []
+
+
+def test_verify_para_no_build_e_divide_os_testes_em_shards(tmp_path, project_dir):
+    failed = make_verifier(tmp_path, build='echo erro de compilação && exit 1').verify('PROJ', str(project_dir), ['src/order.py'])
+    assert (failed['ok'], failed['stage']) == (False, 'build')
+    assert 'erro de compilação' in failed['output']
+
+    verifier = make_verifier(tmp_path, test_selected='echo {tests} >> selected.txt', shards=2)
+    result = verifier.verify('PROJ', str(project_dir), ['src/order.py', 'tests/test_user.py'])
+    assert (result['ok'], result['tests']) == (True, ['tests/test_order.py', 'tests/test_user.py'])
+    shards = (project_dir / 'selected.txt').read_text(encoding='utf-8').split()
+    assert sorted(shards) == ['tests/test_order.py', 'tests/test_user.py']
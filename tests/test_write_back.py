@@ -0,0 +1,142 @@
+import asyncio
+
+import httpx
+import pytest
+
+from state_store import StateStore
+from write_back import COMMENT_SEPARATOR, JIRA_COMMENT_LIMIT, WriteBackQueue, coalesce
+
+
+def make_write(write_id, target, resource, body):
+    return {'id': write_id, 'target': target, 'resource': resource, 'body': body, 'attempts': 0}
+
+
+def test_coalesce_junta_comentarios_do_mesmo_destino():
+    batches = coalesce([
+        make_write(1, 'jira_comment', 'PROJ-1', 'primeiro'),
+        make_write(2, 'pr_comment', 'o/r#1', 'no PR'),
+        make_write(3, 'jira_comment', 'PROJ-1', 'segundo'),
+        make_write(4, 'jira_comment', 'PROJ-2', 'outra issue'),
+    ])
+    assert batches == [
+        ('jira_comment', 'PROJ-1', f'primeiro{COMMENT_SEPARATOR}segundo', [1, 3]),
+        ('pr_comment', 'o/r#1', 'no PR', [2]),
+        ('jira_comment', 'PROJ-2', 'outra issue', [4]),
+    ]
+
+
+def test_coalesce_divide_no_limite_do_servico():
+    body = 'x' * (JIRA_COMMENT_LIMIT // 2)
+    batches = coalesce([make_write(index, 'jira_comment', 'PROJ-1', body) for index in range(1, 4)])
+    assert [ids for _, _, _, ids in batches] == [[1], [2], [3]]
+    assert all(len(text) <= JIRA_COMMENT_LIMIT for _, _, text, _ in batches)
+
+
+def test_coalesce_mantem_a_ultima_transicao():
+    batches = coalesce([
+        make_write(1, 'jira_transition', 'PROJ-1', 'Code Review'),
+        make_write(2, 'jira_transition', 'PROJ-1', 'Done'),
+    ])
+    assert batches == [('jira_transition', 'PROJ-1', 'Done', [1, 2])]
+
+
+class FakeRuntime:
+    http = None
+
+    @staticmethod
+    def run(coroutine):
+        return asyncio.run(coroutine)
+
+
+class FakeHandler:
+    def __init__(self, errors=None):
+        self.sent = []
+        self.errors = errors or {}
+
+    async def comment_task_async(self, http, task_key, body):
+        self.send('jira_comment', task_key, body)
+
+    async def transition_task_async(self, http, task_key, status):
+        self.send('jira_transition', task_key, status)
+
+    async def comment_pull_async(self, http, repository, number, body):
+        self.send('pr_comment', f'{repository}#{number}', body)
+
+    def send(self, target, resource, body):
+        error = self.errors.pop(resource, None)
+        if error:
+            raise error
+        self.sent.append((target, resource, body))
+
+
+class FakeTaskToCode:
+    def __init__(self, state_store, handler):
+        self.config = {'write_back': {'window': 0, 'transitions': {'pr_created': 'Code Review'}}}
+        self.state_store = state_store
+        self.runtime = FakeRuntime()
+        self.jira_handler = handler
+        self.github_handler = handler
+
+
+@pytest.fixture
+def store(tmp_path):
+    return StateStore(str(tmp_path / 'state.db'))
+
+
+def make_queue(store, handler):
+    queue = WriteBackQueue(FakeTaskToCode(store, handler))
+    # Sem a thread de envio: os testes chamam flush diretamente
+    queue.add = lambda target, resource, body, dedupe_key=None: store.add_write(target, resource, body, dedupe_key)
+    return queue
+
+
+def test_add_write_ignora_chave_repetida(store):
+    assert store.add_write('jira_comment', 'PROJ-1', 'PR criado', 'pr_created:1')
+    assert not store.add_write('jira_comment', 'PROJ-1', 'PR criado de novo', 'pr_created:1')
+    assert store.add_write('jira_comment', 'PROJ-1', 'sem chave')
+    assert store.add_write('jira_comment', 'PROJ-1', 'sem chave')
+    assert [write['body'] for write in store.get_writes()] == ['PR criado', 'sem chave', 'sem chave']
+
+
+def test_flush_envia_uma_requisicao_por_destino(store):
+    handler = FakeHandler()
+    queue = make_queue(store, handler)
+    queue.comment_issue('PROJ-1', 'PR criado', dedupe_key='pr_created:1')
+    queue.comment_issue('PROJ-1', 'PR criado', dedupe_key='pr_created:1')
+    queue.comment_issue('PROJ-1', 'Correções aplicadas', dedupe_key='corrections:PROJ-1:5')
+    queue.comment_pull('o/r', 1, 'Novas correções', dedupe_key='corrections:PROJ-1:5:pr')
+    queue.transition_issue('PROJ-1', 'pr_created', dedupe_key='pr_created:1:status')
+    # Eventos sem transição configurada não geram escrita
+    queue.transition_issue('PROJ-1', 'corrections_applied')
+
+    assert queue.flush() is None
+    assert sorted(handler.sent) == [
+        ('jira_comment', 'PROJ-1', f'PR criado{COMMENT_SEPARATOR}Correções aplicadas'),
+        ('jira_transition', 'PROJ-1', 'Code Review'),
+        ('pr_comment', 'o/r#1', 'Novas correções'),
+    ]
+    assert store.get_writes() == []
+    assert store.count_statuses('writes') == {'sent': 4}
+
+
+def test_flush_repete_erros_temporarios_e_descarta_os_permanentes(store):
+    request = httpx.Request('POST', 'https://jira.example.com')
+    handler = FakeHandler(errors={
+        'PROJ-1': httpx.HTTPStatusError('503', request=request, response=httpx.Response(503, request=request)),
+        'PROJ-2': httpx.HTTPStatusError('404', request=request, response=httpx.Response(404, request=request)),
+    })
+    queue = make_queue(store, handler)
+    queue.comment_issue('PROJ-1', 'temporário')
+    queue.comment_issue('PROJ-2', 'permanente')
+
+    retry_in = queue.flush()
+    assert retry_in is not None and retry_in > 0
+    assert store.count_statuses('writes') == {'pending': 1, 'failed': 1}
+    pending = store.get_writes()[0]
+    assert pending['resource'] == 'PROJ-1' and pending['attempts'] == 1
+
+    # Na próxima tentativa (já vencida) a escrita é enviada
+    store.update_writes([pending['id']], next_attempt_at=0)
+    assert queue.flush() is None
+    assert handler.sent == [('jira_comment', 'PROJ-1', 'temporário')]
+    assert store.count_statuses('writes') == {'sent': 1, 'failed': 1}
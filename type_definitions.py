@@ -1,4 +1,5 @@
-from typing import Any, Dict, List, TypedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, TypedDict
 
 
 class TaskFields(TypedDict):
@@ -8,12 +9,29 @@ class TaskFields(TypedDict):
 
 class TaskPattern(TypedDict):
     name: str
+    # Outros valores de `Tipo` aceitos para o padrão (ex: `Bug` para `bugfix`); opcional
+    aliases: List[str]
     description: str
     fields: List[TaskFields]
+    # Ordem no agendador (menor primeiro)
+    priority: int
 
 
-class JiraConfig(TypedDict):
+class WebhookConfig(TypedDict, total=False):
+    enabled: bool
+    host: str
+    port: int
+
+
+class WatcherConfig(TypedDict, total=False):
+    interval: int
+    jql: str
+    webhook: WebhookConfig
+
+
+class JiraConfig(TypedDict, total=False):
     task_patterns: List[TaskPattern]
+    watcher: WatcherConfig
 
 
 class GithubConfig(TypedDict):
@@ -22,23 +40,197 @@ class GithubConfig(TypedDict):
     pr_template: str
 
 
-class AiderConfig(TypedDict):
+class TagsCacheConfig(TypedDict, total=False):
+    enabled: bool
+    directory: str
+    max_size_mb: int
+
+
+class FileSelectionConfig(TypedDict, total=False):
+    enabled: bool
+    max_editable_files: int
+    max_read_only_files: int
+    max_file_size: int
+    cache_dir: str
+
+
+class BudgetConfig(TypedDict, total=False):
+    max_tokens: int
+    max_seconds: int
+
+
+class CompletionCacheConfig(TypedDict, total=False):
+    enabled: bool
+    directory: str
+    max_size_mb: int
+    max_age_days: int
+
+
+class AiderConfig(TypedDict, total=False):
     prompt_template: str
     model: str
     temperature: float
+    streaming: bool
+    edit_directive: str
+    budget: BudgetConfig
+    completion_cache: CompletionCacheConfig
+    tags_cache: TagsCacheConfig
+    file_selection: FileSelectionConfig
+
 
+class VerifyConfig(TypedDict, total=False):
+    build: str
+    # Suíte completa
+    test: str
+    # Apenas os testes afetados; {tests} recebe os testes separados por `test_separator`
+    test_selected: str
+    test_separator: str
+    # path (caminho do arquivo) ou name (nome do arquivo sem extensão, ex: classes Java)
+    test_id: str
+    test_files: List[str]
+    full_run_files: List[str]
+    shards: int
+    timeout: int
 
-class ProjectConfig(TypedDict):
+
+class ProjectConfig(TypedDict, total=False):
+    # Checkout local; sem ele o repositório vem do cache de mirrors (git.mirrors) e o diretório
+    # é obtido por TaskToCode.get_project_dir
     directory: str
     description: str
     repository: str
+    max_workers: int
+    # Peso do projeto na divisão justa dos workers do agendador
+    weight: int
+    verify: VerifyConfig
+
+
+class WorkersConfig(TypedDict, total=False):
+    max_workers: int
+    worktrees_dir: str
+    provider_limits: Dict[str, int]
+
+
+class RateLimitConfig(TypedDict, total=False):
+    requests_per_minute: float
+    burst: int
+
+
+class ModelCandidate(TypedDict, total=False):
+    name: str
+    # fast (correções e tasks pequenas) ou strong (features e contextos grandes)
+    tier: str
+    max_context_tokens: int
+
+
+class RoutingConfig(TypedDict, total=False):
+    fast_task_types: List[str]
+    large_context_tokens: int
+    window: int
+    max_error_rate: float
+    max_consecutive_failures: int
+    cooldown: int
+
+
+class OpenRouterConfig(TypedDict, total=False):
+    model: str
+    temperature: float
+    base_url: str
+    rate_limits: Dict[str, RateLimitConfig]
+    models: List[ModelCandidate]
+    routing: RoutingConfig
+
+
+class SchedulerConfig(TypedDict, total=False):
+    jira_priorities: List[str]
+    poll_interval: float
+
+
+class MirrorsConfig(TypedDict, total=False):
+    directory: str
+    refresh_interval: int
+    max_size_mb: int
+    max_mirrors: int
+
+
+class GitConfig(TypedDict, total=False):
+    fetch_interval: int
+    fetch_depth: int
+    remote_url_template: str
+    mirrors: MirrorsConfig
+
+
+class HttpConfig(TypedDict, total=False):
+    timeout: float
+    max_connections: int
+    max_keepalive_connections: int
+    per_host_limit: int
+    max_retries: int
+    backoff_base: float
+    backoff_max: float
+
+
+class TracingConfig(TypedDict, total=False):
+    enabled: bool
+    jsonl_path: str
+    otlp_endpoint: str
+
+
+class ServerConfig(TypedDict, total=False):
+    socket_path: str
+
+
+class StateConfig(TypedDict, total=False):
+    path: str
+
+
+class VerificationConfig(TypedDict, total=False):
+    enabled: bool
+    max_fix_iterations: int
+    max_output_chars: int
+    cache_dir: str
+
+
+class ArtifactsConfig(TypedDict, total=False):
+    directory: str
+    url_template: str
+    max_rationale_chars: int
+    max_files: int
+    max_body_chars: int
+
+
+class WriteBackConfig(TypedDict, total=False):
+    enabled: bool
+    window: float
+    max_attempts: int
+    retry_delay: float
+    # Status do Jira por evento (pr_created, corrections_applied)
+    transitions: Dict[str, str]
+
+
+class MetricsConfig(TypedDict, total=False):
+    enabled: bool
+    host: str
+    port: int
 
 
 class Config(TypedDict):
     jira: JiraConfig
     github: GithubConfig
+    openrouter: OpenRouterConfig
     aider: AiderConfig
     projects: Dict[str, ProjectConfig]
+    workers: WorkersConfig
+    state: StateConfig
+    http: HttpConfig
+    git: GitConfig
+    tracing: TracingConfig
+    server: ServerConfig
+    scheduler: SchedulerConfig
+    artifacts: ArtifactsConfig
+    verification: VerificationConfig
+    write_back: WriteBackConfig
+    metrics: MetricsConfig
 
 
 class Task(TypedDict):
@@ -47,4 +239,106 @@ class Task(TypedDict):
     description: str
     type: str
     project: str
-    fields: Dict[str, Any] 
\ No newline at end of file
+    fields: Dict[str, Any]
+    updated: datetime
+    priority: str
+    # Problemas em relação ao padrão do tipo (jira.task_patterns); vazio se a task é válida
+    errors: List[str]
+
+
+class ParsedDescription(TypedDict):
+    description: str
+    fields: Dict[str, str]
+    errors: List[str]
+
+
+class TaskSnapshot(TypedDict):
+    key: str
+    updated: str
+    task: Task
+    corrections: List[Dict[str, Any]]
+
+
+class TaskState(TypedDict, total=False):
+    task_key: str
+    project: str
+    description_hash: str
+    last_comment_id: int
+    branch: str
+    pr_number: int
+    pr_url: str
+    last_run_status: str
+    last_run_at: str
+    created_at: str
+    updated_at: str
+
+
+class QueueItem(TypedDict):
+    id: int
+    task_key: str
+    kind: str
+    project: str
+    priority: int
+    status: str
+    since: Optional[str]
+    result: Optional[str]
+    enqueued_at: str
+    started_at: Optional[str]
+    finished_at: Optional[str]
+
+
+class PendingWrite(TypedDict):
+    id: int
+    # jira_comment, jira_transition ou pr_comment
+    target: str
+    # Chave da issue ou owner/repo#numero do PR
+    resource: str
+    body: str
+    dedupe_key: Optional[str]
+    # pending, sent ou failed
+    status: str
+    attempts: int
+    next_attempt_at: float
+    error: Optional[str]
+    created_at: str
+    sent_at: Optional[str]
+
+
+class TaskChanges(TypedDict):
+    # Início da explicação do modelo, sem os blocos de código
+    rationale: str
+    files: List[str]
+    diffstat: str
+    log_path: str
+    log_url: Optional[str]
+    # Commit sobre o qual as alterações foram feitas
+    base_sha: str
+
+
+class VerificationResult(TypedDict):
+    ok: bool
+    # build, test ou skipped
+    stage: str
+    # Final da saída do comando que falhou
+    output: str
+    # Testes executados (None = suíte completa)
+    tests: Optional[List[str]]
+
+
+class CachedCompletion(TypedDict):
+    response: str
+    diff: str
+    # Modelo que produziu a resposta (o da chave)
+    model: str
+    created_at: float
+
+
+class SpanRecord(TypedDict):
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    name: str
+    start: float
+    duration_ms: float
+    status: str
+    attributes: Dict[str, Any]
\ No newline at end of file
@@ -0,0 +1,198 @@
+import fnmatch
+import json
+import os
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from git import Repo
+
+from file_selector import IDENTIFIER_PATTERN
+from instrumentation import tracer
+from type_definitions import VerificationResult, VerifyConfig
+
+# Arquivos de teste reconhecidos quando o projeto não define `verify.test_files`
+DEFAULT_TEST_FILES = [
+    'test_*.py', '*_test.py', '*_test.go', '*Test.java', '*Tests.java', '*Test.kt',
+    '*.test.js', '*.test.ts', '*.spec.js', '*.spec.ts',
+]
+# Alterações nestes arquivos podem afetar qualquer teste e fazem a suíte completa rodar
+DEFAULT_FULL_RUN_FILES = [
+    'pom.xml', 'build.gradle', 'build.gradle.kts', 'package.json', 'requirements*.txt', 'pyproject.toml',
+    'setup.py', 'setup.cfg', 'conftest.py', 'go.mod',
+]
+
+
+def get_module_name(rel_fname: str) -> str:
+    """Nome pelo qual o arquivo é referenciado no código (ex: src/UserService.java -> UserService)."""
+    name = os.path.splitext(os.path.basename(rel_fname))[0]
+    # Pacotes são importados pelo nome do diretório
+    if name in ('__init__', 'index', 'mod'):
+        name = os.path.basename(os.path.dirname(rel_fname)) or name
+    return name
+
+
+class DependencyMap:
+    """Identificadores citados por cada arquivo de teste do projeto, atualizados por blob do git.
+
+    Um arquivo alterado afeta os testes que citam o nome do seu módulo. O mapa é salvo em disco,
+    então só os testes modificados desde a última execução são relidos.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.lock = threading.Lock()
+        self.tests: Dict[str, Dict] = self.load()
+
+    def load(self) -> Dict[str, Dict]:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(self.tests, file)
+        os.replace(tmp_path, self.path)
+
+    def refresh(self, project_dir: str, test_blobs: Dict[str, str]) -> None:
+        with self.lock:
+            changed = False
+            for rel_fname in set(self.tests) - set(test_blobs):
+                del self.tests[rel_fname]
+                changed = True
+            for rel_fname, blob in test_blobs.items():
+                if self.tests.get(rel_fname, {}).get('blob') == blob:
+                    continue
+                try:
+                    with open(os.path.join(project_dir, rel_fname), 'r', encoding='utf-8', errors='ignore') as file:
+                        refs = sorted(set(IDENTIFIER_PATTERN.findall(file.read())))
+                except OSError:
+                    continue
+                self.tests[rel_fname] = {'blob': blob, 'refs': refs}
+                changed = True
+            if changed:
+                self.save()
+
+    def affected_tests(self, changed_files: List[str]) -> List[str]:
+        modules = {get_module_name(rel_fname) for rel_fname in changed_files}
+        with self.lock:
+            return sorted(
+                rel_fname for rel_fname, entry in self.tests.items()
+                if rel_fname in changed_files or modules.intersection(entry['refs'])
+            )
+
+
+class Verifier:
+    """Verificação antes do PR: build e testes afetados do projeto (`projects.<CHAVE>.verify`).
+
+    Roda no diretório da task (worktree ou checkout do projeto). Os testes selecionados são
+    divididos em `shards` execuções simultâneas do comando `test_selected`.
+    """
+
+    def __init__(self, config: dict) -> None:
+        self.config = config
+        verification_config = config.get('verification', {})
+        self.enabled = verification_config.get('enabled', True)
+        self.max_fix_iterations = verification_config.get('max_fix_iterations', 2)
+        self.max_output_chars = verification_config.get('max_output_chars', 8000)
+        self.cache_dir = verification_config.get('cache_dir', '.task_to_code/test_deps')
+        self._maps: Dict[str, DependencyMap] = {}
+        self._maps_lock = threading.Lock()
+
+    def get_verify_config(self, project: str) -> Optional[VerifyConfig]:
+        verify = self.config['projects'].get(project, {}).get('verify')
+        if not self.enabled or not verify or not (verify.get('build') or verify.get('test')):
+            return None
+        return verify
+
+    def get_dependency_map(self, project: str) -> DependencyMap:
+        with self._maps_lock:
+            if project not in self._maps:
+                self._maps[project] = DependencyMap(os.path.join(self.cache_dir, f'{project}.json'))
+            return self._maps[project]
+
+    @staticmethod
+    def list_test_files(project_dir: str, patterns: List[str]) -> Dict[str, str]:
+        """Arquivos de teste versionados e o hash do blob de cada um."""
+        test_blobs = {}
+        for entry in filter(None, Repo(project_dir).git.ls_files('-s', '-z').split('\0')):
+            metadata, rel_fname = entry.split('\t', 1)
+            basename = os.path.basename(rel_fname)
+            if any(fnmatch.fnmatch(basename, pattern) or fnmatch.fnmatch(rel_fname, pattern) for pattern in patterns):
+                test_blobs[rel_fname] = metadata.split()[1]
+        return test_blobs
+
+    def select_tests(self, project: str, project_dir: str, verify: VerifyConfig,
+                     changed_files: List[str]) -> Optional[List[str]]:
+        """Testes afetados pelas alterações; None quando a suíte completa deve rodar."""
+        if not verify.get('test_selected'):
+            return None
+        full_run_files = verify.get('full_run_files', DEFAULT_FULL_RUN_FILES)
+        for rel_fname in changed_files:
+            if any(fnmatch.fnmatch(os.path.basename(rel_fname), pattern) for pattern in full_run_files):
+                print(f"{rel_fname} alterado, executando a suíte completa")
+                return None
+
+        dependency_map = self.get_dependency_map(project)
+        dependency_map.refresh(project_dir, self.list_test_files(project_dir, verify.get('test_files', DEFAULT_TEST_FILES)))
+        return dependency_map.affected_tests(changed_files)
+
+    def run_command(self, command: str, work_dir: str, timeout: int) -> Tuple[bool, str]:
+        try:
+            completed = subprocess.run(
+                command, shell=True, cwd=work_dir, capture_output=True, text=True, timeout=timeout
+            )
+        except subprocess.TimeoutExpired as e:
+            output = e.stdout.decode('utf-8', errors='ignore') if isinstance(e.stdout, bytes) else (e.stdout or '')
+            return False, f"{output}\nTempo limite de {timeout}s excedido: {command}"
+        return completed.returncode == 0, f"{completed.stdout}{completed.stderr}"
+
+    def run_tests(self, verify: VerifyConfig, work_dir: str, tests: Optional[List[str]]) -> Tuple[bool, str]:
+        timeout = verify.get('timeout', 900)
+        if tests is None:
+            return self.run_command(verify['test'], work_dir, timeout)
+
+        if verify.get('test_id', 'path') == 'name':
+            tests = sorted({get_module_name(test) for test in tests})
+        # Distribui os testes em shards, cada um um processo do comando de teste
+        shard_count = max(1, min(verify.get('shards', 1), len(tests)))
+        shards = [tests[index::shard_count] for index in range(shard_count)]
+        separator = verify.get('test_separator', ' ')
+        commands = [verify['test_selected'].replace('{tests}', separator.join(shard)) for shard in shards]
+        with ThreadPoolExecutor(max_workers=shard_count, thread_name_prefix='test-shard') as executor:
+            results = list(executor.map(lambda command: self.run_command(command, work_dir, timeout), commands))
+
+        failures = [output for ok, output in results if not ok]
+        return not failures, '\n'.join(failures)
+
+    def verify(self, project: str, work_dir: str, changed_files: List[str]) -> VerificationResult:
+        verify = self.get_verify_config(project)
+        if not verify:
+            return {'ok': True, 'stage': 'skipped', 'output': '', 'tests': []}
+
+        timeout = verify.get('timeout', 900)
+        if verify.get('build'):
+            with tracer.span('verify.build', project=project):
+                ok, output = self.run_command(verify['build'], work_dir, timeout)
+                tracer.set_attribute('ok', ok)
+            if not ok:
+                return {'ok': False, 'stage': 'build', 'output': output[-self.max_output_chars:], 'tests': []}
+
+        if not verify.get('test'):
+            return {'ok': True, 'stage': 'build', 'output': '', 'tests': []}
+
+        tests = self.select_tests(project, work_dir, verify, changed_files)
+        if tests == []:
+            print("Nenhum teste afetado pelas alterações")
+            return {'ok': True, 'stage': 'test', 'output': '', 'tests': []}
+
+        print(f"Executando {'a suíte completa' if tests is None else f'{len(tests)} testes afetados'}")
+        with tracer.span('verify.test', project=project, tests=len(tests) if tests is not None else 'all'):
+            ok, output = self.run_tests(verify, work_dir, tests)
+            tracer.set_attribute('ok', ok)
+        return {'ok': ok, 'stage': 'test', 'output': '' if ok else output[-self.max_output_chars:], 'tests': tests}
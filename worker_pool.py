@@ -0,0 +1,140 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from instrumentation import tracer
+from worktree_handler import WorktreeHandler
+
+if TYPE_CHECKING:
+    from main import TaskToCode
+
+
+class TaskWorkerPool:
+    def __init__(self, task_to_code: 'TaskToCode') -> None:
+        self.task_to_code = task_to_code
+        self.config = task_to_code.config
+        workers_config = self.config.get('workers', {})
+        self.max_workers = workers_config.get('max_workers', 4)
+        self.worktree_handler = WorktreeHandler(
+            workers_config.get('worktrees_dir', '.worktrees'), task_to_code.git_service
+        )
+
+        # Limite de tasks simultâneas por projeto (padrão: sem limite além do pool)
+        self.project_limits: Dict[str, threading.BoundedSemaphore] = {
+            project: threading.BoundedSemaphore(project_config.get('max_workers', self.max_workers))
+            for project, project_config in self.config['projects'].items()
+        }
+        # Uma mesma task nunca roda duas vezes ao mesmo tempo: o worktree dela tem caminho fixo
+        self._task_locks: Dict[str, threading.Lock] = {}
+        self._task_locks_guard = threading.Lock()
+
+    def _task_lock(self, task_key: str) -> threading.Lock:
+        with self._task_locks_guard:
+            return self._task_locks.setdefault(task_key, threading.Lock())
+
+    def get_base_ref(self, project: str) -> Optional[str]:
+        """Commit atual da branch base do projeto (o GitService limita a um fetch por intervalo)."""
+        project_dir = self.task_to_code.get_project_dir(project)
+        if not project_dir:
+            return None
+        return self.worktree_handler.fetch_base(project_dir, self.config['github']['base_branch'])
+
+    def run(self, task_keys: List[str], prefetch: bool = True, summary: bool = True,
+            base_refs: Optional[Dict[str, str]] = None) -> Dict[str, Optional[str]]:
+        """Processa as tasks em paralelo, cada uma em seu próprio worktree.
+
+        Com `prefetch=False` as tasks já devem estar no ciclo atual do JiraHandler (ex: busca em lote).
+        `base_refs` fixa o commit base por projeto para todas as tasks desta chamada.
+        """
+        return self._run_all(
+            task_keys, lambda task_key: self.process_task(task_key, base_refs), prefetch, summary
+        )
+
+    def run_corrections(self, task_keys: List[str], last_updated: datetime) -> Dict[str, Optional[str]]:
+        """Verifica e aplica correções das tasks em paralelo."""
+        return self._run_all(task_keys, lambda task_key: self.process_corrections(task_key, last_updated))
+
+    def _run_all(self, task_keys: List[str], worker, prefetch: bool = True,
+                 summary: bool = True) -> Dict[str, Optional[str]]:
+        if prefetch:
+            jira_handler = self.task_to_code.jira_handler
+            jira_handler.begin_cycle()
+            # Busca todas as tasks do lote em paralelo antes de distribuí-las aos workers
+            runtime = self.task_to_code.runtime
+            runtime.run(jira_handler.prefetch_snapshots(runtime.http, task_keys))
+
+        results: Dict[str, Optional[str]] = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='task') as executor:
+            futures = {task_key: executor.submit(worker, task_key) for task_key in task_keys}
+            for task_key, future in futures.items():
+                try:
+                    results[task_key] = future.result()
+                except Exception as e:
+                    print(f"Erro ao processar task {task_key}: {e}")
+                    results[task_key] = None
+        # Envia os comentários do lote sem aguardar a janela de agrupamento
+        self.task_to_code.write_back.flush()
+
+        if summary:
+            print("\n=== Resumo do pool de workers ===")
+            for task_key, result in results.items():
+                print(f"{task_key}: {result or 'sem PR'}")
+            print("\nModelos:")
+            print(self.task_to_code.aider_handler.router.report())
+            print("=================================\n")
+        return results
+
+    def process_task(self, task_key: str, base_refs: Optional[Dict[str, str]] = None) -> Optional[str]:
+        """Implementa a task em um worktree criado a partir da base remota."""
+        with tracer.span('task.process', task=task_key), self._task_lock(task_key):
+            print(f"Processando task {task_key}...")
+            with tracer.span('jira.fetch', task=task_key):
+                task = self.task_to_code.jira_handler.get_task(task_key)
+            if not self.task_to_code.validate_task(task):
+                return None
+            if task['project'] not in self.config['projects']:
+                print(f"Projeto {task['project']} não está configurado no config.yaml")
+                return None
+            # Sem criar o worktree quando a task já tem PR para a mesma descrição
+            pr_url = self.task_to_code.get_existing_pr(task)
+            if pr_url:
+                print(f"Task {task_key} já possui PR: {pr_url}")
+                return pr_url
+
+            with tracer.span('git.fetch_base', project=task['project']):
+                base_ref = (base_refs or {}).get(task['project']) or self.get_base_ref(task['project'])
+            if not base_ref:
+                return None
+
+            project_dir = self.task_to_code.get_project_dir(task['project'])
+            with self.project_limits[task['project']]:
+                with self.worktree_handler.task_worktree(project_dir, task['project'], task_key, base_ref) as work_dir:
+                    return self.task_to_code.implement_task(task, work_dir)
+
+    def process_corrections(self, task_key: str, last_updated: datetime) -> Optional[str]:
+        """Aplica as correções pendentes em um worktree na branch da task."""
+        with self._task_lock(task_key):
+            return self._process_corrections(task_key, last_updated)
+
+    def _process_corrections(self, task_key: str, last_updated: datetime) -> Optional[str]:
+        task = self.task_to_code.jira_handler.get_task(task_key)
+        if task['project'] not in self.config['projects']:
+            print(f"Projeto {task['project']} não está configurado no config.yaml")
+            return None
+
+        project_dir = self.task_to_code.get_project_dir(task['project'])
+        if not project_dir:
+            return None
+        branch_name = f"feature/{task_key}"
+        if not self.worktree_handler.has_branch(os.path.abspath(project_dir), branch_name):
+            print(f"Branch {branch_name} não encontrada")
+            return None
+
+        # O worktree fica na própria branch da task para que os commits do Aider caiam nela
+        with self.project_limits[task['project']]:
+            with self.worktree_handler.task_worktree(
+                project_dir, task['project'], task_key, branch_name, detach=False
+            ) as work_dir:
+                return self.task_to_code.process_corrections(task_key, last_updated, work_dir)
@@ -0,0 +1,81 @@
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+from git import Repo
+
+from git_service import GitService
+
+
+class WorktreeHandler:
+    def __init__(self, worktrees_dir: str, git_service: GitService) -> None:
+        self.worktrees_dir = os.path.abspath(worktrees_dir)
+        self.git = git_service
+        # Operações de worktree alteram metadados do repositório principal,
+        # por isso são serializadas por projeto
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    def _project_lock(self, project_dir: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(os.path.abspath(project_dir), threading.Lock())
+
+    def get_worktree_path(self, project: str, task_key: str) -> str:
+        """Retorna o caminho do worktree de uma task."""
+        return os.path.join(self.worktrees_dir, project, task_key)
+
+    def create_worktree(self, project_dir: str, path: str, ref: str, detach: bool = True) -> str:
+        """Cria um worktree a partir de uma referência (branch base ou branch da task)."""
+        with self._project_lock(project_dir):
+            repo = self.git.get_repo(project_dir)
+            self._discard_worktree(repo, path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if detach:
+                repo.git.worktree('add', '--detach', path, ref)
+            else:
+                repo.git.worktree('add', path, ref)
+        return path
+
+    def remove_worktree(self, project_dir: str, path: str) -> None:
+        """Remove o worktree e limpa os metadados no repositório principal."""
+        with self._project_lock(project_dir):
+            self._discard_worktree(self.git.get_repo(project_dir), path)
+        self.git.forget_repo(path)
+
+    def _discard_worktree(self, repo: Repo, path: str) -> None:
+        if os.path.exists(path):
+            try:
+                repo.git.worktree('remove', '--force', path)
+            except Exception as e:
+                print(f"Erro ao remover worktree {path}: {e}")
+                shutil.rmtree(path, ignore_errors=True)
+        repo.git.worktree('prune')
+
+    def fetch_base(self, project_dir: str, base_branch: str) -> Optional[str]:
+        """Atualiza a branch base remota e retorna o commit dela para criar worktrees.
+
+        Retorna o SHA em vez de `origin/<base>`: fetches seguintes (de outras tasks ou do cache de
+        mirrors) movem a referência remota, e as tasks de um lote devem partir do mesmo commit.
+        """
+        try:
+            repo = self.git.get_repo(project_dir)
+            return repo.git.rev_parse(f'{self.git.fetch_base(repo, base_branch)}^{{commit}}')
+        except Exception as e:
+            print(f"Erro ao atualizar branch base: {e}")
+            return None
+
+    def has_branch(self, project_dir: str, branch_name: str) -> bool:
+        """Verifica se a branch existe localmente."""
+        return self.git.branch_exists(self.git.get_repo(project_dir), branch_name)
+
+    @contextmanager
+    def task_worktree(self, project_dir: str, project: str, task_key: str, ref: str,
+                      detach: bool = True) -> Iterator[str]:
+        """Cria um worktree isolado para a task e o remove ao final."""
+        path = self.create_worktree(project_dir, self.get_worktree_path(project, task_key), ref, detach)
+        try:
+            yield path
+        finally:
+            self.remove_worktree(project_dir, path)
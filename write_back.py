@@ -0,0 +1,178 @@
+import asyncio
+import atexit
+import threading
+import time
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Awaitable, Dict, List, Optional, Tuple
+
+import httpx
+
+from instrumentation import tracer
+from task_artifacts import GITHUB_BODY_LIMIT, truncate_text
+from type_definitions import PendingWrite
+
+if TYPE_CHECKING:
+    from main import TaskToCode
+
+# Limite de caracteres de um comentário no Jira
+JIRA_COMMENT_LIMIT = 32767
+COMMENT_SEPARATOR = '\n\n---\n\n'
+
+COMMENT_LIMITS = {'jira_comment': JIRA_COMMENT_LIMIT, 'pr_comment': GITHUB_BODY_LIMIT}
+
+
+def is_permanent_error(error: BaseException) -> bool:
+    """Erros que não mudam com uma nova tentativa (ex: 404, transição inexistente)."""
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code < 500 and error.response.status_code != 429
+    return isinstance(error, ValueError)
+
+
+def coalesce(writes: List[PendingWrite]) -> List[Tuple[str, str, str, List[int]]]:
+    """Agrupa as escritas por destino: comentários viram um só (dentro do limite) e vale a última transição."""
+    groups: Dict[Tuple[str, str], List[PendingWrite]] = {}
+    for write in writes:
+        groups.setdefault((write['target'], write['resource']), []).append(write)
+
+    batches = []
+    for (target, resource), group in groups.items():
+        if target not in COMMENT_LIMITS:
+            batches.append((target, resource, group[-1]['body'], [write['id'] for write in group]))
+            continue
+        limit = COMMENT_LIMITS[target]
+        bodies: List[str] = []
+        ids: List[int] = []
+        for write in group:
+            body = truncate_text(write['body'], limit)
+            if bodies and len(COMMENT_SEPARATOR.join(bodies + [body])) > limit:
+                batches.append((target, resource, COMMENT_SEPARATOR.join(bodies), ids))
+                bodies, ids = [], []
+            bodies.append(body)
+            ids.append(write['id'])
+        batches.append((target, resource, COMMENT_SEPARATOR.join(bodies), ids))
+    return batches
+
+
+class WriteBackQueue:
+    """Fila persistente de escritas no Jira e no GitHub (comentários e transições de status).
+
+    Cada escrita é gravada no state store antes do envio, com uma chave de idempotência: repetir a
+    mesma notificação não cria outro comentário, e o que ficou pendente em uma execução interrompida
+    é enviado na próxima. Uma thread envia as escritas depois de `write_back.window` segundos,
+    juntando os comentários da mesma issue ou PR em um só; falhas são repetidas com backoff.
+    """
+
+    def __init__(self, task_to_code: 'TaskToCode') -> None:
+        write_back_config = task_to_code.config.get('write_back', {})
+        self.task_to_code = task_to_code
+        self.state_store = task_to_code.state_store
+        self.enabled = write_back_config.get('enabled', True)
+        self.window = write_back_config.get('window', 10.0)
+        self.max_attempts = write_back_config.get('max_attempts', 5)
+        self.retry_delay = write_back_config.get('retry_delay', 30.0)
+        self.transitions: Dict[str, str] = write_back_config.get('transitions') or {}
+        self._wake = threading.Condition()
+        self._notified = False
+        self._closed = False
+        self._flush_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        atexit.register(self.close)
+
+    def comment_issue(self, task_key: str, body: str, dedupe_key: Optional[str] = None) -> None:
+        self.add('jira_comment', task_key, body, dedupe_key)
+
+    def comment_pull(self, repository: str, number: int, body: str, dedupe_key: Optional[str] = None) -> None:
+        self.add('pr_comment', f'{repository}#{number}', body, dedupe_key)
+
+    def transition_issue(self, task_key: str, event: str, dedupe_key: Optional[str] = None) -> None:
+        """Move a issue para o status de `write_back.transitions.<event>`, se configurado."""
+        status = self.transitions.get(event)
+        if status:
+            self.add('jira_transition', task_key, status, dedupe_key)
+
+    def add(self, target: str, resource: str, body: str, dedupe_key: Optional[str] = None) -> None:
+        if not self.state_store.add_write(target, resource, body, dedupe_key):
+            print(f"Escrita {dedupe_key} já registrada, ignorando")
+            return
+        if not self.enabled:
+            self.flush()
+            return
+        with self._wake:
+            self._notified = True
+            if not self._thread:
+                self._thread = threading.Thread(target=self._run, name='write-back', daemon=True)
+                self._thread.start()
+            self._wake.notify()
+
+    def _run(self) -> None:
+        retry_in: Optional[float] = None
+        while True:
+            with self._wake:
+                self._wake.wait_for(lambda: self._notified or self._closed, timeout=retry_in)
+                if self._closed:
+                    return
+                # Janela para juntar as escritas que chegarem em seguida
+                self._wake.wait_for(lambda: self._closed, timeout=self.window)
+                if self._closed:
+                    return
+                self._notified = False
+            retry_in = self.flush()
+
+    def _send(self, target: str, resource: str, body: str) -> Awaitable[None]:
+        http = self.task_to_code.runtime.http
+        if target == 'jira_comment':
+            return self.task_to_code.jira_handler.comment_task_async(http, resource, body)
+        if target == 'jira_transition':
+            return self.task_to_code.jira_handler.transition_task_async(http, resource, body)
+        repository, number = resource.rsplit('#', 1)
+        return self.task_to_code.github_handler.comment_pull_async(http, repository, int(number), body)
+
+    def flush(self) -> Optional[float]:
+        """Envia as escritas pendentes; retorna em quantos segundos vence o próximo retry, se houver."""
+        with self._flush_lock:
+            now = time.time()
+            pending = self.state_store.get_writes()
+            due = [write for write in pending if write['next_attempt_at'] <= now]
+            if due:
+                self._send_batches(due)
+            retry_at = [write['next_attempt_at'] for write in self.state_store.get_writes()]
+            return max(0.0, min(retry_at) - time.time()) if retry_at else None
+
+    def _send_batches(self, writes: List[PendingWrite]) -> None:
+        batches = coalesce(writes)
+        attempts = {write['id']: write['attempts'] for write in writes}
+        with tracer.span('write_back.flush', writes=len(writes), requests=len(batches)):
+            async def send_all() -> List[Any]:
+                return await asyncio.gather(
+                    *(self._send(target, resource, body) for target, resource, body, _ in batches),
+                    return_exceptions=True
+                )
+            results = self.task_to_code.runtime.run(send_all())
+
+            for (target, resource, _, ids), result in zip(batches, results):
+                if not isinstance(result, BaseException):
+                    self.state_store.update_writes(ids, status='sent', sent_at=datetime.now().isoformat(), error=None)
+                    continue
+                tracer.increment('failures')
+                attempt = max(attempts[write_id] for write_id in ids) + 1
+                if attempt >= self.max_attempts or is_permanent_error(result):
+                    print(f"Falha definitiva ao enviar {target} para {resource}: {result}")
+                    self.state_store.update_writes(ids, status='failed', attempts=attempt, error=str(result))
+                    continue
+                delay = self.retry_delay * (2 ** (attempt - 1))
+                print(f"Erro ao enviar {target} para {resource}: {result}. Nova tentativa em {delay:.0f}s")
+                self.state_store.update_writes(
+                    ids, attempts=attempt, next_attempt_at=time.time() + delay, error=str(result)
+                )
+
+    def close(self) -> None:
+        """Encerra a thread e envia o que estiver pendente (chamado também na saída do processo)."""
+        with self._wake:
+            self._closed = True
+            self._wake.notify_all()
+        if self._thread:
+            self._thread.join()
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"Erro ao enviar escritas pendentes: {e}")